@@ -0,0 +1,49 @@
+import time
+from typing import Callable, Optional, Tuple
+
+class AnimationClock:
+    # Quake 2 steps its models' animations 10 times a second.
+    DEFAULT_KEYFRAME_RATE = 10.0
+
+    def __init__(self, keyframe_rate: float = DEFAULT_KEYFRAME_RATE, time_source: Callable[[], float] = time.perf_counter):
+        """The constructor for the AnimationClock class, which steps an animation at a fixed number of keyframes a second
+        however often frames are drawn. Time left over after the whole keyframes is the blend toward the next keyframe.
+
+        Args:
+            keyframe_rate (float, optional): The number of keyframes a second. Defaults to 10.
+            time_source (Callable[[], float], optional): Returns the current time in seconds. Defaults to time.perf_counter.
+        """
+        self.keyframe_rate = keyframe_rate
+        self._time_source = time_source
+        self.reset()
+
+    @property
+    def blend(self) -> float:
+        """How far the animation is from the last whole keyframe toward the next one, from 0 up to but not including 1."""
+        return self._blend
+
+    def reset(self) -> None:
+        """Restarts the clock at a keyframe, such as when the animation sequence changes."""
+        self._last_time = self._time_source()
+        self._blend = 0.0
+
+    def update(self, seconds: Optional[float] = None) -> Tuple[int, float]:
+        """Advances the clock by the time since the last update, or by a given time, such as one frame of a video.
+
+        Args:
+            seconds (Optional[float], optional): The time to advance by, or None for the time since the last update.
+            Defaults to None.
+
+        Returns:
+            Tuple[int, float]: The number of whole keyframes passed and the blend toward the next keyframe.
+        """
+        if seconds is None:
+            now = self._time_source()
+            seconds = now - self._last_time
+            self._last_time = now
+
+        keyframes = self._blend + seconds * self.keyframe_rate
+        whole = int(keyframes)
+        self._blend = keyframes - whole
+
+        return whole, self._blend
@@ -0,0 +1,131 @@
+import argparse
+import os
+import tempfile
+import timeit
+
+import numpy as np
+
+from animation_clock import AnimationClock
+from benchmarks.synthetic import write_model
+from frame_storage import FrameStorage
+from model import QuakeModel
+from render_type import RenderType
+
+# Checks that blending between animation frames matches the frames themselves at the ends and their average halfway,
+# for every frame storage mode, and that the animation clock reaches the same pose whatever the rate frames are drawn
+# at. Then compares the cost of building a blended frame with building a keyframe.
+#
+# Run from the src directory: python -m benchmarks.animation [tris.md2]
+
+def load(quake_filename: str, frame_storage: FrameStorage) -> QuakeModel:
+    """Loads a model placed in front of the viewer.
+
+    Args:
+        quake_filename (str): The full path to the Quake model version 2 md2 file.
+        frame_storage (FrameStorage): How the animation frames are stored.
+
+    Returns:
+        QuakeModel: The model.
+    """
+    model = QuakeModel(RenderType.TEXTURED, frame_storage)
+    model.from_file(quake_filename, os.path.splitext(quake_filename)[0] + '.pcx', use_cache=False)
+    model.rotate(0, 180, 90)
+    model.translate(85, -250, 70)
+    return model
+
+def world_coordinates(model: QuakeModel) -> np.ndarray:
+    """Transforms every vertex of the model's current frame.
+
+    Args:
+        model (QuakeModel): The model.
+
+    Returns:
+        np.ndarray: The world coordinates of every vertex.
+    """
+    model._should_rotate.fill(True)
+    model._apply_transformations()
+    return model._world_coordinates.copy()
+
+def check_blending(quake_filename: str, frame_storage: FrameStorage) -> None:
+    """Checks the blended frames of a model against its keyframes.
+
+    Args:
+        quake_filename (str): The full path to the Quake model version 2 md2 file.
+        frame_storage (FrameStorage): How the animation frames are stored.
+    """
+    model = load(quake_filename, frame_storage)
+    stepped = load(quake_filename, frame_storage)
+
+    for _ in range(model.sequences[0].num_frames):
+        start = world_coordinates(model)
+        start_normals = model._current_frame().normals.copy()
+        stepped.advance_frame()
+        end = world_coordinates(stepped)
+        end_normals = stepped._current_frame().normals
+
+        model.animate(0, 0.5)
+        if not np.allclose(world_coordinates(model), (start + end) / 2, atol=1e-3):
+            raise RuntimeError(f'Blending halfway from frame {model.frame} does not average the vertices with {frame_storage.name.lower()} frame storage')
+        if not np.allclose(model._current_frame().normals, (start_normals + end_normals) / 2, atol=1e-3):
+            raise RuntimeError(f'Blending halfway from frame {model.frame} does not average the normals with {frame_storage.name.lower()} frame storage')
+
+        model.animate(1, 0)
+        if not np.array_equal(world_coordinates(model), end):
+            raise RuntimeError(f'Frame {model.frame} differs from stepping to it with {frame_storage.name.lower()} frame storage')
+
+def check_clock(quake_filename: str, seconds: float) -> None:
+    """Checks that the animation clock reaches the same pose whatever the rate frames are drawn at.
+
+    Args:
+        quake_filename (str): The full path to the Quake model version 2 md2 file.
+        seconds (float): The time to animate for.
+    """
+    poses = []
+    for frame_rate in (20, 60, 100, 140):
+        model = load(quake_filename, FrameStorage.EAGER)
+        clock = AnimationClock()
+        for _ in range(round(seconds * frame_rate)):
+            model.animate(*clock.update(1 / frame_rate))
+        poses.append((frame_rate, model.frame, model.blend, world_coordinates(model)))
+
+    for frame_rate, frame, blend, world in poses[1:]:
+        if frame != poses[0][1] or not np.isclose(blend, poses[0][2]) or not np.allclose(world, poses[0][3], atol=1e-3):
+            raise RuntimeError(f'Drawing {frame_rate} frames a second reaches frame {frame} blend {blend:.3f} instead of frame {poses[0][1]} blend {poses[0][2]:.3f}')
+
+def main():
+    """Checks the blended frames and the animation clock, then times building keyframes and blended frames."""
+    parser = argparse.ArgumentParser(description='Keyframe blending check and benchmark')
+    parser.add_argument('quake_model', nargs='?', help='Quake model verison 2 md2 file, or a synthetic model when omitted')
+    parser.add_argument('--repeat', type=int, default=5, help='the number of measurements of each case')
+    parser.add_argument('--number', type=int, default=20, help='the number of frames built in each measurement')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        quake_filename = args.quake_model or write_model(directory, rows=40, columns=50)
+
+        for frame_storage in FrameStorage:
+            check_blending(quake_filename, frame_storage)
+        # Halfway between keyframes, away from the rounding at a keyframe, and a whole number of frames at every rate.
+        check_clock(quake_filename, 1.05)
+        print('Blended frames match their keyframes, and the clock reaches the same pose at every frame rate')
+
+        print(f'{"frame storage":<15} {"keyframe":>11} {"blended":>11}')
+        for frame_storage in FrameStorage:
+            model = load(quake_filename, frame_storage)
+            blends = iter(np.tile(np.linspace(0.05, 0.95, 19), args.repeat * args.number + 1))
+
+            def keyframe() -> None:
+                model.animate(1, 0)
+                model.triangle_batch()
+
+            def blended() -> None:
+                # A new blend every time, so the blended frame is built again as it is when drawing.
+                model.animate(0, next(blends))
+                model.triangle_batch()
+
+            keyframe_time = min(timeit.repeat(keyframe, number=args.number, repeat=args.repeat)) / args.number
+            blended_time = min(timeit.repeat(blended, number=args.number, repeat=args.repeat)) / args.number
+            print(f'{frame_storage.name.lower():<15} {keyframe_time * 1000:>8.3f} ms {blended_time * 1000:>8.3f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import tempfile
+import timeit
+
+import numpy as np
+
+from benchmarks.synthetic import write_model
+from model import QuakeModel
+from render_type import RenderType
+
+# Compares the vectorized backface culling in QuakeModel._visible_faces with the per-face loop it replaced.
+#
+# Run from the src directory: python -m benchmarks.culling [tris.md2]
+
+def loop_visible_faces(model: QuakeModel) -> np.ndarray:
+    """The per-face culling loop that QuakeModel used before it was vectorized.
+
+    Args:
+        model (QuakeModel): The model to cull.
+
+    Returns:
+        np.ndarray: The indices of the faces pointing toward the viewer.
+    """
+    object_viewer = (0, 150, 0) @ model._rotation_matrix
+    frame = model._get_frame(model._frame)
+    visible_faces = []
+
+    model._should_rotate.fill(False)
+    for face_index in range(model.header.num_faces):
+        if np.dot(object_viewer, frame.normals[face_index]) < 0:
+            model._should_rotate[model._triangles[face_index].point_1] = True
+            model._should_rotate[model._triangles[face_index].point_2] = True
+            model._should_rotate[model._triangles[face_index].point_3] = True
+            visible_faces.append(face_index)
+
+    return np.array(visible_faces)
+
+def main():
+    """Times both ways of culling on a high-poly model and checks they agree."""
+    parser = argparse.ArgumentParser(description='Backface culling microbenchmark')
+    parser.add_argument('quake_model', nargs='?', help='Quake model verison 2 md2 file, or a synthetic high-poly model when omitted')
+    parser.add_argument('--repeat', type=int, default=5, help='the number of times to cull with each method')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        quake_filename = args.quake_model or write_model(directory, rows=150, columns=150)
+        pcx_filename = os.path.splitext(quake_filename)[0] + '.pcx'
+
+        model = QuakeModel(RenderType.TEXTURED)
+        model.from_file(quake_filename, pcx_filename, use_cache=False)
+
+    model.rotate(0, 180, 120)
+
+    loop_faces = loop_visible_faces(model)
+    loop_mask = model._should_rotate.copy()
+    vectorized_faces = model._visible_faces(model._current_frame())
+    if not np.array_equal(loop_faces, vectorized_faces) or not np.array_equal(loop_mask, model._should_rotate):
+        raise RuntimeError('The vectorized culling does not match the per-face loop')
+
+    loop_time = min(timeit.repeat(lambda: loop_visible_faces(model), number=1, repeat=args.repeat))
+    vectorized_time = min(timeit.repeat(lambda: model._visible_faces(model._current_frame()), number=1, repeat=args.repeat))
+
+    print(f'{model.header.num_faces} faces, {len(vectorized_faces)} visible')
+    print(f'per-face loop {loop_time * 1000:10.3f} ms')
+    print(f'vectorized    {vectorized_time * 1000:10.3f} ms')
+    print(f'speedup       {loop_time / vectorized_time:10.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import write_model
+from graphics import Graphics
+from model import QuakeModel
+from point2d import Point2d
+from render_type import RenderType
+
+# Compares drawing textured frames from the triangle list with drawing them from the GL command strips and fans.
+#
+# Run from the src directory: python -m benchmarks.gl_commands [tris.md2]
+
+def render_frames(model: QuakeModel, graphics: Graphics, num_frames: int) -> np.ndarray:
+    """Draws the current frame of the model a number of times through its triangle batch, as the viewer does.
+
+    Args:
+        model (QuakeModel): The model to draw.
+        graphics (Graphics): The graphics object to draw with.
+        num_frames (int): The number of frames to draw.
+
+    Returns:
+        np.ndarray: The buffer of the last frame.
+    """
+    for _ in range(num_frames):
+        buffer = np.zeros((1000, 1000), dtype=np.uint32)
+        graphics.draw_triangle_batch(model.triangle_batch().sorted_by_depth(), buffer)
+    return buffer
+
+def main():
+    """Times the triangle list and GL command paths on the same model and frame."""
+    parser = argparse.ArgumentParser(description='GL command strip and fan benchmark')
+    parser.add_argument('quake_model', nargs='?', help='Quake model verison 2 md2 file, or a synthetic model when omitted')
+    parser.add_argument('--frames', type=int, default=10, help='the number of times to draw the frame with each path')
+    parser.add_argument('--scale', type=float, default=4, help='the scale of the model')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        quake_filename = args.quake_model or write_model(directory, rows=40, columns=50)
+        pcx_filename = os.path.splitext(quake_filename)[0] + '.pcx'
+
+        model = QuakeModel(RenderType.TEXTURED)
+        model.from_file(quake_filename, pcx_filename, use_cache=False)
+
+    model.rotate(0, 180, 120)
+    model.translate(85, -250, 70)
+    model.scale(args.scale)
+
+    graphics = Graphics()
+    graphics.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+
+    gl_commands = model._get_gl_commands()
+    num_strip_triangles = sum(len(command.triangles) for command in gl_commands)
+    print(f'{model.header.num_faces} faces, {len(gl_commands)} strips and fans with {num_strip_triangles} triangles')
+
+    buffers = []
+    for use_gl_commands in (False, True):
+        model.use_gl_commands = use_gl_commands
+        render_frames(model, graphics, 1)
+
+        start = time.perf_counter()
+        buffers.append(render_frames(model, graphics, args.frames))
+        elapsed = time.perf_counter() - start
+
+        print(f'{"gl commands" if use_gl_commands else "triangles":<12} {elapsed / args.frames * 1000:9.1f} ms/frame')
+
+    print(f'{np.count_nonzero(buffers[0] != buffers[1])} pixels differ in the last frame')
+
+if __name__ == '__main__':
+    main()
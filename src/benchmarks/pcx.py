@@ -0,0 +1,153 @@
+import argparse
+from io import BufferedReader
+import os
+import struct
+import tempfile
+import timeit
+from typing import List, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic import PCX_HEADER_FORMAT, encode_pcx_rle, write_pcx
+from pcx import Pcx
+
+# Checks the vectorized PCX decoder against a corpus of encoded images, then compares it with the byte at a time decoder
+# it replaced.
+#
+# Run from the src directory: python -m benchmarks.pcx [skin.pcx]
+
+def write_image(filename: str, image: np.ndarray, padding: int = 0, runs_across_lines: bool = False) -> None:
+    """Writes an 8-bit, run length encoded PCX file for an image.
+
+    Args:
+        filename (str): The full path of the pcx file to write.
+        image (np.ndarray): The image indexed [y, x].
+        padding (int, optional): Extra bytes at the end of each scan line. Defaults to 0.
+        runs_across_lines (bool, optional): Whether runs may continue from one scan line to the next, as some encoders
+        write them. Defaults to False.
+    """
+    height, width = image.shape
+    bytes_per_line = width + padding
+    padded = np.zeros((height, bytes_per_line), dtype=np.uint8)
+    padded[:, :width] = image
+
+    header = struct.pack(PCX_HEADER_FORMAT, 10, 5, 1, 8, 0, 0, width - 1, height - 1, 72, 72, b'', 0, 1, bytes_per_line, 1, b'')
+    encoded = encode_pcx_rle(padded.reshape((1, -1)), padded.size) if runs_across_lines else encode_pcx_rle(padded, bytes_per_line)
+
+    with open(filename, 'wb') as f:
+        f.write(header)
+        f.write(encoded)
+        f.write(b'\x0c')
+        f.write(bytes(768))
+
+def corpus(seed: int = 0) -> List[Tuple[str, np.ndarray, int, bool]]:
+    """Builds images that cover the cases of the run length encoding.
+
+    Args:
+        seed (int, optional): The seed for the random images. Defaults to 0.
+
+    Returns:
+        List[Tuple[str, np.ndarray, int, bool]]: The name, image indexed [y, x], scan line padding, and whether runs
+        continue across scan lines for each case.
+    """
+    rng = np.random.default_rng(seed)
+    cases = [
+        ('single pixel', np.array([[7]], dtype=np.uint8), 0, False),
+        ('single marker valued pixel', np.array([[200]], dtype=np.uint8), 1, False),
+        ('flat', np.zeros((40, 100), dtype=np.uint8), 0, False),
+        ('flat runs across lines', np.full((40, 100), 250, dtype=np.uint8), 0, True),
+        ('noise', rng.integers(0, 256, (33, 47)).astype(np.uint8), 1, False),
+        ('marker values only', rng.integers(192, 256, (16, 64)).astype(np.uint8), 0, False),
+        ('alternating marker values', np.tile(np.array([192, 255], dtype=np.uint8), (8, 32)), 2, False),
+        ('noise runs across lines', rng.integers(190, 194, (20, 31)).astype(np.uint8), 3, True),
+    ]
+
+    for width, height, padding in ((64, 64, 0), (63, 17, 1), (256, 128, 2), (100, 100, 7)):
+        blocks = (np.add.outer(np.arange(height) // 4, np.arange(width) // 8) % 256).astype(np.uint8)
+        noise = rng.random((height, width)) < 0.1
+        blocks[noise] = rng.integers(0, 256, int(noise.sum()))
+        cases.append((f'skin {width}x{height} padding {padding}', blocks, padding, False))
+
+    return cases
+
+def loop_read_image(pcx: Pcx, f: BufferedReader) -> np.ndarray:
+    """The byte at a time decoder that Pcx used before it was vectorized. It ignores bytes_per_line.
+
+    Args:
+        pcx (Pcx): The PCX object whose header has been read.
+        f (BufferedReader): The file to read from, positioned after the header.
+
+    Returns:
+        np.ndarray: The image indexed [x, y].
+    """
+    x_size = pcx.header.x_max - pcx.header.x_min + 1
+    y_size = pcx.header.y_max - pcx.header.y_min + 1
+    image_data = np.zeros(x_size * y_size, dtype=np.uint8)
+    decoded_bytes_read = 0
+
+    while decoded_bytes_read < x_size * y_size:
+        byte = f.read(1)[0]
+
+        if byte >= Pcx.rle_bit:
+            count = byte - Pcx.rle_bit
+            byte = f.read(1)[0]
+
+            for i in range(count):
+                image_data[decoded_bytes_read] = byte
+                decoded_bytes_read += 1
+        else:
+            image_data[decoded_bytes_read] = byte
+            decoded_bytes_read += 1
+
+    return image_data.reshape((x_size, y_size), order='F')
+
+def decode(filename: str, vectorized: bool) -> np.ndarray:
+    """Decodes the image of a PCX file with one of the decoders.
+
+    Args:
+        filename (str): The full path of the pcx file.
+        vectorized (bool): Whether to use the vectorized decoder instead of the byte at a time decoder.
+
+    Returns:
+        np.ndarray: The image indexed [x, y].
+    """
+    pcx = Pcx()
+    with open(filename, 'rb') as f:
+        pcx.header = pcx._read_header(f)
+        return pcx._read_image(f) if vectorized else loop_read_image(pcx, f)
+
+def main():
+    """Round trips the corpus through the vectorized decoder, then times both decoders on a large skin."""
+    parser = argparse.ArgumentParser(description='PCX decoder round trip check and benchmark')
+    parser.add_argument('pcx', nargs='?', help='8-bit PCX file to time, or a synthetic 512 x 512 skin when omitted')
+    parser.add_argument('--repeat', type=int, default=5, help='the number of times to decode with each decoder')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'case.pcx')
+        for name, image, padding, runs_across_lines in corpus():
+            write_image(filename, image, padding, runs_across_lines)
+            if not np.array_equal(decode(filename, True), image.T):
+                raise RuntimeError(f'The vectorized decoder does not round trip the {name} case')
+
+        print(f'{len(corpus())} corpus images round trip')
+
+        filename = args.pcx or os.path.join(directory, 'skin.pcx')
+        if args.pcx is None:
+            write_pcx(filename, 512, 512)
+
+        loop_image = decode(filename, False)
+        vectorized_image = decode(filename, True)
+        if not np.array_equal(loop_image, vectorized_image):
+            raise RuntimeError('The vectorized decoder does not match the byte at a time decoder')
+
+        loop_time = min(timeit.repeat(lambda: decode(filename, False), number=1, repeat=args.repeat))
+        vectorized_time = min(timeit.repeat(lambda: decode(filename, True), number=1, repeat=args.repeat))
+
+    print(f'{vectorized_image.shape[0]} x {vectorized_image.shape[1]} image')
+    print(f'byte at a time {loop_time * 1000:10.3f} ms')
+    print(f'vectorized     {vectorized_time * 1000:10.3f} ms')
+    print(f'speedup        {loop_time / vectorized_time:10.1f}x')
+
+if __name__ == '__main__':
+    main()
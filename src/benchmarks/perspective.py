@@ -0,0 +1,78 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import write_model
+from graphics import Graphics
+from model import QuakeModel
+from point2d import Point2d
+from render_type import RenderType
+from triangle_batch import TriangleBatch
+
+# Compares the cost of perspective correct texture mapping, at several subspan lengths, with linear texture mapping, and
+# how far each is from dividing at every pixel.
+#
+# Run from the src directory: python -m benchmarks.perspective [tris.md2]
+
+def render_frames(batch: TriangleBatch, graphics: Graphics, num_frames: int) -> np.ndarray:
+    """Draws a batch of triangles a number of times.
+
+    Args:
+        batch (TriangleBatch): The triangles to draw.
+        graphics (Graphics): The graphics object to draw with.
+        num_frames (int): The number of frames to draw.
+
+    Returns:
+        np.ndarray: The buffer of the last frame.
+    """
+    for _ in range(num_frames):
+        buffer = np.zeros((1000, 1000), dtype=np.uint32)
+        graphics.draw_triangle_batch(batch, buffer)
+    return buffer
+
+def main():
+    """Times linear and perspective correct texture mapping on the same frame of a model scaled up close to the viewer."""
+    parser = argparse.ArgumentParser(description='Perspective correct texture mapping benchmark')
+    parser.add_argument('quake_model', nargs='?', help='Quake model verison 2 md2 file, or a synthetic model when omitted')
+    parser.add_argument('--frames', type=int, default=5, help='the number of times to draw the frame with each mode')
+    parser.add_argument('--scale', type=float, default=8, help='the scale of the model, larger scales show more distortion')
+    parser.add_argument('--subspans', type=int, nargs='+', default=[1, 4, 8, 16, 32], help='the subspan lengths to time')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        quake_filename = args.quake_model or write_model(directory, rows=40, columns=50)
+        pcx_filename = os.path.splitext(quake_filename)[0] + '.pcx'
+
+        model = QuakeModel(RenderType.TEXTURED)
+        model.from_file(quake_filename, pcx_filename, use_cache=False)
+
+    model.rotate(0, 180, 120)
+    model.translate(85, -250, 70)
+    model.scale(args.scale)
+    batch = model.triangle_batch().sorted_by_depth()
+
+    modes = [('linear', Graphics())] + [(f'subspan {subspan}', Graphics(perspective_correct=True, subspan_length=subspan)) for subspan in args.subspans]
+
+    results = []
+    for name, graphics in modes:
+        graphics.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+        render_frames(batch, graphics, 1)
+
+        start = time.perf_counter()
+        buffer = render_frames(batch, graphics, args.frames)
+        results.append((name, (time.perf_counter() - start) / args.frames, buffer))
+
+    exact = Graphics(perspective_correct=True, subspan_length=1)
+    exact.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+    expected = render_frames(batch, exact, 1)
+
+    print(f'{len(batch)} triangles, {np.count_nonzero(expected)} pixels')
+    print(f'{"mode":<12} {"ms/frame":>9} {"vs linear":>10} {"texels off exact":>17}')
+    for name, elapsed, buffer in results:
+        print(f'{name:<12} {elapsed * 1000:>9.1f} {elapsed / results[0][1]:>9.2f}x {np.count_nonzero(buffer != expected):>17}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import argparse
+from contextlib import nullcontext
+import os
+import tempfile
+import time
+from typing import List, Optional, Tuple
+import zlib
+
+import numpy as np
+import pygame
+
+from benchmarks.synthetic import write_model
+from character import Character
+from frame_buffer import FrameBuffer
+from frame_pipeline import FramePipeline
+from graphics import Graphics
+from main import draw_prepared_frame, prepare_character_frame
+from point2d import Point2d
+from rasterizer import Rasterizer
+from render_type import RenderType
+
+# Compares the serial render loop, which builds each frame's geometry and then draws it, with the pipelined loop, which
+# builds the next frames on a worker thread while drawing the current one. Both loops change the character every few
+# frames, as input would, and must draw the same frames. Reports the frames per second and the latency from starting to
+# build a frame to presenting it.
+#
+# Run from the src directory: python -m benchmarks.pipeline [tris.md2 weapon.md2]
+
+def change_character(character: Character, change: int) -> None:
+    """Changes the character the way input does, cycling through rotating, scaling, and switching sequences.
+
+    Args:
+        character (Character): The character to change.
+        change (int): The number of changes made before this one.
+    """
+    if change % 3 == 0:
+        character.rotate(character.rotate_x, character.rotate_y, (character.rotate_z + 15) % 360)
+    elif change % 3 == 1:
+        character.scale(character.size + 0.25)
+    else:
+        character.advance_sequence()
+
+def run(character: Character, graphics: Graphics, frames: int, change_every: int, depth: Optional[int]) -> Tuple[float, List[float], List[int]]:
+    """Draws and presents frames of a character with the serial or the pipelined loop.
+
+    Args:
+        character (Character): The character to draw, at its first frame.
+        graphics (Graphics): The graphics object to draw with.
+        frames (int): The number of frames to draw.
+        change_every (int): How many frames apart to change the character, or 0 to never change it.
+        depth (Optional[int]): The most built frames waiting to be drawn with the pipelined loop, or None for the serial loop.
+
+    Returns:
+        Tuple[float, List[float], List[int]]: The seconds taken, the latency of each frame in seconds, and a checksum of
+        each frame drawn.
+    """
+    frame_buffer = FrameBuffer(1000, 1000)
+    surface = pygame.Surface((1000, 1000), depth=32)
+    prepare = lambda: prepare_character_frame(graphics, character, False)
+    pipeline = FramePipeline(character, prepare, depth) if depth is not None else None
+    latencies = []
+    checksums = []
+
+    start = time.perf_counter()
+    for index in range(frames):
+        if change_every and index > 0 and index % change_every == 0:
+            with pipeline.invalidating() if pipeline is not None else nullcontext():
+                change_character(character, index // change_every - 1)
+
+        if pipeline is not None:
+            frame = pipeline.next_frame()
+        else:
+            character.advance_frame()
+            frame = prepare()
+
+        draw_prepared_frame(graphics, frame, frame_buffer)
+        frame_buffer.present(surface)
+        latencies.append(time.perf_counter() - frame.started)
+        checksums.append(zlib.crc32(frame_buffer.buffer))
+
+    elapsed = time.perf_counter() - start
+    if pipeline is not None:
+        pipeline.close()
+
+    return elapsed, latencies, checksums
+
+def main():
+    """Runs the serial and pipelined loops on the same frames, checks they draw the same pixels, and compares them."""
+    parser = argparse.ArgumentParser(description='Pipelined render loop benchmark')
+    parser.add_argument('models', nargs='*', help='Quake model version 2 md2 files for the character and weapon, or synthetic models when omitted')
+    parser.add_argument('--frames', type=int, default=120, help='the number of frames to draw with each loop')
+    parser.add_argument('--change-every', type=int, default=10, help='how many frames apart to rotate, scale, or switch the sequence, 0 to never')
+    parser.add_argument('--depth', type=int, nargs='+', default=[1, 2], help='the pipeline depths to measure')
+    parser.add_argument('--render-type', choices=['textured', 'wireframe'], default='textured', help='how to render the character')
+    parser.add_argument('--barycentric', action='store_true', help='fill textured triangles by testing their bounding boxes instead of walking their edges')
+    args = parser.parse_args()
+
+    if len(args.models) not in (0, 2):
+        parser.error('pass both the character and the weapon model, or neither')
+
+    graphics = Graphics(Rasterizer.BARYCENTRIC if args.barycentric else Rasterizer.EDGE_WALK)
+    graphics.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+    graphics.clear_depth_buffer(1000, 1000)
+    render_type = RenderType.TEXTURED if args.render_type == 'textured' else RenderType.WIREFRAME
+
+    with tempfile.TemporaryDirectory() as directory:
+        quake_filename, weapon_filename = args.models or (write_model(directory, 'tris', 20, 25, 256, 0), write_model(directory, 'weapon', 5, 6, 256, 1))
+
+        def load() -> Character:
+            character = Character(render_type, quake_filename, weapon_filename, use_cache=False)
+            character.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+            return character
+
+        serial = run(load(), graphics, args.frames, args.change_every, None)
+        results = [('serial', serial)]
+        for depth in args.depth:
+            results.append((f'pipelined, depth {depth}', run(load(), graphics, args.frames, args.change_every, depth)))
+
+    for name, (_, _, checksums) in results[1:]:
+        if checksums != serial[2]:
+            raise RuntimeError(f'The {name} loop drew frame {next(i for i, (a, b) in enumerate(zip(checksums, serial[2])) if a != b)} differently from the serial loop')
+
+    print(f'{args.frames} frames, changing the character every {args.change_every} frames, {os.cpu_count()} CPUs')
+    print(f'{"loop":<22} {"frames/s":>9} {"latency":>11} {"p95 latency":>13}')
+    for name, (elapsed, latencies, _) in results:
+        print(f'{name:<22} {args.frames / elapsed:>9.1f} {np.mean(latencies) * 1000:>8.2f} ms {np.percentile(latencies, 95) * 1000:>10.2f} ms')
+
+if __name__ == '__main__':
+    main()
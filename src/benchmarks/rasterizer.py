@@ -0,0 +1,80 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import write_model
+from graphics import Graphics
+from model import QuakeModel
+from point2d import Point2d
+from rasterizer import Rasterizer
+from render_type import RenderType
+from triangle_batch import TriangleBatch
+
+# Compares the edge walking rasterizer with the barycentric bounding box rasterizer, and checks that they fill the same
+# pixels. The two sample the texture slightly differently, so a few texels may differ.
+#
+# Run from the src directory: python -m benchmarks.rasterizer [tris.md2]
+
+def render_frames(batch: TriangleBatch, graphics: Graphics, num_frames: int) -> np.ndarray:
+    """Draws a batch of triangles a number of times.
+
+    Args:
+        batch (TriangleBatch): The triangles to draw.
+        graphics (Graphics): The graphics object to draw with.
+        num_frames (int): The number of frames to draw.
+
+    Returns:
+        np.ndarray: The buffer of the last frame.
+    """
+    for _ in range(num_frames):
+        buffer = np.zeros((1000, 1000), dtype=np.uint32)
+        graphics.draw_triangle_batch(batch, buffer)
+    return buffer
+
+def main():
+    """Times both rasterizers on the same frame at several scales and compares the pixels they draw."""
+    parser = argparse.ArgumentParser(description='Edge walking and barycentric rasterizer benchmark')
+    parser.add_argument('quake_model', nargs='?', help='Quake model verison 2 md2 file, or a synthetic model when omitted')
+    parser.add_argument('--frames', type=int, default=10, help='the number of times to draw the frame with each rasterizer')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 4, 8], help='the scales of the model to draw, larger scales give larger triangles')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        quake_filename = args.quake_model or write_model(directory, rows=40, columns=50)
+        pcx_filename = os.path.splitext(quake_filename)[0] + '.pcx'
+
+        model = QuakeModel(RenderType.TEXTURED)
+        model.from_file(quake_filename, pcx_filename, use_cache=False)
+
+    model.rotate(0, 180, 120)
+    model.translate(85, -250, 70)
+
+    print(f'{"scale":>6} {"triangles":>10} {"edge walk":>10} {"barycentric":>12} {"speedup":>8} {"pixels":>8} {"texels differ":>14}')
+
+    for scale in args.scales:
+        model.scale(scale)
+        batch = model.triangle_batch().sorted_by_depth()
+
+        buffers = []
+        elapsed = []
+        for rasterizer in Rasterizer:
+            graphics = Graphics(rasterizer)
+            graphics.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+            render_frames(batch, graphics, 1)
+
+            start = time.perf_counter()
+            buffers.append(render_frames(batch, graphics, args.frames))
+            elapsed.append((time.perf_counter() - start) / args.frames)
+
+        edge_walk, barycentric = buffers
+        if not np.array_equal(edge_walk != 0, barycentric != 0):
+            raise RuntimeError(f'The rasterizers fill different pixels at scale {scale}: {np.count_nonzero((edge_walk != 0) != (barycentric != 0))} differ')
+
+        print(f'{scale:>6g} {len(batch):>10} {elapsed[0] * 1000:>7.1f} ms {elapsed[1] * 1000:>9.1f} ms {elapsed[0] / elapsed[1]:>7.2f}x '
+              f'{np.count_nonzero(edge_walk):>8} {np.count_nonzero(edge_walk != barycentric):>14}')
+
+if __name__ == '__main__':
+    main()
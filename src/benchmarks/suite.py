@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.synthetic import write_model, write_pcx
+from character import Character
+from face import Face
+from frame_buffer import FrameBuffer
+from graphics import Graphics
+from main import draw_character_frame
+from model import QuakeModel
+from pcx import Pcx
+from point2d import Point2d
+from render_type import RenderType
+
+# Times the hot paths of loading and drawing a model on synthetic models and skins, writes the results to JSON, and
+# compares them with a stored baseline, failing when a case is slower than the baseline by more than a threshold.
+#
+# Run from the src directory: python -m benchmarks.suite --output results.json
+# and later:                   python -m benchmarks.suite --compare results.json
+
+def build_cases(directory: str, rows: int, columns: int, frames: int, skin_size: int) -> Dict[str, Callable[[], Any]]:
+    """Writes the synthetic files and sets up everything each case needs, so only the work being measured is timed.
+
+    Args:
+        directory (str): The directory to write the synthetic files to.
+        rows (int): The number of rings of vertices of the synthetic character.
+        columns (int): The number of vertices in each ring.
+        frames (int): The number of animation frames of the synthetic character.
+        skin_size (int): The width and height of the synthetic skins.
+
+    Returns:
+        Dict[str, Callable[[], Any]]: The function to time for each case, by name.
+    """
+    quake_filename = write_model(directory, 'tris', rows, columns, skin_size, 0, (('stand', frames),))
+    weapon_filename = write_model(directory, 'weapon', max(rows // 4, 2), max(columns // 4, 3), skin_size, 1, (('stand', frames),))
+    pcx_filename = os.path.splitext(quake_filename)[0] + '.pcx'
+    large_pcx_filename = os.path.join(directory, 'large.pcx')
+    write_pcx(large_pcx_filename, 512, 512)
+
+    model = QuakeModel(RenderType.TEXTURED)
+    model.from_file(quake_filename, pcx_filename, use_cache=False)
+    model.rotate(0, 180, 90)
+    model.translate(85, -250, 70)
+
+    graphics = Graphics()
+    graphics.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+    buffer = np.zeros((1000, 1000), dtype=np.uint32)
+    faces = [triangle.face for triangle in model.triangle_batch().sorted_by_depth().triangles()]
+
+    characters = {}
+    for render_type in RenderType:
+        character = Character(render_type, quake_filename, weapon_filename, cache_dir=directory)
+        character.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+        characters[render_type] = character
+
+    frame_graphics = Graphics()
+    frame_graphics.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+    frame_graphics.clear_depth_buffer(1000, 1000)
+    frame_buffer = FrameBuffer(1000, 1000)
+
+    def load_md2() -> None:
+        QuakeModel(RenderType.TEXTURED).from_file(quake_filename, pcx_filename, use_cache=False)
+
+    def load_md2_cached() -> None:
+        QuakeModel(RenderType.TEXTURED).from_file(quake_filename, pcx_filename, cache_dir=directory)
+
+    def load_pcx() -> None:
+        Pcx().from_file(large_pcx_filename, use_cache=False)
+
+    def apply_transformations() -> None:
+        model._should_rotate.fill(True)
+        model._apply_transformations()
+
+    def triangle_in_frame() -> None:
+        for _ in model.triangle_in_frame():
+            pass
+
+    def triangle_batch() -> None:
+        model.triangle_batch()
+
+    def wireframe_edges() -> None:
+        model.wireframe_edges()
+
+    def draw_textured_triangles(faces: List[Face] = faces) -> None:
+        buffer.fill(0)
+        for face in faces:
+            graphics.draw_textured_triangle(face, buffer)
+
+    def draw_frame(render_type: RenderType) -> Callable[[], None]:
+        def draw() -> None:
+            character = characters[render_type]
+            character.advance_frame()
+            draw_character_frame(frame_graphics, character, frame_buffer)
+        return draw
+
+    load_md2_cached()
+
+    return {
+        'md2_load': load_md2,
+        'md2_load_cached': load_md2_cached,
+        'pcx_load_512': load_pcx,
+        'apply_transformations': apply_transformations,
+        'triangle_in_frame': triangle_in_frame,
+        'triangle_batch': triangle_batch,
+        'wireframe_edges': wireframe_edges,
+        'draw_textured_triangle': draw_textured_triangles,
+        'frame_textured': draw_frame(RenderType.TEXTURED),
+        'frame_wireframe': draw_frame(RenderType.WIREFRAME),
+    }
+
+def time_case(function: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, float]:
+    """Times a case, calling it enough times per measurement that each measurement takes at least min_time.
+
+    Args:
+        function (Callable[[], Any]): The function to time.
+        repeat (int): The number of measurements.
+        min_time (float): The least time in seconds for one measurement.
+
+    Returns:
+        Dict[str, float]: The fastest and median time of one call in seconds, and the calls per measurement.
+    """
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+
+    times = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+    return {'min': min(times), 'median': statistics.median(times), 'number': number}
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Compares results with a baseline and prints a table of the ratios.
+
+    Args:
+        results (Dict[str, Dict[str, float]]): The timings of this run, by case.
+        baseline (Dict[str, Dict[str, float]]): The timings of the baseline run, by case.
+        threshold (float): How much slower than the baseline a case may be, as a fraction, before it is a regression.
+
+    Returns:
+        List[str]: The names of the cases that regressed.
+    """
+    regressions = []
+    print(f'{"case":<24} {"baseline":>11} {"current":>11} {"ratio":>7}')
+
+    for name, timing in results.items():
+        if name not in baseline:
+            print(f'{name:<24} {"":>11} {timing["min"] * 1000:>8.3f} ms {"new":>7}')
+            continue
+
+        ratio = timing['min'] / baseline[name]['min']
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+
+        print(f'{name:<24} {baseline[name]["min"] * 1000:>8.3f} ms {timing["min"] * 1000:>8.3f} ms {ratio:>6.2f}x{"  REGRESSION" if regressed else ""}')
+
+    return regressions
+
+def main():
+    """Runs the benchmark suite, then saves the results and compares them with a baseline when asked."""
+    parser = argparse.ArgumentParser(description='Benchmark suite with regression thresholds')
+    parser.add_argument('--output', help='the JSON file to write the results to')
+    parser.add_argument('--compare', help='a JSON file of earlier results to compare with, failing on regressions')
+    parser.add_argument('--threshold', type=float, default=0.1, help='how much slower than the baseline a case may be before it is a regression, as a fraction')
+    parser.add_argument('--cases', nargs='+', help='the names of the cases to run, every case when omitted')
+    parser.add_argument('--repeat', type=int, default=5, help='the number of measurements of each case')
+    parser.add_argument('--min-time', type=float, default=0.2, help='the least time in seconds for one measurement')
+    parser.add_argument('--rows', type=int, default=20, help='the number of rings of vertices of the synthetic character')
+    parser.add_argument('--columns', type=int, default=25, help='the number of vertices in each ring of the synthetic character')
+    parser.add_argument('--frames', type=int, default=24, help='the number of animation frames of the synthetic character')
+    parser.add_argument('--skin-size', type=int, default=256, help='the width and height of the synthetic skins')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cases = build_cases(directory, args.rows, args.columns, args.frames, args.skin_size)
+
+        unknown = set(args.cases or []) - set(cases)
+        if unknown:
+            parser.error(f'unknown cases: {", ".join(sorted(unknown))}')
+
+        for name, function in cases.items():
+            if args.cases and name not in args.cases:
+                continue
+
+            results[name] = time_case(function, args.repeat, args.min_time)
+            print(f'{name:<24} {results[name]["min"] * 1000:>8.3f} ms  (median {results[name]["median"] * 1000:.3f} ms, {results[name]["number"]} calls per measurement)')
+
+    report = {
+        'metadata': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+                     'rows': args.rows, 'columns': args.columns, 'frames': args.frames, 'skin_size': args.skin_size},
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        if {key: baseline['metadata'].get(key) for key in ('rows', 'columns', 'frames', 'skin_size')} != {key: report['metadata'][key] for key in ('rows', 'columns', 'frames', 'skin_size')}:
+            print('Warning: the baseline was run with different synthetic model settings')
+
+        print()
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regressions beyond {args.threshold:.0%}: {", ".join(regressions)}')
+            sys.exit(1)
+
+        print(f'No regressions beyond {args.threshold:.0%}')
+
+if __name__ == '__main__':
+    main()
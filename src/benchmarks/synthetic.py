@@ -0,0 +1,170 @@
+import math
+import os
+import struct
+from typing import Sequence, Tuple
+
+import numpy as np
+
+# Writers for synthetic Quake 2 models and PCX skins, so the benchmarks do not depend on any particular model files.
+
+PCX_HEADER_FORMAT = '<BBBBHHHHHH48sBBHH58s'
+
+def write_md2(filename: str, rows: int = 20, columns: int = 25, sequences: Sequence[Tuple[str, int]] = (('stand', 10), ('run', 8), ('attack', 6)),
+              skin_width: int = 64, skin_height: int = 64, seed: int = 0) -> None:
+    """Writes a synthetic IDP2 model: an open cylinder of rows x columns vertices whose radius ripples from frame to frame.
+    Even rows of quads are written as GL triangle strips and odd rows as GL triangle fans, and the triangle list is split
+    the same way.
+
+    Args:
+        filename (str): The full path of the md2 file to write.
+        rows (int, optional): The number of rings of vertices. Defaults to 20.
+        columns (int, optional): The number of vertices in each ring. Defaults to 25.
+        sequences (Sequence[Tuple[str, int]], optional): The name and number of frames of each animation sequence. Defaults to stand, run, and attack.
+        skin_width (int, optional): The width of the skin the texture coordinates address. Defaults to 64.
+        skin_height (int, optional): The height of the skin the texture coordinates address. Defaults to 64.
+        seed (int, optional): The seed for the vertex jitter and light normal indices. Defaults to 0.
+    """
+    rng = np.random.default_rng(seed)
+    num_vertices = rows * columns
+
+    row, column = np.divmod(np.arange(num_vertices), columns)
+    tex_coords = np.stack([column * (skin_width - 1) // max(columns - 1, 1), row * (skin_height - 1) // max(rows - 1, 1)], axis=1).astype('<i2')
+
+    faces = []
+    gl_commands = []
+    for r in range(rows - 1):
+        if r % 2 == 0:
+            strip = []
+            for c in range(columns):
+                strip += [r * columns + c, (r + 1) * columns + c]
+            for c in range(columns - 1):
+                top_left, bottom_left = r * columns + c, (r + 1) * columns + c
+                faces += [(top_left, bottom_left, top_left + 1), (top_left + 1, bottom_left, bottom_left + 1)]
+            gl_commands.append((len(strip), strip))
+        else:
+            for c in range(columns - 1):
+                top_left, bottom_left = r * columns + c, (r + 1) * columns + c
+                fan = [top_left, bottom_left, bottom_left + 1, top_left + 1]
+                faces += [(top_left, bottom_left, bottom_left + 1), (top_left, bottom_left + 1, top_left + 1)]
+                gl_commands.append((-len(fan), fan))
+
+    face_data = b''.join(struct.pack('<6h', *face, *face) for face in faces)
+
+    gl_data = bytearray()
+    for count, vertices in gl_commands:
+        gl_data += struct.pack('<i', count)
+        for vertex in vertices:
+            # GL texture coordinates address texel centers scaled to 0..1.
+            gl_data += struct.pack('<ffi', (tex_coords[vertex, 0] + 0.5) / skin_width, (tex_coords[vertex, 1] + 0.5) / skin_height, vertex)
+    gl_data += struct.pack('<i', 0)
+
+    frame_data = bytearray()
+    frame_index = 0
+    angle = 2 * math.pi * 0.9 * column / max(columns - 1, 1)
+    for name, num_frames in sequences:
+        for sequence_frame in range(num_frames):
+            radius = 20 + 3 * np.sin(frame_index * 0.3 + row * 0.5)
+            positions = np.stack([radius * np.cos(angle), radius * np.sin(angle), row * 3.0 - 1.5 * rows], axis=1)
+            positions += rng.normal(0, 0.2, positions.shape)
+
+            minimum = positions.min(axis=0)
+            scale = np.maximum(positions.max(axis=0) - minimum, 1e-6) / 255
+            packed = np.empty((num_vertices, 4), dtype=np.uint8)
+            packed[:, :3] = np.clip(np.round((positions - minimum) / scale), 0, 255)
+            packed[:, 3] = rng.integers(0, 162, num_vertices)
+
+            frame_data += struct.pack('<6f16s', *scale, *minimum, f'{name}{sequence_frame + 1:02d}'.encode('ascii'))
+            frame_data += packed.tobytes()
+            frame_index += 1
+
+    offset_skins = 68
+    offset_tex_coords = offset_skins
+    offset_faces = offset_tex_coords + tex_coords.nbytes
+    offset_frames = offset_faces + len(face_data)
+    offset_gl_commands = offset_frames + len(frame_data)
+    offset_end = offset_gl_commands + len(gl_data)
+
+    with open(filename, 'wb') as f:
+        f.write(b'IDP2' + struct.pack('<i', 8))
+        f.write(struct.pack('<15i', skin_width, skin_height, 40 + num_vertices * 4, 0, num_vertices, num_vertices, len(faces), len(gl_data) // 4,
+                            frame_index, offset_skins, offset_tex_coords, offset_faces, offset_frames, offset_gl_commands, offset_end))
+        f.write(tex_coords.tobytes())
+        f.write(face_data)
+        f.write(frame_data)
+        f.write(gl_data)
+
+def encode_pcx_rle(image: np.ndarray, bytes_per_line: int) -> bytes:
+    """Run length encodes an 8-bit image the way PCX files do, one scan line at a time.
+
+    Args:
+        image (np.ndarray): The image indexed [y, x].
+        bytes_per_line (int): The padded length of each scan line, at least the width of the image.
+
+    Returns:
+        bytes: The encoded scan lines.
+    """
+    encoded = bytearray()
+    for line in image:
+        line = list(line) + [0] * (bytes_per_line - len(line))
+        start = 0
+        while start < len(line):
+            end = start
+            while end < len(line) and line[end] == line[start] and end - start < 63:
+                end += 1
+            if end - start > 1 or line[start] >= 192:
+                encoded += bytes((192 + end - start, line[start]))
+            else:
+                encoded.append(line[start])
+            start = end
+    return bytes(encoded)
+
+def write_pcx(filename: str, width: int = 64, height: int = 64, seed: int = 0, padding: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Writes a synthetic 8-bit, run length encoded PCX skin made of flat blocks with some noise, like a typical skin.
+
+    Args:
+        filename (str): The full path of the pcx file to write.
+        width (int, optional): The width of the image. Defaults to 64.
+        height (int, optional): The height of the image. Defaults to 64.
+        seed (int, optional): The seed for the noise and palette. Defaults to 0.
+        padding (int, optional): Extra bytes at the end of each scan line. Defaults to 0.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The image indexed [y, x] and the 256 x 3 palette that were written.
+    """
+    rng = np.random.default_rng(seed)
+    image = (np.add.outer(np.arange(height) // 4, np.arange(width) // 8) % 256).astype(np.uint8)
+    noise = rng.random((height, width)) < 0.1
+    image[noise] = rng.integers(0, 256, int(noise.sum()))
+    palette = rng.integers(0, 256, (256, 3)).astype(np.uint8)
+
+    bytes_per_line = width + padding
+    header = struct.pack(PCX_HEADER_FORMAT, 10, 5, 1, 8, 0, 0, width - 1, height - 1, 72, 72, b'', 0, 1, bytes_per_line, 1, b'')
+
+    with open(filename, 'wb') as f:
+        f.write(header)
+        f.write(encode_pcx_rle(image, bytes_per_line))
+        f.write(b'\x0c')
+        f.write(palette.tobytes())
+
+    return image, palette
+
+def write_model(directory: str, name: str = 'tris', rows: int = 20, columns: int = 25, skin_size: int = 64, seed: int = 0,
+                sequences: Sequence[Tuple[str, int]] = (('stand', 10), ('run', 8), ('attack', 6))) -> str:
+    """Writes a synthetic model and its skin side by side.
+
+    Args:
+        directory (str): The directory to write to.
+        name (str, optional): The base name of the md2 and pcx files. Defaults to 'tris'.
+        rows (int, optional): The number of rings of vertices. Defaults to 20.
+        columns (int, optional): The number of vertices in each ring. Defaults to 25.
+        skin_size (int, optional): The width and height of the skin. Defaults to 64.
+        seed (int, optional): The seed for the random parts of the model and skin. Defaults to 0.
+        sequences (Sequence[Tuple[str, int]], optional): The name and number of frames of each animation sequence. Defaults to stand, run, and attack.
+
+    Returns:
+        str: The full path of the md2 file.
+    """
+    quake_filename = os.path.join(directory, name + '.md2')
+    write_md2(quake_filename, rows, columns, sequences, skin_size, skin_size, seed)
+    write_pcx(os.path.join(directory, name + '.pcx'), skin_size, skin_size, seed)
+    return quake_filename
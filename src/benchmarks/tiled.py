@@ -0,0 +1,77 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import write_model
+from graphics import Graphics
+from model import QuakeModel
+from point2d import Point2d
+from rasterizer import Rasterizer
+from render_type import RenderType
+from tiled_renderer import TiledRenderer
+
+# Measures how the tiled renderer scales with the number of workers, and checks that it draws the same pixels as one
+# Graphics object drawing the whole frame.
+#
+# Run from the src directory: python -m benchmarks.tiled [tris.md2]
+
+def main():
+    """Times the tiled renderer with each worker count and compares it with drawing on one core."""
+    cpu_count = os.cpu_count() or 1
+
+    parser = argparse.ArgumentParser(description='Tiled multi-core rasterizer scaling benchmark')
+    parser.add_argument('quake_model', nargs='?', help='Quake model verison 2 md2 file, or a synthetic model when omitted')
+    parser.add_argument('--frames', type=int, default=5, help='the number of frames to draw with each worker count')
+    parser.add_argument('--scale', type=float, default=4, help='the scale of the model')
+    parser.add_argument('--tile-size', type=int, default=64, help='the width and height of a tile in pixels')
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, 8, cpu_count} & set(range(1, cpu_count + 1))), help='the worker counts to time')
+    parser.add_argument('--threads', action='store_true', help='draw on a thread pool instead of a process pool')
+    parser.add_argument('--barycentric', action='store_true', help='fill triangles with the barycentric rasterizer')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        quake_filename = args.quake_model or write_model(directory, rows=40, columns=50)
+        pcx_filename = os.path.splitext(quake_filename)[0] + '.pcx'
+
+        model = QuakeModel(RenderType.TEXTURED)
+        model.from_file(quake_filename, pcx_filename, use_cache=False)
+
+    model.rotate(0, 180, 120)
+    model.translate(85, -250, 70)
+    model.scale(args.scale)
+    batch = model.triangle_batch().sorted_by_depth()
+    rasterizer = Rasterizer.BARYCENTRIC if args.barycentric else Rasterizer.EDGE_WALK
+
+    graphics = Graphics(rasterizer)
+    graphics.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        expected = np.zeros((1000, 1000), dtype=np.uint32)
+        graphics.draw_triangle_batch(batch, expected)
+    single = (time.perf_counter() - start) / args.frames
+
+    print(f'{len(batch)} triangles, {args.tile_size} pixel tiles, {"threads" if args.threads else "processes"}, {cpu_count} CPUs')
+    print(f'{"workers":>8} {"ms/frame":>9} {"speedup":>8}')
+    print(f'{"single":>8} {single * 1000:>9.1f} {1:>7.2f}x')
+
+    for workers in args.workers:
+        with TiledRenderer(tile_size=args.tile_size, workers=workers, graphics=Graphics(rasterizer), use_threads=args.threads) as renderer:
+            # The first frame starts the workers.
+            renderer.draw_triangle_batch(batch)
+
+            start = time.perf_counter()
+            for _ in range(args.frames):
+                renderer.clear()
+                renderer.draw_triangle_batch(batch)
+            elapsed = (time.perf_counter() - start) / args.frames
+
+            if not np.array_equal(renderer.buffer, expected):
+                raise RuntimeError(f'The tiled renderer with {workers} workers drew {np.count_nonzero(renderer.buffer != expected)} different pixels')
+
+        print(f'{workers:>8} {elapsed * 1000:>9.1f} {single / elapsed:>7.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pygame
+
+from benchmarks.synthetic import write_model
+from graphics import Graphics
+from model import QuakeModel
+from point2d import Point2d
+from render_type import RenderType
+
+# Compares drawing a wireframe as three pygame lines per triangle with drawing the model's unique edges all at once, and
+# checks that every edge of every triangle is drawn exactly once. The two draw lines with slightly different steps, so
+# a few pixels may differ.
+#
+# Run from the src directory: python -m benchmarks.wireframe [tris.md2]
+
+def draw_triangle_lines(model: QuakeModel, surface: pygame.Surface) -> None:
+    """The per-triangle wireframe drawing that main used before the edge list, drawing each shared edge twice.
+
+    Args:
+        model (QuakeModel): The model to draw.
+        surface (pygame.Surface): The surface to draw to.
+    """
+    surface.fill(0)
+    for vertex_1, vertex_2, vertex_3 in model.triangle_batch().screen.tolist():
+        pygame.draw.line(surface, (255, 255, 255), vertex_1, vertex_2)
+        pygame.draw.line(surface, (255, 255, 255), vertex_2, vertex_3)
+        pygame.draw.line(surface, (255, 255, 255), vertex_3, vertex_1)
+
+def draw_edge_lines(model: QuakeModel, graphics: Graphics, buffer: np.ndarray) -> None:
+    """Draws the model's unique edges into a buffer in one pass.
+
+    Args:
+        model (QuakeModel): The model to draw.
+        graphics (Graphics): The graphics object to draw with.
+        buffer (np.ndarray): The buffer to draw to.
+    """
+    buffer.fill(0)
+    graphics.draw_lines(model.wireframe_edges(), 0xFFFFFFFF, buffer)
+
+def main():
+    """Times both ways of drawing a wireframe and compares the edges and pixels they draw."""
+    parser = argparse.ArgumentParser(description='Wireframe drawing benchmark')
+    parser.add_argument('quake_model', nargs='?', help='Quake model verison 2 md2 file, or a synthetic model when omitted')
+    parser.add_argument('--frames', type=int, default=10, help='the number of times to draw the frame each way')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        quake_filename = args.quake_model or write_model(directory, rows=40, columns=50)
+        pcx_filename = os.path.splitext(quake_filename)[0] + '.pcx'
+
+        model = QuakeModel(RenderType.WIREFRAME)
+        model.from_file(quake_filename, pcx_filename, use_cache=False)
+
+    model.rotate(0, 180, 120)
+    model.translate(85, -250, 70)
+
+    triangle_edges = {tuple(sorted(pair)) for face in model._face_vertices.tolist() for pair in zip(face, face[1:] + face[:1])}
+    if sorted(triangle_edges) != [tuple(edge) for edge in model._get_edges()[0].tolist()]:
+        raise RuntimeError('The edge list does not hold every edge of every triangle exactly once')
+
+    surface = pygame.Surface((1000, 1000))
+    buffer = np.zeros((1000, 1000), dtype=np.uint32)
+    graphics = Graphics()
+    graphics.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        draw_triangle_lines(model, surface)
+    triangle_time = (time.perf_counter() - start) / args.frames
+
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        draw_edge_lines(model, graphics, buffer)
+    edge_time = (time.perf_counter() - start) / args.frames
+
+    triangle_pixels = pygame.surfarray.array2d(surface) != 0
+    edge_pixels = buffer != 0
+
+    print(f'{model.header.num_faces} triangles, {3 * model.header.num_faces} triangle edges, {len(model._get_edges()[0])} unique edges')
+    print(f'per-triangle lines {triangle_time * 1000:8.2f} ms {np.count_nonzero(triangle_pixels):>8} pixels')
+    print(f'unique edges       {edge_time * 1000:8.2f} ms {np.count_nonzero(edge_pixels):>8} pixels')
+    print(f'speedup            {triangle_time / edge_time:8.2f}x {np.count_nonzero(triangle_pixels != edge_pixels):>8} pixels differ')
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,39 @@
 import os
-from typing import Generator
+from typing import Generator, Optional, Tuple, Union
 
+from nptyping import NDArray, Shape, Int32
+import numpy as np
+
+from frame_storage import FrameStorage
 from model import QuakeModel
+from point2d import Point2d
 from render_type import RenderType
+from textured_strip import TexturedStrip
 from textured_triangle import TexturedTriangle
+from triangle_batch import TriangleBatch
 
 class Character:
-    def __init__(self, render_type: RenderType, quake_filename: str, weapon_filename: str):
+    def __init__(self, render_type: RenderType, quake_filename: str, weapon_filename: str, frame_storage: FrameStorage = FrameStorage.EAGER, frame_cache_size: Optional[int] = 32, frame_cache_bytes: Optional[int] = None, use_cache: bool = True, cache_dir: Optional[str] = None):
         """The constructor for the Character class.
 
         Args:
             render_type (RenderType): Whether to render the character as textured or wireframe.
             quake_filename (str): The full path to the Quake model version 2 md2 file for the character.
             weapon_filename (str): The full path to the Quake model version 2 md2 file for the weapon.
+            frame_storage (FrameStorage, optional): How the animation frames of both models are stored. Defaults to FrameStorage.EAGER.
+            frame_cache_size (Optional[int], optional): The most decoded frames kept per model with lazy frame storage. Defaults to 32.
+            frame_cache_bytes (Optional[int], optional): The most bytes of decoded frames kept per model with lazy frame storage. Defaults to None.
+            use_cache (bool, optional): Whether to load the models and textures through their compiled caches. Defaults to True.
+            cache_dir (Optional[str], optional): The directory for the compiled caches, or None to keep them next to the models. Defaults to None.
         """
         character_pcx_filename = Character._get_pcx_filename(quake_filename)
         weapon_pcx_filename = Character._get_pcx_filename(weapon_filename)
 
-        self._model = QuakeModel(render_type)
-        self._model.from_file(quake_filename, character_pcx_filename)
+        self._model = QuakeModel(render_type, frame_storage, frame_cache_size, frame_cache_bytes)
+        self._model.from_file(quake_filename, character_pcx_filename, use_cache, cache_dir)
         
-        self._weapon = QuakeModel(render_type)
-        self._weapon.from_file(weapon_filename, weapon_pcx_filename)
+        self._weapon = QuakeModel(render_type, frame_storage, frame_cache_size, frame_cache_bytes)
+        self._weapon.from_file(weapon_filename, weapon_pcx_filename, use_cache, cache_dir)
         
         self.rotate(0, 180, 90)
         self.translate(85, -250, 70)
@@ -37,6 +49,16 @@ class Character:
         self._model.render_type = render_type
         self._weapon.render_type = render_type
 
+    @property
+    def use_gl_commands(self) -> bool:
+        """Whether textured frames are built from the triangle strips and fans in the models' GL commands."""
+        return self._model.use_gl_commands
+
+    @use_gl_commands.setter
+    def use_gl_commands(self, use_gl_commands: bool) -> None:
+        self._model.use_gl_commands = use_gl_commands
+        self._weapon.use_gl_commands = use_gl_commands
+
     @property
     def rotate_x(self) -> int:
         """The rotation angle around the x-axis in degrees."""
@@ -52,6 +74,11 @@ class Character:
         """The rotation angle around the z-axis in degrees."""        
         return self._rotate_z
     
+    @property
+    def clip_stats(self) -> QuakeModel.ClipStats:
+        """The number of triangles rejected and clipped for the character and weapon when the last batch was built."""
+        return QuakeModel.ClipStats(*(model + weapon for model, weapon in zip(self._model.clip_stats, self._weapon.clip_stats)))
+    
     @property
     def size(self) -> float:
         """The scale factor for the character."""
@@ -61,12 +88,42 @@ class Character:
     def sequence_name(self) -> str:
         """The name of the current sequence."""
         return self._model.sequence_name
+    
+    @property
+    def frames(self) -> Tuple[int, int]:
+        """The indices of the current animation frames of the character and the weapon."""
+        return self._model.frame, self._weapon.frame
+    
+    @frames.setter
+    def frames(self, frames: Tuple[int, int]) -> None:
+        self._model.frame, self._weapon.frame = frames
      
+    def __enter__(self) -> 'Character':
+        return self
+    
+    def __exit__(self, *args) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Releases the memory mapped model files of lazy frame storage."""
+        self._model.close()
+        self._weapon.close()
+    
     def advance_frame(self) -> None:
         """Advance the current frame in the current sequence. If the current frame is the last frame in the sequence, then the current frame will be set to the first frame in the sequence."""
         self._model.advance_frame()
         self._weapon.advance_frame()
     
+    def animate(self, frames: int, blend: float) -> None:
+        """Advance the character and weapon by whole animation frames and blend them toward the frames after, as an animation clock asks.
+
+        Args:
+            frames (int): The number of animation frames to advance.
+            blend (float): How far to blend toward the next frames, from 0 up to but not including 1.
+        """
+        self._model.animate(frames, blend)
+        self._weapon.animate(frames, blend)
+    
     def advance_sequence(self) -> None:
         """Advance the current sequence. If the current sequence is the last sequence, then the current sequence will be set to the first sequence."""
         self._model.advance_sequence()
@@ -112,14 +169,40 @@ class Character:
         self._model.translate(x, y, z)
         self._weapon.translate(x, y, z)
     
-    def triangle_in_frame(self) -> Generator[TexturedTriangle, None, None]:
-        """Yield the triangles in the current frame for the character."""
+    def wireframe_edges(self, hide_back_faces: bool = False) -> NDArray[Shape['*, 2, 2'], Int32]:
+        """Project the unique edges in the current frame for the character followed by those for the weapon.
+
+        Args:
+            hide_back_faces (bool, optional): Whether to only include the edges of faces pointing toward the viewer. Defaults to False.
+
+        Returns:
+            NDArray[Shape['*, 2, 2'], Int32]: The screen coordinates of both ends of each edge.
+        """
+        return np.concatenate((self._model.wireframe_edges(hide_back_faces), self._weapon.wireframe_edges(hide_back_faces)))
+    
+    def set_clip(self, min: Optional[Point2d], max: Optional[Point2d], perspective_correct: bool = False) -> None:
+        """Set the clipping rectangle the character is drawn into, so triangles that miss it are rejected before drawing.
+
+        Args:
+            min (Optional[Point2d]): The minimum point of the rectangle, or None to only clip to the near plane.
+            max (Optional[Point2d]): The maximum point of the rectangle, or None to only clip to the near plane.
+            perspective_correct (bool, optional): Whether the character is drawn with perspective correction. Defaults to False.
+        """
+        self._model.set_clip(min, max, perspective_correct)
+        self._weapon.set_clip(min, max, perspective_correct)
+    
+    def triangle_in_frame(self) -> Generator[Union[TexturedTriangle, TexturedStrip], None, None]:
+        """Yield the triangles, or the triangle strips and fans when using GL commands, in the current frame for the character."""
         for triangle in self._model.triangle_in_frame():
             yield triangle
         
         for triangle in self._weapon.triangle_in_frame():
             yield triangle
         
+    def triangle_batch(self) -> TriangleBatch:
+        """Build one batch with the triangles in the current frame for the character followed by those for the weapon."""
+        return TriangleBatch.concatenate([self._model.triangle_batch(), self._weapon.triangle_batch()])
+        
     @staticmethod
     def _get_pcx_filename(filename: str) -> str:
         """A static method to get the pcx filename for the given filename.
@@ -0,0 +1,177 @@
+from typing import List, Tuple
+
+from nptyping import NDArray, Shape, Bool, Float32, Int32
+import numpy as np
+
+from point2d import Point2d
+
+# Clipping between projection and rasterization. Triangles that cross the near plane are clipped in world space, before
+# they are divided by their depth. On screen, triangles are only clipped when they reach past a guard band around the
+# clip rectangle; anything inside the guard band is left for the rasterizer to clip one scanline at a time, which is
+# cheaper than splitting the triangle.
+
+def clip_polygon(polygon: NDArray[Shape['*, *'], Float32], distances: NDArray[Shape['*'], Float32]) -> NDArray[Shape['*, *'], Float32]:
+    """Clips a convex polygon to one side of a plane. Every attribute of the vertices is interpolated linearly where an
+    edge crosses the plane.
+
+    Args:
+        polygon (NDArray[Shape['*, *'], Float32]): The attributes of each vertex of the polygon, in order.
+        distances (NDArray[Shape['*'], Float32]): The distance of each vertex from the plane. Vertices with a distance of
+        zero or more are kept.
+
+    Returns:
+        NDArray[Shape['*, *'], Float32]: The vertices of the clipped polygon, which has fewer than three vertices when
+        nothing is left.
+    """
+    clipped = []
+    for i in range(len(polygon)):
+        j = (i + 1) % len(polygon)
+        if distances[i] >= 0:
+            clipped.append(polygon[i])
+
+        if (distances[i] >= 0) != (distances[j] >= 0):
+            t = distances[i] / (distances[i] - distances[j])
+            clipped.append(polygon[i] + (polygon[j] - polygon[i]) * t)
+
+    return np.array(clipped, dtype=polygon.dtype).reshape((-1, polygon.shape[1]))
+
+def triangulate(polygons: List[NDArray[Shape['*, *'], Float32]], num_attributes: int) -> NDArray[Shape['*, 3, *'], Float32]:
+    """Splits convex polygons into triangle fans around their first vertex, keeping their winding.
+
+    Args:
+        polygons (List[NDArray[Shape['*, *'], Float32]]): The attributes of each vertex of each polygon.
+        num_attributes (int): The number of attributes of each vertex.
+
+    Returns:
+        NDArray[Shape['*, 3, *'], Float32]: The attributes of each vertex of each triangle.
+    """
+    triangles = [(polygon[0], polygon[i], polygon[i + 1]) for polygon in polygons for i in range(1, len(polygon) - 1)]
+    return np.array(triangles, dtype=np.float64).reshape((-1, 3, num_attributes))
+
+def clip_to_near_plane(world: NDArray[Shape['*, 3, 3'], Float32], skin: NDArray[Shape['*, 3, 2'], Float32], near_plane: float) -> Tuple[NDArray[Shape['*, 3, 3'], Float32], NDArray[Shape['*, 3, 2'], Float32]]:
+    """Clips triangles in world space to the part in front of the near plane. A triangle with one vertex behind the plane
+    becomes two triangles and a triangle with two vertices behind it becomes one.
+
+    Args:
+        world (NDArray[Shape['*, 3, 3'], Float32]): The world coordinates of each vertex of each triangle.
+        skin (NDArray[Shape['*, 3, 2'], Float32]): The skin coordinates of each vertex of each triangle.
+        near_plane (float): The world y of the near plane. Points with a y at or below it are in front of the viewer.
+
+    Returns:
+        Tuple[NDArray[Shape['*, 3, 3'], Float32], NDArray[Shape['*, 3, 2'], Float32]]: The world and skin coordinates of
+        each vertex of the clipped triangles.
+    """
+    attributes = np.concatenate((world, skin), axis=2).astype(np.float64)
+    polygons = [clip_polygon(triangle, near_plane - triangle[:, 1]) for triangle in attributes]
+
+    triangles = triangulate(polygons, 5)
+    return triangles[:, :, :3].astype(np.float32), triangles[:, :, 3:].astype(np.float32)
+
+def clip_to_rectangle(screen: NDArray[Shape['*, 3, 2'], Int32], skin: NDArray[Shape['*, 3, 2'], Float32], vertex_depths: NDArray[Shape['*, 3'], Float32], clip_min: Point2d, clip_max: Point2d,
+                      perspective_correct: bool = True) -> Tuple[NDArray[Shape['*, 3, 2'], Int32], NDArray[Shape['*, 3, 2'], Float32], NDArray[Shape['*, 3'], Float32]]:
+    """Clips projected triangles to a rectangle on the screen. The inverse depth is what changes linearly across the
+    screen, so it is interpolated and the new vertices get correct depths. With perspective correction the skin
+    coordinates over depth are interpolated too, giving perspective correct skin coordinates. Without it the skin
+    coordinates are interpolated linearly across the screen, the way the rasterizer maps them, so the texture does not
+    move where a triangle is clipped.
+
+    Args:
+        screen (NDArray[Shape['*, 3, 2'], Int32]): The screen coordinates of each vertex of each triangle.
+        skin (NDArray[Shape['*, 3, 2'], Float32]): The skin coordinates of each vertex of each triangle.
+        vertex_depths (NDArray[Shape['*, 3'], Float32]): The world depth of each vertex of each triangle.
+        clip_min (Point2d): The top left corner of the rectangle.
+        clip_max (Point2d): The bottom right corner of the rectangle.
+        perspective_correct (bool, optional): Whether the triangles are textured with perspective correction. Defaults to True.
+
+    Returns:
+        Tuple[NDArray[Shape['*, 3, 2'], Int32], NDArray[Shape['*, 3, 2'], Float32], NDArray[Shape['*, 3'], Float32]]: The
+        screen and skin coordinates and the depths of each vertex of the clipped triangles.
+    """
+    inverse_depths = -1 / vertex_depths.astype(np.float64)
+    if perspective_correct:
+        skin = skin * inverse_depths[:, :, np.newaxis]
+    attributes = np.concatenate((screen, skin, inverse_depths[:, :, np.newaxis]), axis=2)
+
+    polygons = []
+    for polygon in attributes:
+        for distances in (lambda p: p[:, 0] - clip_min.x, lambda p: clip_max.x - p[:, 0], lambda p: p[:, 1] - clip_min.y, lambda p: clip_max.y - p[:, 1]):
+            polygon = clip_polygon(polygon, distances(polygon))
+
+        polygons.append(polygon)
+
+    triangles = triangulate(polygons, 5)
+    inverse_depths = triangles[:, :, 4]
+    skin = triangles[:, :, 2:4]
+    if perspective_correct:
+        skin = skin / inverse_depths[:, :, np.newaxis]
+    return (np.rint(triangles[:, :, :2]).astype(np.int32),
+            skin.astype(np.float32),
+            (-1 / inverse_depths).astype(np.float32))
+
+def outside_rectangle(screen: NDArray[Shape['*, 3, 2'], Int32], clip_min: Point2d, clip_max: Point2d) -> NDArray[Shape['*'], Bool]:
+    """Finds the triangles that cannot cover any pixel of a rectangle because their bounding box misses it. The edge walk
+    fills the pixels from the leftmost vertex up to, but not including, the rightmost one, and likewise for rows.
+
+    Args:
+        screen (NDArray[Shape['*, 3, 2'], Int32]): The screen coordinates of each vertex of each triangle.
+        clip_min (Point2d): The top left corner of the rectangle.
+        clip_max (Point2d): The bottom right corner of the rectangle.
+
+    Returns:
+        NDArray[Shape['*'], Bool]: Whether each triangle is outside of the rectangle.
+    """
+    low = screen.min(axis=1)
+    high = screen.max(axis=1)
+
+    return (high[:, 0] <= clip_min.x) | (low[:, 0] >= clip_max.x) | (high[:, 1] <= clip_min.y) | (low[:, 1] >= clip_max.y)
+
+def clip_segments_to_near_plane(world: NDArray[Shape['*, 2, 3'], Float32], near_plane: float) -> NDArray[Shape['*, 2, 3'], Float32]:
+    """Moves the ends of line segments that are behind the near plane onto it. Segments must have at least one end in
+    front of the plane.
+
+    Args:
+        world (NDArray[Shape['*, 2, 3'], Float32]): The world coordinates of both ends of each segment.
+        near_plane (float): The world y of the near plane. Points with a y at or below it are in front of the viewer.
+
+    Returns:
+        NDArray[Shape['*, 2, 3'], Float32]: The world coordinates of both ends of each clipped segment.
+    """
+    distances = near_plane - world[:, :, 1]
+    clipped = world.copy()
+
+    for end, other in ((0, 1), (1, 0)):
+        behind = distances[:, end] < 0
+        t = distances[behind, end] / (distances[behind, end] - distances[behind, other])
+        clipped[behind, end] = world[behind, end] + (world[behind, other] - world[behind, end]) * t[:, np.newaxis]
+
+    return clipped
+
+def clip_lines_to_rectangle(lines: NDArray[Shape['*, 2, 2'], Float32], clip_min: Point2d, clip_max: Point2d) -> NDArray[Shape['*, 2, 2'], Float32]:
+    """Clips lines to a rectangle with the Liang-Barsky algorithm, all lines at once.
+
+    Args:
+        lines (NDArray[Shape['*, 2, 2'], Float32]): The screen coordinates of both ends of each line.
+        clip_min (Point2d): The top left corner of the rectangle.
+        clip_max (Point2d): The bottom right corner of the rectangle, which is inside it.
+
+    Returns:
+        NDArray[Shape['*, 2, 2'], Float32]: The screen coordinates of both ends of the part of each line inside the
+        rectangle. Lines that miss the rectangle are left out.
+    """
+    start = lines[:, 0]
+    delta = lines[:, 1] - start
+    enter = np.zeros(len(lines))
+    leave = np.ones(len(lines))
+    inside = np.ones(len(lines), dtype=np.bool_)
+
+    for direction, distance in ((-delta[:, 0], start[:, 0] - clip_min.x), (delta[:, 0], clip_max.x - start[:, 0]),
+                                (-delta[:, 1], start[:, 1] - clip_min.y), (delta[:, 1], clip_max.y - start[:, 1])):
+        inside &= (direction != 0) | (distance >= 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = distance / direction
+
+        enter = np.where(direction < 0, np.maximum(enter, t), enter)
+        leave = np.where(direction > 0, np.minimum(leave, t), leave)
+
+    inside &= enter <= leave
+    return np.stack((start + enter[:, np.newaxis] * delta, start + leave[:, np.newaxis] * delta), axis=1)[inside]
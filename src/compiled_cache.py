@@ -0,0 +1,148 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# A compiled cache file holds the decoded arrays for one source file so they can be memory mapped instead of parsed.
+#
+# Layout:
+#   magic (4 bytes) | version (uint32) | index size (uint64) | index (utf-8 JSON) | padding | arrays, each ALIGNMENT aligned
+#
+# The index records the kind of source, the size, modification time, and SHA-256 of the source file, any metadata, and
+# the dtype, shape, and offset from the start of the array data of every array.
+
+MAGIC = b'CADC'
+VERSION = 3
+ALIGNMENT = 64
+CACHE_EXTENSION = '.cache'
+
+_prefix = struct.Struct('<4sIQ')
+
+def cache_filename(source_filename: str, cache_dir: Optional[str] = None) -> str:
+    """Gets the name of the compiled cache file for a source file.
+
+    Args:
+        source_filename (str): The full path to the source file.
+        cache_dir (Optional[str], optional): The directory to keep cache files in, or None to keep them next to the source file. Defaults to None.
+
+    Returns:
+        str: The full path to the cache file.
+    """
+    if cache_dir is None:
+        return source_filename + CACHE_EXTENSION
+
+    digest = hashlib.sha1(os.path.abspath(source_filename).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f'{os.path.basename(source_filename)}.{digest}{CACHE_EXTENSION}')
+
+def read(filename: str, source_filename: str, kind: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+    """Reads a compiled cache file if it exists and is still valid for its source file.
+
+    Args:
+        filename (str): The full path to the cache file.
+        source_filename (str): The full path to the source file the cache was built from.
+        kind (str): The kind of data the cache must hold, such as 'md2' or 'pcx'.
+
+    Returns:
+        Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]: The read only, memory mapped arrays and the metadata, or None if
+        the cache is missing, stale, or unreadable.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, index_size = _prefix.unpack_from(mapped_file)
+        if magic != MAGIC or version != VERSION:
+            return None
+
+        index = json.loads(mapped_file[_prefix.size:_prefix.size + index_size].decode('utf-8'))
+        if index['kind'] != kind or not _source_matches(source_filename, index['source']):
+            return None
+
+        data_start = _align(_prefix.size + index_size)
+        arrays = {}
+        for name, entry in index['arrays'].items():
+            dtype = np.dtype(entry['dtype'])
+            shape = tuple(entry['shape'])
+            arrays[name] = np.frombuffer(mapped_file, dtype=dtype, count=int(np.prod(shape)), offset=data_start + entry['offset']).reshape(shape)
+
+        return arrays, index['metadata']
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
+
+def write(filename: str, source_filename: str, kind: str, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> bool:
+    """Writes a compiled cache file. The file is written to a temporary file first and then moved into place.
+
+    Args:
+        filename (str): The full path to the cache file.
+        source_filename (str): The full path to the source file the cache is built from.
+        kind (str): The kind of data the cache holds, such as 'md2' or 'pcx'.
+        arrays (Dict[str, np.ndarray]): The arrays to store.
+        metadata (Dict[str, Any]): Any other values to store. They must be JSON serializable.
+
+    Returns:
+        bool: Whether the cache was written. Failing to write a cache is not an error.
+    """
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+
+    try:
+        index = json.dumps({'kind': kind, 'source': _source_key(source_filename), 'metadata': metadata, 'arrays': entries}).encode('utf-8')
+        data_start = _align(_prefix.size + len(index))
+
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temp_filename = tempfile.mkstemp(dir=directory, suffix=CACHE_EXTENSION)
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                f.write(_prefix.pack(MAGIC, VERSION, len(index)))
+                f.write(index)
+                for name, array in arrays.items():
+                    f.seek(data_start + entries[name]['offset'])
+                    f.write(np.ascontiguousarray(array).tobytes())
+            os.replace(temp_filename, filename)
+        except OSError:
+            os.remove(temp_filename)
+            raise
+    except OSError:
+        return False
+
+    return True
+
+def _align(offset: int) -> int:
+    """Rounds an offset up to the next multiple of ALIGNMENT."""
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _content_hash(filename: str) -> str:
+    """Computes the SHA-256 of a file's contents as a hex string."""
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _source_key(filename: str) -> Dict[str, Any]:
+    """Gets the size, modification time, and content hash that identify a version of a source file."""
+    stat = os.stat(filename)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _content_hash(filename)}
+
+def _source_matches(filename: str, key: Dict[str, Any]) -> bool:
+    """Checks whether a source file is the version a cache was built from. The content hash is only computed when the
+    size matches but the modification time does not, for example after the file is copied or touched.
+
+    Args:
+        filename (str): The full path to the source file.
+        key (Dict[str, Any]): The key stored in the cache.
+
+    Returns:
+        bool: Whether the source file matches the key.
+    """
+    stat = os.stat(filename)
+    if stat.st_size != key['size']:
+        return False
+
+    return stat.st_mtime_ns == key['mtime_ns'] or _content_hash(filename) == key['sha256']
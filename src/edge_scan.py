@@ -14,4 +14,10 @@ class EdgeScan:
     dest_x_direction: int = 0
     dest_x_error_term: int = 0
     dest_x_adj_up: int = 0
-    dest_x_adj_down: int = 0
\ No newline at end of file
+    dest_x_adj_down: int = 0
+    inverse_depth: float = 0.0
+    inverse_depth_step: float = 0.0
+    source_over_z_x: float = 0.0
+    source_over_z_y: float = 0.0
+    source_over_z_step_x: float = 0.0
+    source_over_z_step_y: float = 0.0
\ No newline at end of file
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 from pcx import Pcx
 from point2d import Point2d
@@ -8,4 +8,5 @@ from point2d import Point2d
 class Face:
     triangle_verts: List[Point2d]
     skin_verts: List[Point2d]
-    texture: Pcx
\ No newline at end of file
+    texture: Pcx
+    inverse_depths: Optional[List[float]] = None
\ No newline at end of file
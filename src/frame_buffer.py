@@ -0,0 +1,93 @@
+from collections import namedtuple
+from typing import List, Optional, Sequence
+
+from nptyping import NDArray, Shape, Float32, Int, UInt32
+import numpy as np
+import pygame
+
+class FrameBuffer:
+    Stats = namedtuple('Stats', 'cleared_bytes uploaded_bytes')
+
+    def __init__(self, width: int, height: int, buffer: Optional[NDArray[Shape['*,*'], UInt32]] = None):
+        """The constructor for the FrameBuffer class, a frame buffer kept from frame to frame. Only the region drawn in the
+        last frame is cleared, and only the regions drawn in the last frame and this one are copied to the screen.
+
+        Args:
+            width (int): The width of the frame buffer.
+            height (int): The height of the frame buffer.
+            buffer (Optional[NDArray[Shape['*,*'], UInt32]], optional): The buffer to manage, such as a tiled renderer's
+            buffer in shared memory, or None to allocate one. Defaults to None.
+        """
+        self.buffer = buffer if buffer is not None else np.zeros((width, height), dtype=np.uint32)
+        self._bounds = pygame.Rect(0, 0, width, height)
+        self._previous: Optional[pygame.Rect] = None
+        self._current: Optional[pygame.Rect] = None
+        self._cleared_bytes = 0
+        self._uploaded_bytes = 0
+
+    @property
+    def stats(self) -> Stats:
+        """The bytes of buffers cleared and the bytes copied to the screen in the last frame, counted separately."""
+        return FrameBuffer.Stats(self._cleared_bytes, self._uploaded_bytes)
+
+    @property
+    def bytes_touched(self) -> int:
+        """The bytes of buffers cleared and copied to the screen in the last frame."""
+        return self._cleared_bytes + self._uploaded_bytes
+
+    def begin_frame(self, points: NDArray[Shape['*, 2'], Int], depth_buffer: Optional[NDArray[Shape['*,*'], Float32]] = None) -> None:
+        """Starts a frame. Clears the region drawn in the last frame and records the bounding box of this frame's geometry.
+
+        Args:
+            points (NDArray[Shape['*, 2'], Int]): The screen coordinates of every vertex that will be drawn this frame.
+            depth_buffer (Optional[NDArray[Shape['*,*'], Float32]], optional): A depth buffer to clear in the same region,
+            or None when there is none. Defaults to None.
+        """
+        self._previous = self._current
+        self._cleared_bytes = 0
+
+        if self._previous is not None:
+            region = FrameBuffer._slices(self._previous)
+            self.buffer[region] = 0
+            self._cleared_bytes += self.buffer[region].nbytes
+
+            if depth_buffer is not None:
+                depth_buffer[region] = 0
+                self._cleared_bytes += depth_buffer[region].nbytes
+
+        self._current = None
+        if len(points) > 0:
+            low = points.min(axis=0)
+            high = points.max(axis=0)
+            # Lines include their last pixel, so the box reaches one pixel past the largest coordinate.
+            self._current = pygame.Rect(int(low[0]), int(low[1]), int(high[0] - low[0]) + 1, int(high[1] - low[1]) + 1).clip(self._bounds)
+            if self._current.width == 0 or self._current.height == 0:
+                self._current = None
+
+    def present(self, surface: pygame.Surface, overlays: Sequence[pygame.Rect] = ()) -> List[pygame.Rect]:
+        """Copies the regions drawn in the last frame and this one from the buffer to a surface, along with the regions under
+        any overlays, such as text, so they can be drawn again on top without blending with last frame's overlays.
+
+        Args:
+            surface (pygame.Surface): The surface to copy to, the same size as the buffer.
+            overlays (Sequence[pygame.Rect], optional): The regions of last frame's and this frame's overlays. Defaults to ().
+
+        Returns:
+            List[pygame.Rect]: The regions of the surface that changed, for pygame.display.update.
+        """
+        regions = [region for region in (self._previous, self._current) if region is not None]
+        dirty = [regions[0].unionall(regions[1:])] if regions else []
+        dirty.extend(overlay.clip(self._bounds) for overlay in overlays)
+
+        self._uploaded_bytes = 0
+        for region in dirty:
+            if region.width > 0 and region.height > 0:
+                pygame.surfarray.blit_array(surface.subsurface(region), self.buffer[FrameBuffer._slices(region)])
+                self._uploaded_bytes += region.width * region.height * self.buffer.itemsize
+
+        return dirty
+
+    @staticmethod
+    def _slices(rect: pygame.Rect) -> tuple:
+        """Gets the slices of a buffer, indexed by x and then y, covered by a rectangle."""
+        return slice(rect.left, rect.right), slice(rect.top, rect.bottom)
@@ -0,0 +1,117 @@
+from collections import namedtuple, OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+class FrameCache:
+    Stats = namedtuple('Stats', 'hits misses prefetches evictions frames nbytes')
+
+    def __init__(self, max_frames: Optional[int] = 32, max_bytes: Optional[int] = None):
+        """The constructor for the FrameCache class, a least recently used cache of decoded animation frames.
+
+        Args:
+            max_frames (Optional[int], optional): The most frames to keep, or None for no frame limit. Defaults to 32.
+            max_bytes (Optional[int], optional): The most bytes of frame arrays to keep, or None for no byte limit. Defaults to None.
+        """
+        self._max_frames = max_frames
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.prefetches = 0
+        self.evictions = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes held by the cached frame arrays."""
+        return self._nbytes
+
+    @property
+    def stats(self) -> Stats:
+        """A snapshot of the cache counters."""
+        return FrameCache.Stats(self.hits, self.misses, self.prefetches, self.evictions, len(self._entries), self._nbytes)
+
+    def get(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        """Gets a frame from the cache, decoding it with the loader on a miss.
+
+        Args:
+            key (Hashable): The key of the frame, usually its index.
+            loader (Callable[[Hashable], Any]): Decodes the frame for the key when it is not cached.
+
+        Returns:
+            Any: The decoded frame.
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+        self.misses += 1
+        return self._insert(key, loader(key))
+
+    def prefetch(self, key: Hashable, loader: Callable[[Hashable], Any]) -> None:
+        """Decodes a frame ahead of its first use. Prefetching does not count as a hit or a miss.
+
+        Args:
+            key (Hashable): The key of the frame, usually its index.
+            loader (Callable[[Hashable], Any]): Decodes the frame for the key when it is not cached.
+        """
+        if key not in self._entries:
+            self.prefetches += 1
+            self._insert(key, loader(key))
+
+    def clear(self) -> None:
+        """Drops every cached frame. The counters are kept."""
+        self._entries.clear()
+        self._nbytes = 0
+
+    def _insert(self, key: Hashable, frame: Any) -> Any:
+        """Adds a frame to the cache and evicts the least recently used frames until the cache is within its limits.
+
+        Args:
+            key (Hashable): The key of the frame.
+            frame (Any): The decoded frame.
+
+        Returns:
+            Any: The frame that was added.
+        """
+        nbytes = FrameCache._frame_nbytes(frame)
+        self._entries[key] = (frame, nbytes)
+        self._nbytes += nbytes
+
+        # The newest frame is always kept, even if it alone is over the byte budget.
+        while len(self._entries) > 1 and self._over_limit():
+            _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+            self._nbytes -= evicted_nbytes
+            self.evictions += 1
+
+        return frame
+
+    def _over_limit(self) -> bool:
+        """Whether the cache holds more than its frame or byte limit."""
+        if self._max_frames is not None and len(self._entries) > self._max_frames:
+            return True
+
+        return self._max_bytes is not None and self._nbytes > self._max_bytes
+
+    @staticmethod
+    def _frame_nbytes(frame: Any) -> int:
+        """Counts the bytes used by the arrays in a frame.
+
+        Args:
+            frame (Any): A frame, either an array or a tuple of fields that may include arrays.
+
+        Returns:
+            int: The total size in bytes of the frame's arrays.
+        """
+        if isinstance(frame, np.ndarray):
+            return frame.nbytes
+
+        return sum(field.nbytes for field in frame if isinstance(field, np.ndarray))
@@ -0,0 +1,156 @@
+from collections import namedtuple
+from contextlib import contextmanager
+import queue
+import threading
+import time
+from typing import Callable, Iterator, Optional, Tuple
+
+from character import Character
+from profiler import profiler
+
+# The profile is the stages and counts captured while building the frame on the worker thread, or None.
+PreparedFrame = namedtuple('PreparedFrame', 'render_type geometry clip_stats started profile', defaults=(None,))
+
+class FramePipeline:
+    Stats = namedtuple('Stats', 'built discarded')
+
+    # How often in seconds a waiting worker checks whether the pipeline has been closed.
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, character: Character, prepare: Callable[[], PreparedFrame], depth: int = 1, advance: Optional[Callable[[], None]] = None):
+        """The constructor for the FramePipeline class, which builds the geometry of the next frames on a worker thread while
+        the main thread draws and presents the current one. The worker advances the character's animation and then calls
+        prepare, and the prepared frames wait in a queue holding at most depth frames.
+
+        Anything that changes the character, or what prepare builds, must be changed inside invalidating, so the worker is
+        not building a frame at the same time and frames built before the change are thrown away.
+
+        Args:
+            character (Character): The character whose frames are built.
+            prepare (Callable[[], PreparedFrame]): Builds the geometry of the character's current frame.
+            depth (int, optional): The most prepared frames waiting to be drawn. Defaults to 1.
+            advance (Optional[Callable[[], None]], optional): Advances the character's animation before each frame is built,
+            such as from an animation clock, or None to advance it one frame for each frame built. Defaults to None.
+        """
+        self._character = character
+        self._prepare = prepare
+        self._advance = advance or character.advance_frame
+        self._rewind = advance is None
+        self._queue: queue.Queue = queue.Queue(maxsize=max(depth, 1))
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._generation = 0
+        self._shown_frames = character.frames
+        self._built = 0
+        self._discarded = 0
+        self._thread = threading.Thread(target=self._run, name='FramePipeline', daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> 'FramePipeline':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def stats(self) -> Stats:
+        """The number of frames built, and the number thrown away because they were built before a change."""
+        return FramePipeline.Stats(self._built, self._discarded)
+
+    def next_frame(self) -> PreparedFrame:
+        """Waits for the next frame built since the last change.
+
+        Returns:
+            PreparedFrame: The geometry of the frame.
+        """
+        while True:
+            generation, frames, frame = self._queue.get()
+            if isinstance(frame, BaseException):
+                raise frame
+
+            if generation == self._generation:
+                self._shown_frames = frames
+                return frame
+
+            self._discarded += 1
+
+    @contextmanager
+    def invalidating(self) -> Iterator[None]:
+        """Pauses the worker while the character is changed, such as by rotating it or switching its sequence, and throws
+        away the frames built before the change. When the animation advances one frame for each frame built, it goes back to
+        the last frame returned by next_frame, so the frames thrown away are not skipped. An animation clock already follows
+        the time, so its animation is left where it is.
+        """
+        self._lock.acquire()
+        try:
+            if self._rewind:
+                self._character.frames = self._shown_frames
+            self._generation += 1
+
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._discarded += 1
+
+            yield
+        finally:
+            self._lock.release()
+
+    def close(self) -> None:
+        """Stops the worker and throws away the frames waiting to be drawn."""
+        self._closed.set()
+
+        while self._thread.is_alive():
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._thread.join(FramePipeline.POLL_INTERVAL)
+
+    def _run(self) -> None:
+        """Builds frames on the worker thread until the pipeline is closed."""
+        while not self._closed.is_set():
+            if not self._lock.acquire(timeout=FramePipeline.POLL_INTERVAL):
+                continue
+
+            try:
+                generation = self._generation
+                item = self._build(generation)
+            finally:
+                self._lock.release()
+
+            while not self._closed.is_set():
+                try:
+                    self._queue.put(item, timeout=FramePipeline.POLL_INTERVAL)
+                    break
+                except queue.Full:
+                    # A frame built before a change is dropped instead of waiting to be thrown away.
+                    if generation != self._generation:
+                        break
+
+    def _build(self, generation: int) -> Tuple[int, Optional[Tuple[int, int]], object]:
+        """Advances the character and builds its frame, or catches the error building it to raise on the main thread. The
+        stages and counts of building it are captured with the frame, to add to the frame it is drawn in.
+
+        Args:
+            generation (int): The number of changes before the frame was built.
+
+        Returns:
+            Tuple[int, Optional[Tuple[int, int]], object]: The generation, the animation frames of the character and weapon,
+            and the prepared frame or the error.
+        """
+        try:
+            started = time.perf_counter()
+            profiler.begin_capture()
+            try:
+                self._advance()
+                frame = self._prepare()
+            finally:
+                profile = profiler.end_capture()
+            frame = frame._replace(started=started, profile=profile)
+            self._built += 1
+            return generation, self._character.frames, frame
+        except Exception as e:
+            return generation, None, e
@@ -0,0 +1,6 @@
+from enum import Enum, auto
+
+class FrameStorage(Enum):
+    EAGER = auto()
+    LAZY = auto()
+    QUANTIZED = auto()
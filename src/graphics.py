@@ -1,17 +1,176 @@
+from itertools import repeat
 import sys
+from typing import Dict, List, Optional, Tuple
 
-from nptyping import NDArray, UInt32, Shape
+from nptyping import Float32, Int, Int32, NDArray, UInt32, Shape
 import numpy as np
 
+import clipping
 from edge_scan import EdgeScan
 from face import Face
+from pcx import Pcx
 from point2d import Point2d
+from profiler import profiler
+from rasterizer import Rasterizer
+from textured_strip import TexturedStrip
+from triangle_batch import TriangleBatch
 
 # This class is based the code from Lamothe, M. (1997). Zen of Graphics Programming, 2nd Edition: Master the Art of Creating Fast PC Games and Graphics Applications. The Coriolis Group.
 
 class Graphics:
+    # The most bounding box pixels tested in one pass of the barycentric rasterizer.
+    BARYCENTRIC_CHUNK_PIXELS = 1 << 20
+    
+    def __init__(self, rasterizer: Rasterizer = Rasterizer.EDGE_WALK, depth_buffered: bool = False, perspective_correct: bool = False, subspan_length: int = 1):
+        """The constructor for the Graphics class.
+
+        Args:
+            rasterizer (Rasterizer, optional): How triangle batches and strips are filled. Defaults to Rasterizer.EDGE_WALK.
+            depth_buffered (bool, optional): Whether triangle batches and strips are depth tested against the depth buffer,
+            so they can be drawn in any order, instead of drawn over each other in painter's order. Defaults to False.
+            perspective_correct (bool, optional): Whether triangle batches and strips are textured with perspective
+            correction instead of interpolating the texture coordinates linearly across the screen. Defaults to False.
+            subspan_length (int, optional): How many pixels apart the edge walk divides out the perspective exactly when
+            perspective correct, interpolating linearly in between. Defaults to 1, dividing at every pixel, which measures
+            faster than interpolating between longer subspans.
+
+        Raises:
+            ValueError: If the subspan length is less than 1.
+        """
+        if subspan_length < 1:
+            raise ValueError(f'The subspan length must be at least 1, not {subspan_length}')
+        
+        self.rasterizer = rasterizer
+        self.depth_buffered = depth_buffered
+        self.perspective_correct = perspective_correct
+        self.subspan_length = subspan_length
+        # The reciprocal of the distance from the viewer of the nearest pixel drawn so far, or 0 where nothing is drawn.
+        self.depth_buffer: Optional[NDArray[Shape['*,*'], Float32]] = None
+        self._tile_min: Optional[Point2d] = None
+        self._tile_max: Optional[Point2d] = None
+        self._edge_setups: Optional[Dict[Tuple[int, int], Optional[Tuple]]] = None
+        self._vertex_ids: Optional[Tuple[int, int, int]] = None
+    
+    def draw_triangle_batch(self, batch: TriangleBatch, buffer: NDArray[Shape['*,*'], UInt32]) -> None:
+        """Draws every triangle in a batch to the buffer, in the order of the batch. One face is reused for all of the
+        triangles instead of creating one per triangle. When depth buffered, the triangles may be in any order.
+
+        Args:
+            batch (TriangleBatch): The triangles to draw.
+            buffer (NDArray[Shape['*,*'], Uint32]): The buffer to draw to.
+        """
+        inverse_depths = None
+        if self.depth_buffered or self.perspective_correct:
+            inverse_depths = Graphics._inverse_depths(batch.vertex_depths)
+        if self.depth_buffered:
+            self._check_depth_buffer(buffer)
+        
+        if self.rasterizer == Rasterizer.BARYCENTRIC:
+            self._draw_barycentric(batch.screen, batch.skin, batch.texture_ids, batch.textures, inverse_depths, buffer)
+            return
+        
+        face = Face([Point2d(0, 0), Point2d(0, 0), Point2d(0, 0)], [Point2d(0, 0), Point2d(0, 0), Point2d(0, 0)], None)
+        
+        # Triangles from strips and fans share the setup of the edges they share, as draw_textured_strip does.
+        if batch.vertex_ids is not None:
+            self._edge_setups = {}
+        
+        try:
+            for screen, skin, texture_id, triangle_inverse_depths, vertex_ids in zip(batch.screen.tolist(), batch.skin.tolist(), batch.texture_ids.tolist(),
+                                                                                     repeat(None) if inverse_depths is None else inverse_depths.tolist(),
+                                                                                     repeat(None) if batch.vertex_ids is None else batch.vertex_ids.tolist()):
+                for vertex, (x, y) in zip(face.triangle_verts, screen):
+                    vertex.x = x
+                    vertex.y = y
+                
+                for vertex, (x, y) in zip(face.skin_verts, skin):
+                    vertex.x = x
+                    vertex.y = y
+                
+                face.texture = batch.textures[texture_id]
+                face.inverse_depths = triangle_inverse_depths
+                self._vertex_ids = vertex_ids
+                self.draw_textured_triangle(face, buffer)
+        finally:
+            self._edge_setups = None
+            self._vertex_ids = None
+    
+    def draw_textured_strip(self, strip: TexturedStrip, buffer: NDArray[Shape['*,*'], UInt32]) -> None:
+        """Draws the triangles of a triangle strip or fan to the buffer. The edge setup for an edge shared by neighbouring
+        triangles is only calculated once, and back facing triangles are skipped before any setup.
+
+        Args:
+            strip (TexturedStrip): The strip or fan to draw.
+            buffer (NDArray[Shape['*,*'], Uint32]): The buffer to draw to.
+        """
+        triangle_verts = strip.triangle_verts
+        skin_verts = strip.skin_verts
+        inverse_depths = None
+        if self.depth_buffered or self.perspective_correct:
+            inverse_depths = Graphics._inverse_depths(np.array(strip.vertex_depths, dtype=np.float32))
+        if self.depth_buffered:
+            self._check_depth_buffer(buffer)
+        
+        if self.rasterizer == Rasterizer.BARYCENTRIC:
+            triangles = np.array(strip.triangles, dtype=np.intp)
+            screen = np.array([(vertex.x, vertex.y) for vertex in triangle_verts], dtype=np.int32)[triangles]
+            skin = np.array([(vertex.x, vertex.y) for vertex in skin_verts], dtype=np.float32)[triangles]
+            self._draw_barycentric(screen, skin, np.zeros(len(triangles), dtype=np.intp), [strip.texture], None if inverse_depths is None else inverse_depths[triangles], buffer)
+            return
+        
+        if inverse_depths is not None:
+            inverse_depths = inverse_depths.tolist()
+        
+        self._edge_setups = {}
+        
+        try:
+            for triangle in strip.triangles:
+                vertex_1 = triangle_verts[triangle[0]]
+                vertex_2 = triangle_verts[triangle[1]]
+                vertex_3 = triangle_verts[triangle[2]]
+                
+                # The edge walk only fills triangles wound clockwise on screen.
+                if (vertex_2.x - vertex_1.x) * (vertex_3.y - vertex_1.y) - (vertex_2.y - vertex_1.y) * (vertex_3.x - vertex_1.x) <= 0:
+                    continue
+                
+                self._vertex_ids = triangle
+                self.draw_textured_triangle(Face([vertex_1, vertex_2, vertex_3], [skin_verts[triangle[0]], skin_verts[triangle[1]], skin_verts[triangle[2]]], strip.texture,
+                                                 None if inverse_depths is None else [inverse_depths[triangle[0]], inverse_depths[triangle[1]], inverse_depths[triangle[2]]]), buffer)
+        finally:
+            self._edge_setups = None
+            self._vertex_ids = None
+    
+    def draw_lines(self, lines: NDArray[Shape['*, 2, 2'], Int32], color: int, buffer: NDArray[Shape['*,*'], UInt32]) -> None:
+        """Draws lines to the buffer all at once. The lines are clipped to the clipping rectangle, then every pixel of every
+        line is generated in one pass by stepping one pixel at a time along each line's longer axis, and written with one
+        store.
+
+        Args:
+            lines (NDArray[Shape['*, 2, 2'], Int32]): The screen coordinates of both ends of each line.
+            color (int): The color of the lines.
+            buffer (NDArray[Shape['*,*'], Uint32]): The buffer to draw to.
+        """
+        lines = np.rint(clipping.clip_lines_to_rectangle(lines.astype(np.float64), self._min, Point2d(self._max.x - 1, self._max.y - 1))).astype(np.int32)
+        if len(lines) == 0:
+            return
+        
+        start = lines[:, 0]
+        delta = lines[:, 1] - start
+        steps = np.abs(delta).max(axis=1)
+        
+        line_ids = np.repeat(np.arange(len(lines)), steps + 1)
+        offsets = np.arange(len(line_ids), dtype=np.int32) - np.repeat(np.cumsum(steps + 1) - (steps + 1), steps + 1)
+        slopes = (delta / np.maximum(steps, 1)[:, np.newaxis]).astype(np.float32)
+        
+        # The lines are clipped, so the coordinates are never negative and truncating them rounds down.
+        x = (start[:, 0] + 0.5).astype(np.float32)[line_ids] + slopes[line_ids, 0] * offsets
+        y = (start[:, 1] + 0.5).astype(np.float32)[line_ids] + slopes[line_ids, 1] * offsets
+        buffer.reshape(-1)[x.astype(np.intp) * buffer.shape[1] + y.astype(np.intp)] = color
+        profiler.count('pixels filled', len(x))
+    
     def draw_textured_triangle(self, face: Face, buffer: NDArray[Shape['*,*'], UInt32]) -> None:
-        """Draws a textured triangle to the buffer.
+        """Draws a textured triangle to the buffer. When the face has inverse depths, only the pixels nearer than those
+        already drawn are written if depth buffered, and the texture is perspective corrected if perspective correct.
 
         Args:
             face (Face): The face to draw.
@@ -45,6 +204,10 @@ class Graphics:
             return
         
         dest_y = min_y
+        scan_min_y, scan_max_y = self._min.y, self._max.y
+        if self._tile_min is not None:
+            scan_min_y = max(scan_min_y, self._tile_min.y)
+            scan_max_y = min(scan_max_y, self._tile_max.y)
         
         left_edge.direction = -1
         self._set_up_edge(left_edge, face, min_vert, max_vert)
@@ -52,10 +215,10 @@ class Graphics:
         self._set_up_edge(right_edge, face, min_vert, max_vert)
         
         while not done:
-            if dest_y >= self._max.y:
+            if dest_y >= scan_max_y:
                 return
             
-            if dest_y >= self._min.y:
+            if dest_y >= scan_min_y:
                 self._scan_out_line(face, left_edge, right_edge, buffer, dest_y)
             
             if not self._step_edge(left_edge, face, max_vert):
@@ -75,7 +238,177 @@ class Graphics:
         """
         self._min = min
         self._max = max
+    
+    def set_tile(self, min: Optional[Point2d], max: Optional[Point2d]) -> None:
+        """Limits drawing to a tile inside the clipping rectangle. Spans are still clipped to the clipping rectangle and then
+        cut to the tile, so every pixel drawn inside the tile is the same as when the whole clipping rectangle is drawn.
+
+        Args:
+            min (Optional[Point2d]): The minimum point of the tile, or None to draw the whole clipping rectangle.
+            max (Optional[Point2d]): The maximum point of the tile, or None to draw the whole clipping rectangle.
+        """
+        self._tile_min = min
+        self._tile_max = max
+    
+    def clear_depth_buffer(self, width: int, height: int) -> None:
+        """Clears the depth buffer before drawing a frame, creating it when it is missing or a different size.
+
+        Args:
+            width (int): The width of the buffer being drawn to.
+            height (int): The height of the buffer being drawn to.
+        """
+        if self.depth_buffer is None or self.depth_buffer.shape != (width, height):
+            self.depth_buffer = np.zeros((width, height), dtype=np.float32)
+        else:
+            self.depth_buffer.fill(0)
                 
+    def _perspective_span(self, face: Face, left_edge: EdgeScan, right_edge: EdgeScan, first: int, span_count: int, start: int, end: int) -> NDArray[Shape['*'], UInt32]:
+        """Gets the texels of part of a span with perspective correction. The source coordinates divided by depth and the
+        inverse depth are interpolated across the span, and divided to get the source coordinates every subspan_length
+        pixels from the start of the span and at its last pixel. The source coordinates are interpolated linearly in
+        between. The subspans do not depend on which part of the span is drawn, so tiles match the whole span.
+
+        Args:
+            face (Face): The face the span belongs to.
+            left_edge (EdgeScan): The left edge scan.
+            right_edge (EdgeScan): The right edge scan.
+            first (int): The first pixel of the clipped span, counted from the left edge.
+            span_count (int): The number of pixels in the clipped span.
+            start (int): The first pixel to get, counted from the start of the clipped span.
+            end (int): The pixel after the last pixel to get, counted from the start of the clipped span.
+
+        Returns:
+            NDArray[Shape['*'], UInt32]: The texels of the pixels.
+        """
+        knots = np.arange(0, span_count, self.subspan_length)
+        if knots[-1] != span_count - 1:
+            knots = np.append(knots, span_count - 1)
+        
+        # Like the linear path, each pixel is sampled half a pixel in from its left side.
+        t = (knots + first + 0.5) / (right_edge.dest_x - left_edge.dest_x)
+        inverse_depth = left_edge.inverse_depth + (right_edge.inverse_depth - left_edge.inverse_depth) * t
+        source_x = (left_edge.source_over_z_x + (right_edge.source_over_z_x - left_edge.source_over_z_x) * t) / inverse_depth
+        source_y = (left_edge.source_over_z_y + (right_edge.source_over_z_y - left_edge.source_over_z_y) * t) / inverse_depth
+        
+        if self.subspan_length > 1:
+            pixels = np.arange(start, end)
+            source_x = np.interp(pixels, knots, source_x)
+            source_y = np.interp(pixels, knots, source_y)
+        else:
+            source_x = source_x[start:end]
+            source_y = source_y[start:end]
+        
+        image = face.texture.argb_image
+        texture_x = np.clip(np.rint(source_x), 0, image.shape[0] - 1).astype(np.intp)
+        texture_y = np.clip(np.rint(source_y), 0, image.shape[1] - 1).astype(np.intp)
+        return image[texture_x, texture_y]
+    
+    def _check_depth_buffer(self, buffer: NDArray[Shape['*,*'], UInt32]) -> None:
+        """Creates a clear depth buffer if there is none yet or it does not match the size of the buffer being drawn to."""
+        if self.depth_buffer is None or self.depth_buffer.shape != buffer.shape:
+            self.clear_depth_buffer(*buffer.shape)
+    
+    def _draw_barycentric(self, screen: NDArray[Shape['*, 3, 2'], Int32], skin: NDArray[Shape['*, 3, 2'], Float32], texture_ids: NDArray[Shape['*'], Int],
+                          textures: List[Pcx], inverse_depths: Optional[NDArray[Shape['*, 3'], Float32]], buffer: NDArray[Shape['*,*'], UInt32]) -> None:
+        """Draws triangles by evaluating their edge functions at every pixel of their bounding boxes. Many triangles are
+        filled in one pass. Where they overlap, the pixel of the later triangle is kept, so the result is the same as
+        drawing them one at a time in order, or when depth buffered the nearest pixel is kept if it passes the depth test.
+        Perspective correction is exact at every pixel.
+        
+        The fill rule matches the edge walk: only triangles wound clockwise on screen are drawn, pixels on left and top
+        edges are drawn, and pixels on right and bottom edges are not.
+
+        Args:
+            screen (NDArray[Shape['*, 3, 2'], Int32]): The screen coordinates of the vertices of each triangle.
+            skin (NDArray[Shape['*, 3, 2'], Float32]): The texture coordinates of the vertices of each triangle.
+            texture_ids (NDArray[Shape['*'], Int]): The index into textures of each triangle's texture.
+            textures (List[Pcx]): The textures the triangles use.
+            inverse_depths (Optional[NDArray[Shape['*, 3'], Float32]]): The reciprocal of the distance of the vertices of each
+            triangle from the viewer. It is needed when depth buffered or perspective correct.
+            buffer (NDArray[Shape['*,*'], Uint32]): The buffer to draw to.
+        """
+        x = screen[:, :, 0].astype(np.int32)
+        y = screen[:, :, 1].astype(np.int32)
+        
+        # Edge i runs from vertex i to vertex i + 1 and is opposite vertex i + 2. Its edge function at a pixel is
+        # step_x * x + step_y * y + offset, which is positive inside the triangle.
+        edge_x = np.roll(x, -1, axis=1) - x
+        edge_y = np.roll(y, -1, axis=1) - y
+        step_x = -edge_y
+        step_y = edge_x
+        offset = edge_y * x - edge_x * y
+        area = edge_x[:, 0] * (y[:, 2] - y[:, 0]) - edge_y[:, 0] * (x[:, 2] - x[:, 0])
+        
+        # Pixels exactly on an edge belong to the triangle when the edge is a left edge, going up the screen, or a top edge.
+        bias = np.where((edge_y < 0) | ((edge_y == 0) & (edge_x > 0)), 0, 1).astype(np.int32)
+        
+        # Each pixel is sampled from its own position, so clipping to a tile does not change the pixels inside it.
+        clip_min, clip_max = (self._min, self._max) if self._tile_min is None else (self._tile_min, self._tile_max)
+        min_x = np.maximum(x.min(axis=1), clip_min.x)
+        min_y = np.maximum(y.min(axis=1), clip_min.y)
+        width = np.minimum(x.max(axis=1), clip_max.x) - min_x
+        height = np.minimum(y.max(axis=1), clip_max.y) - min_y
+        
+        drawn = np.flatnonzero((area > 0) & (width > 0) & (height > 0))
+        num_pixels = (width * height)[drawn]
+        pixel_ends = np.cumsum(num_pixels)
+        
+        chunk_start = 0
+        while chunk_start < len(drawn):
+            chunk_pixels = (pixel_ends[chunk_start - 1] if chunk_start > 0 else 0) + Graphics.BARYCENTRIC_CHUNK_PIXELS
+            chunk_end = max(int(np.searchsorted(pixel_ends, chunk_pixels, side='right')), chunk_start + 1)
+            
+            # Enumerate every pixel in the bounding box of every triangle in the chunk, in triangle order.
+            counts = num_pixels[chunk_start:chunk_end]
+            triangles = np.repeat(drawn[chunk_start:chunk_end], counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            pixel_x = min_x[triangles] + offsets % width[triangles]
+            pixel_y = min_y[triangles] + offsets // width[triangles]
+            chunk_start = chunk_end
+            
+            edges = step_x[triangles] * pixel_x[:, None] + step_y[triangles] * pixel_y[:, None] + offset[triangles]
+            covered = np.flatnonzero((edges >= bias[triangles]).all(axis=1))
+            triangles = triangles[covered]
+            pixel_x = pixel_x[covered]
+            pixel_y = pixel_y[covered]
+            pixels = pixel_x * buffer.shape[1] + pixel_y
+            
+            # The texture is sampled half a pixel to the right, where the edge walk samples the first pixel of a span.
+            weights = np.roll(edges[covered] + 0.5 * step_x[triangles], -1, axis=1) / area[triangles, None]
+            
+            if not self.depth_buffered:
+                # Keep only the last triangle to cover each pixel.
+                _, last = np.unique(pixels[::-1], return_index=True)
+                kept = len(pixels) - 1 - last
+            else:
+                # Keep the nearest triangle at each pixel, the last one when several are at the same depth, and then only
+                # where it is at least as near as the pixel already drawn.
+                pixel_depths = np.einsum('nk,nk->n', weights, inverse_depths[triangles])
+                order = np.lexsort((np.arange(len(pixels)), pixel_depths, pixels))
+                kept = order[np.flatnonzero(np.diff(pixels[order], append=-1))]
+                kept = kept[pixel_depths[kept] >= self.depth_buffer[pixel_x[kept], pixel_y[kept]]]
+                self.depth_buffer[pixel_x[kept], pixel_y[kept]] = pixel_depths[kept]
+            
+            triangles = triangles[kept]
+            pixel_x = pixel_x[kept]
+            pixel_y = pixel_y[kept]
+            weights = weights[kept]
+            
+            if self.perspective_correct:
+                # Weighting each vertex by its inverse depth interpolates u/z, v/z, and 1/z, and normalizing divides by 1/z.
+                weights = weights * inverse_depths[triangles]
+                weights /= weights.sum(axis=1, keepdims=True)
+            
+            source = np.einsum('nk,nkd->nd', weights, skin[triangles])
+            profiler.count('pixels filled', len(pixel_x))
+            
+            for texture_id in np.unique(texture_ids[triangles]).tolist():
+                selected = texture_ids[triangles] == texture_id
+                image = textures[texture_id].argb_image
+                source_x = np.clip(np.rint(source[selected, 0]), 0, image.shape[0] - 1).astype(np.intp)
+                source_y = np.clip(np.rint(source[selected, 1]), 0, image.shape[1] - 1).astype(np.intp)
+                buffer[pixel_x[selected], pixel_y[selected]] = image[source_x, source_y]
+    
     def _set_up_edge(self, edge: EdgeScan, face: Face, start_vertex: int, max_vertex: int) -> bool:
         """Sets up an edge scan.
 
@@ -90,8 +423,6 @@ class Graphics:
         """
         done = False
         next_vertex: int
-        dest_x_width: int
-        dest_y_height: float
         
         while not done:
             if start_vertex == max_vertex:
@@ -103,35 +434,102 @@ class Graphics:
             elif next_vertex < 0:
                 next_vertex = 2
             
-            edge.remaining_scans = round(face.triangle_verts[next_vertex].y - face.triangle_verts[start_vertex].y)
-            if edge.remaining_scans != 0:
-                dest_y_height = edge.remaining_scans
+            setup = self._edge_setup(face, start_vertex, next_vertex)
+            if setup is not None:
+                (edge.remaining_scans, edge.source_x, edge.source_y, edge.source_step_x, edge.source_step_y, edge.dest_x,
+                 edge.dest_x_direction, edge.dest_x_error_term, edge.dest_x_int_step, edge.dest_x_adj_up, edge.dest_x_adj_down,
+                 edge.inverse_depth, edge.inverse_depth_step, edge.source_over_z_x, edge.source_over_z_y,
+                 edge.source_over_z_step_x, edge.source_over_z_step_y) = setup
                 edge.current_end = next_vertex
-                edge.source_x = face.skin_verts[start_vertex].x
-                edge.source_y = face.skin_verts[start_vertex].y
-                edge.source_step_x = (face.skin_verts[next_vertex].x - edge.source_x) / dest_y_height
-                edge.source_step_y = (face.skin_verts[next_vertex].y - edge.source_y) / dest_y_height
-                edge.dest_x = round(face.triangle_verts[start_vertex].x)
-                dest_x_width = face.triangle_verts[next_vertex].x - face.triangle_verts[start_vertex].x
-                
-                if dest_x_width < 0:
-                    edge.dest_x_direction = -1
-                    dest_x_width = -dest_x_width
-                    edge.dest_x_error_term = 1 - edge.remaining_scans
-                    edge.dest_x_int_step = -(dest_x_width // edge.remaining_scans)
-                else:
-                    edge.dest_x_direction = 1
-                    edge.dest_x_error_term = 0
-                    edge.dest_x_int_step = dest_x_width // edge.remaining_scans
-                
-                edge.dest_x_adj_up = round(dest_x_width % edge.remaining_scans)
-                edge.dest_x_adj_down = edge.remaining_scans
                 done = True
 
             start_vertex = next_vertex
         
         return True
     
+    def _edge_setup(self, face: Face, start_vertex: int, next_vertex: int) -> Optional[Tuple]:
+        """Gets the setup for the edge between two vertices, reusing the setup of a shared edge while drawing a strip.
+
+        Args:
+            face (Face): The face the edge belongs to.
+            start_vertex (int): The vertex the edge starts at.
+            next_vertex (int): The vertex the edge ends at.
+
+        Returns:
+            Optional[Tuple]: The edge setup, or None if the edge does not cross any scan lines.
+        """
+        if self._edge_setups is None:
+            return self._calculate_edge_setup(face, start_vertex, next_vertex)
+        
+        key = (self._vertex_ids[start_vertex], self._vertex_ids[next_vertex])
+        # Vertices made by clipping have no id and are not shared.
+        if key[0] < 0 or key[1] < 0:
+            return self._calculate_edge_setup(face, start_vertex, next_vertex)
+        
+        if key not in self._edge_setups:
+            self._edge_setups[key] = self._calculate_edge_setup(face, start_vertex, next_vertex)
+        
+        return self._edge_setups[key]
+    
+    def _calculate_edge_setup(self, face: Face, start_vertex: int, next_vertex: int) -> Optional[Tuple]:
+        """Calculates the starting values and steps for walking the edge between two vertices.
+
+        Args:
+            face (Face): The face the edge belongs to.
+            start_vertex (int): The vertex the edge starts at.
+            next_vertex (int): The vertex the edge ends at.
+
+        Returns:
+            Optional[Tuple]: The remaining scans, source x and y, source x and y steps, dest x, dest x direction, error term,
+            integer step, adjust up, adjust down, inverse depth and its step, and source x and y divided by depth and their
+            steps, or None if the edge does not cross any scan lines.
+        """
+        dest_x_width: int
+        dest_y_height: float
+        
+        remaining_scans = round(face.triangle_verts[next_vertex].y - face.triangle_verts[start_vertex].y)
+        if remaining_scans == 0:
+            return None
+        
+        dest_y_height = remaining_scans
+        source_x = face.skin_verts[start_vertex].x
+        source_y = face.skin_verts[start_vertex].y
+        source_step_x = (face.skin_verts[next_vertex].x - source_x) / dest_y_height
+        source_step_y = (face.skin_verts[next_vertex].y - source_y) / dest_y_height
+        dest_x = round(face.triangle_verts[start_vertex].x)
+        dest_x_width = face.triangle_verts[next_vertex].x - face.triangle_verts[start_vertex].x
+        
+        if dest_x_width < 0:
+            dest_x_direction = -1
+            dest_x_width = -dest_x_width
+            dest_x_error_term = 1 - remaining_scans
+            dest_x_int_step = -(dest_x_width // remaining_scans)
+        else:
+            dest_x_direction = 1
+            dest_x_error_term = 0
+            dest_x_int_step = dest_x_width // remaining_scans
+        
+        dest_x_adj_up = round(dest_x_width % remaining_scans)
+        
+        inverse_depth = 0.0
+        inverse_depth_step = 0.0
+        source_over_z_x = 0.0
+        source_over_z_y = 0.0
+        source_over_z_step_x = 0.0
+        source_over_z_step_y = 0.0
+        if face.inverse_depths is not None:
+            next_inverse_depth = face.inverse_depths[next_vertex]
+            inverse_depth = face.inverse_depths[start_vertex]
+            inverse_depth_step = (next_inverse_depth - inverse_depth) / dest_y_height
+            source_over_z_x = source_x * inverse_depth
+            source_over_z_y = source_y * inverse_depth
+            source_over_z_step_x = (face.skin_verts[next_vertex].x * next_inverse_depth - source_over_z_x) / dest_y_height
+            source_over_z_step_y = (face.skin_verts[next_vertex].y * next_inverse_depth - source_over_z_y) / dest_y_height
+        
+        return (remaining_scans, source_x, source_y, source_step_x, source_step_y, dest_x,
+                dest_x_direction, dest_x_error_term, dest_x_int_step, dest_x_adj_up, remaining_scans,
+                inverse_depth, inverse_depth_step, source_over_z_x, source_over_z_y, source_over_z_step_x, source_over_z_step_y)
+    
     def _step_edge(self, edge: EdgeScan, face: Face, max_vertex: int) -> bool:
         """Steps an edge scan.
 
@@ -150,6 +548,9 @@ class Graphics:
         
         edge.source_x += edge.source_step_x
         edge.source_y += edge.source_step_y
+        edge.inverse_depth += edge.inverse_depth_step
+        edge.source_over_z_x += edge.source_over_z_step_x
+        edge.source_over_z_y += edge.source_over_z_step_y
         edge.dest_x += edge.dest_x_int_step
         edge.dest_x_error_term += edge.dest_x_adj_up
         
@@ -206,10 +607,55 @@ class Graphics:
             source_y += source_step_y * count
             dest_x = self._min.x
         
-        for count in range(dest_x, dest_x_max):
-            color = face.texture.palette[face.texture.image_data[round(source_x), round(source_y)]]
-            buffer[count, dest_y] = 0xFF000000 | (color[0] << 16) | (color[1] << 8) | color[2]
+        span_end = dest_x_max
+        start = 0
+        if self._tile_min is not None:
+            start = max(self._tile_min.x - dest_x, 0)
+            dest_x_max = min(dest_x_max, self._tile_max.x)
+        
+        count = dest_x_max - dest_x
+        if count <= start:
+            return
+        
+        if self.perspective_correct and face.inverse_depths is not None:
+            texels = self._perspective_span(face, left_edge, right_edge, dest_x - left_edge.dest_x, span_end - dest_x, start, count)
+        else:
+            # The texture coordinates are accumulated with a cumulative sum rather than start + i * step so they round
+            # exactly as they did when they were stepped one pixel at a time.
+            steps_x = np.full(count, source_step_x)
+            steps_x[0] = source_x
+            steps_y = np.full(count, source_step_y)
+            steps_y[0] = source_y
+            
+            texture_x = np.rint(np.cumsum(steps_x)[start:]).astype(np.intp)
+            texture_y = np.rint(np.cumsum(steps_y)[start:]).astype(np.intp)
+            texels = face.texture.argb_image[texture_x, texture_y]
         
-            source_x += source_step_x
-            source_y += source_step_y
-        
\ No newline at end of file
+        if self.depth_buffered and face.inverse_depths is not None:
+            # The inverse depth is sampled where the texture is, half a pixel into each pixel.
+            inverse_depth_step = (right_edge.inverse_depth - left_edge.inverse_depth) / dest_width
+            first_inverse_depth = left_edge.inverse_depth + inverse_depth_step * (dest_x + start - left_edge.dest_x + 0.5)
+            inverse_depths = first_inverse_depth + inverse_depth_step * np.arange(count - start)
+            
+            depths = self.depth_buffer[dest_x + start:dest_x_max, dest_y]
+            nearer = inverse_depths >= depths
+            depths[nearer] = inverse_depths[nearer]
+            buffer[dest_x + start:dest_x_max, dest_y][nearer] = texels[nearer]
+            if profiler.enabled:
+                profiler.count('pixels filled', int(np.count_nonzero(nearer)))
+        else:
+            buffer[dest_x + start:dest_x_max, dest_y] = texels
+            profiler.count('pixels filled', len(texels))
+    
+    @staticmethod
+    def _inverse_depths(vertex_depths: NDArray[Shape['*, ...'], Float32]) -> NDArray[Shape['*, ...'], Float32]:
+        """Converts vertex depths, the world y coordinates of vertices in front of the viewer, which are negative, to the
+        reciprocal of their distance from the viewer. Unlike the depth itself, the reciprocal changes linearly across the screen.
+
+        Args:
+            vertex_depths (NDArray[Shape['*, ...'], Float32]): The depths of the vertices.
+
+        Returns:
+            NDArray[Shape['*, ...'], Float32]: The reciprocal of the distance of each vertex from the viewer.
+        """
+        return -1 / vertex_depths
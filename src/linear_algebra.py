@@ -34,4 +34,26 @@ def rotate_z(angle: int) -> NDArray[Shape['3,3'], Float32]:
     theta = np.deg2rad(angle)
     return np.array([[ m.cos(theta), -m.sin(theta), 0 ],
                     [ m.sin(theta), m.cos(theta) , 0 ],
-                    [ 0           , 0            , 1 ]])
\ No newline at end of file
+                    [ 0           , 0            , 1 ]])
+
+def lerp(start: NDArray[Shape['*, ...'], Float32], end: NDArray[Shape['*, ...'], Float32], fraction: float) -> NDArray[Shape['*, ...'], Float32]:
+    """Linearly interpolates every element of two arrays of the same shape at once.
+
+    Args:
+        start (NDArray[Shape['*, ...'], Float32]): The values at a fraction of 0.
+        end (NDArray[Shape['*, ...'], Float32]): The values at a fraction of 1.
+        fraction (float): How far to go from start toward end.
+
+    Returns:
+        NDArray[Shape['*, ...'], Float32]: The interpolated values, with the dtype of start.
+    """
+    return (start + (end - start) * np.float32(fraction)).astype(start.dtype, copy=False)
+
+def normalize(vectors: NDArray[Shape['*, ...'], Float32]) -> NDArray[Shape['*, ...'], Float32]:
+    """Scales each vector along the last axis to unit length. Zero length vectors stay zero.
+
+    Returns:
+        NDArray[Shape['*, ...'], Float32]: The unit length vectors.
+    """
+    lengths = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, lengths, out=np.zeros_like(vectors), where=lengths > 0)
\ No newline at end of file
@@ -1,40 +1,102 @@
 import argparse
-import dataclasses as dc
+from contextlib import nullcontext
 import math as m
-from typing import Tuple
+import time
+from typing import Optional, Tuple
 import sys
 
-import numpy as np
 import pygame
 
+from animation_clock import AnimationClock
 from character import Character
+from frame_buffer import FrameBuffer
+from frame_pipeline import FramePipeline, PreparedFrame
+from frame_storage import FrameStorage
 from graphics import Graphics
+from model import QuakeModel
 from point2d import Point2d
+from profiler import profiler
+from rasterizer import Rasterizer
 from render_type import RenderType
+from tiled_renderer import TiledRenderer
 
-buffer = np.zeros((1000, 1000), dtype=np.uint32)
+WIREFRAME_COLOR = 0xFFFFFFFF
 
-def draw_character_frame(graphics: Graphics, character: Character, surface: pygame.Surface):
-    """Renders all of the triangles in the character's current frame to the surface.
+def draw_character_frame(graphics: Graphics, character: Character, frame_buffer: FrameBuffer, renderer: Optional[TiledRenderer] = None, hide_back_faces: bool = False):
+    """Renders all of the triangles in the character's current frame to the frame buffer. Only the region drawn in the
+    last frame is cleared first.
 
     Args:
-        graphics (Graphics): A graphics object used to draw textured triangles.
+        graphics (Graphics): A graphics object used to draw textured triangles and wireframes, with its depth buffer created.
         character (Character): The character to render.
-        surface (pygame.Surface): The surface to render the character to.
+        frame_buffer (FrameBuffer): The frame buffer to render the character to, which holds the renderer's buffer when there is a renderer.
+        renderer (Optional[TiledRenderer], optional): A tiled renderer that draws textured triangles on several cores instead of graphics. Defaults to None.
+        hide_back_faces (bool, optional): Whether wireframes only draw the edges of faces pointing toward the viewer. Defaults to False.
     """
-    triangles = sorted(character.triangle_in_frame(), key=lambda triangle: triangle.z_center)
-    
-    if character.render_type == RenderType.TEXTURED:
-        buffer = np.zeros((1000, 1000), dtype=np.uint32)
-        for triangle in triangles:
-            graphics.draw_textured_triangle(triangle.face, buffer)
-        pygame.surfarray.blit_array(surface, buffer)
-    else:
-        surface.fill(0)
-        for triangle in triangles:
-            pygame.draw.line(surface, (255, 255, 255), dc.astuple(triangle.face.triangle_verts[0]), dc.astuple(triangle.face.triangle_verts[1]))
-            pygame.draw.line(surface, (255, 255, 255), dc.astuple(triangle.face.triangle_verts[1]), dc.astuple(triangle.face.triangle_verts[2]))
-            pygame.draw.line(surface, (255, 255, 255), dc.astuple(triangle.face.triangle_verts[2]), dc.astuple(triangle.face.triangle_verts[0]))
+    draw_prepared_frame(graphics, prepare_character_frame(graphics, character, hide_back_faces), frame_buffer, renderer)
+
+def prepare_character_frame(graphics: Graphics, character: Character, hide_back_faces: bool = False) -> PreparedFrame:
+    """Builds the geometry of the character's current frame: the projected edges of a wireframe, or the transformed,
+    culled, and clipped triangles of a textured frame, sorted back to front unless depth buffered.
+
+    Args:
+        graphics (Graphics): The graphics object the frame will be drawn with.
+        character (Character): The character to build the frame for.
+        hide_back_faces (bool, optional): Whether wireframes only include the edges of faces pointing toward the viewer. Defaults to False.
+
+    Returns:
+        PreparedFrame: The geometry of the frame with the character's clipping counts.
+    """
+    started = time.perf_counter()
+    
+    if character.render_type == RenderType.WIREFRAME:
+        return PreparedFrame(RenderType.WIREFRAME, character.wireframe_edges(hide_back_faces), character.clip_stats, started)
+    
+    batch = character.triangle_batch()
+    
+    # The depth buffer resolves which triangle is in front, so the triangles do not need to be sorted.
+    if not graphics.depth_buffered:
+        with profiler.stage('sort'):
+            batch = batch.sorted_by_depth()
+    
+    return PreparedFrame(RenderType.TEXTURED, batch, character.clip_stats, started)
+
+def draw_prepared_frame(graphics: Graphics, frame: PreparedFrame, frame_buffer: FrameBuffer, renderer: Optional[TiledRenderer] = None):
+    """Draws the geometry of a frame to the frame buffer. Only the region drawn in the last frame is cleared first. The
+    stages and counts of building the frame on another thread are added to the frame being timed.
+
+    Args:
+        graphics (Graphics): A graphics object used to draw textured triangles and wireframes, with its depth buffer created.
+        frame (PreparedFrame): The geometry to draw.
+        frame_buffer (FrameBuffer): The frame buffer to draw to, which holds the renderer's buffer when there is a renderer.
+        renderer (Optional[TiledRenderer], optional): A tiled renderer that draws textured triangles on several cores instead of graphics. Defaults to None.
+    """
+    profiler.merge(frame.profile)
+    
+    # The depth buffer is cleared with the frame buffer even when it is not used, so it is clear when it is next used.
+    depth_buffer = renderer.depth_buffer if renderer is not None else graphics.depth_buffer
+    
+    if frame.render_type == RenderType.WIREFRAME:
+        lines = frame.geometry
+        profiler.count('edges drawn', len(lines))
+        
+        with profiler.stage('clear'):
+            frame_buffer.begin_frame(lines.reshape((-1, 2)), depth_buffer)
+        with profiler.stage('rasterize'):
+            graphics.draw_lines(lines, WIREFRAME_COLOR, frame_buffer.buffer)
+        return
+    
+    batch = frame.geometry
+    profiler.count('triangles drawn', len(batch))
+    
+    with profiler.stage('clear'):
+        frame_buffer.begin_frame(batch.screen.reshape((-1, 2)), depth_buffer)
+    
+    with profiler.stage('rasterize'):
+        if renderer is not None:
+            renderer.draw_triangle_batch(batch)
+        else:
+            graphics.draw_triangle_batch(batch, frame_buffer.buffer)
 
 def get_centered_sequence_name(character: Character, font: pygame.font.Font) -> Tuple[pygame.Surface, pygame.Rect]:
     """Creates a surface and rect for the character's sequence name centered on the screen.
@@ -52,17 +114,121 @@ def get_centered_sequence_name(character: Character, font: pygame.font.Font) ->
     
     return text_surface, text_rect
 
+def get_clip_stats(clip_stats: QuakeModel.ClipStats, font: pygame.font.Font) -> Tuple[pygame.Surface, pygame.Rect]:
+    """Creates a surface and rect for the number of triangles rejected and clipped in a frame, at the bottom left of the
+    screen.
+
+    Args:
+        clip_stats (QuakeModel.ClipStats): The clipping counts of the frame.
+        font (pygame.font.Font): The font to use for the text.
+
+    Returns:
+        Tuple[pygame.Surface, pygame.Rect]: The surface and rect for the text.
+    """
+    text = f'rejected {clip_stats.rejected}  near clipped {clip_stats.near_clipped}  guard band clipped {clip_stats.guard_band_clipped}'
+    text_surface = font.render(text, True, (255, 255, 255))
+    text_rect = text_surface.get_rect()
+    text_rect.bottomleft = (0, 1000)
+    
+    return text_surface, text_rect
+
+def get_frame_stats(frame_buffer: FrameBuffer, font: pygame.font.Font) -> Tuple[pygame.Surface, pygame.Rect]:
+    """Creates a surface and rect for the number of bytes the frame buffer cleared and copied to the screen in the last
+    frame, at the bottom right of the screen.
+
+    Args:
+        frame_buffer (FrameBuffer): The frame buffer to get the counts from.
+        font (pygame.font.Font): The font to use for the text.
+
+    Returns:
+        Tuple[pygame.Surface, pygame.Rect]: The surface and rect for the text.
+    """
+    text = f'bytes touched {frame_buffer.bytes_touched:,}'
+    text_surface = font.render(text, True, (255, 255, 255))
+    text_rect = text_surface.get_rect()
+    text_rect.bottomright = (1000, 1000)
+    
+    return text_surface, text_rect
+
+def get_profile_hud(font: pygame.font.Font) -> Tuple[pygame.Surface, pygame.Rect]:
+    """Creates a surface and rect for the profiler's milliseconds per stage, averaged over the recent frames, and the
+    counts of the last frame, at the top left of the screen.
+
+    Args:
+        font (pygame.font.Font): The font to use for the text.
+
+    Returns:
+        Tuple[pygame.Surface, pygame.Rect]: The surface and rect for the text.
+    """
+    milliseconds = profiler.rolling_milliseconds()
+    lines = [f'{name} {value:.2f} ms' for name, value in milliseconds.items() if name != 'frame']
+    if 'frame' in milliseconds:
+        lines.append(f'frame {milliseconds["frame"]:.2f} ms')
+    lines.extend(f'{name} {value:,}' for name, value in sorted(profiler.last_counts().items()))
+    
+    line_surfaces = [font.render(line, True, (255, 255, 255)) for line in lines]
+    text_surface = pygame.Surface((max((surface.get_width() for surface in line_surfaces), default=1), max(sum(surface.get_height() for surface in line_surfaces), 1)), pygame.SRCALPHA)
+    y = 0
+    for line_surface in line_surfaces:
+        text_surface.blit(line_surface, (0, y))
+        y += line_surface.get_height()
+    
+    text_rect = text_surface.get_rect()
+    text_rect.topleft = (0, 0)
+    
+    return text_surface, text_rect
+
 def main():
     """A simple viewer for Quake model version 2 md2 files."""
     parser = argparse.ArgumentParser(description='Quake model viewer')
     parser.add_argument('quake_model', help='Quake model verison 2 md2 file for the character')
     parser.add_argument('weapon_model', help='Quake model verison 2 md2 file for the weapon')
+    frame_storage_group = parser.add_mutually_exclusive_group()
+    frame_storage_group.add_argument('--lazy', action='store_true', help='memory map the models and decode animation frames when first used')
+    frame_storage_group.add_argument('--quantized', action='store_true', help='keep the packed animation frames and dequantize only the frame being rendered')
+    parser.add_argument('--frame-cache-size', type=int, default=32, help='the most decoded frames kept per model with --lazy')
+    parser.add_argument('--frame-cache-bytes', type=int, default=None, help='the most bytes of decoded frames kept per model with --lazy')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the models and textures instead of using the compiled cache')
+    parser.add_argument('--cache-dir', default=None, help='directory for the compiled cache instead of next to the models')
+    parser.add_argument('--barycentric', action='store_true', help='fill textured triangles by testing their bounding boxes instead of walking their edges')
+    parser.add_argument('--depth-buffer', action='store_true', help='depth test textured pixels instead of sorting the triangles back to front')
+    parser.add_argument('--perspective', action='store_true', help='texture map with perspective correction instead of interpolating linearly across the screen')
+    parser.add_argument('--subspan', type=int, default=1, help='how many pixels apart to divide out the perspective exactly with --perspective, interpolating linearly in between')
+    parser.add_argument('--workers', type=int, default=0, help='draw textured triangles in screen tiles on this many worker processes, 0 draws on the main thread')
+    parser.add_argument('--tile-size', type=int, default=64, help='the width and height in pixels of a screen tile with --workers')
+    parser.add_argument('--threads', action='store_true', help='use worker threads instead of worker processes with --workers')
+    parser.add_argument('--hide-back-faces', action='store_true', help='only draw the wireframe edges of faces pointing toward the viewer')
+    parser.add_argument('--clip-stats', action='store_true', help='show how many triangles were rejected and clipped each frame')
+    parser.add_argument('--frame-stats', action='store_true', help='show how many bytes of the frame buffer were cleared and copied to the screen each frame')
+    parser.add_argument('--keyframe-rate', type=float, default=AnimationClock.DEFAULT_KEYFRAME_RATE, help='the animation frames a second, blending between them in the frames drawn, or 0 to advance one animation frame for each frame drawn')
+    parser.add_argument('--fps', type=int, default=60, help='the most frames drawn a second')
+    parser.add_argument('--pipeline', action='store_true', help='build the next frames on a worker thread while drawing the current one')
+    parser.add_argument('--pipeline-depth', type=int, default=1, help='the most built frames waiting to be drawn with --pipeline')
+    parser.add_argument('--profile', action='store_true', help='time the stages of each frame and show them with the triangle and pixel counts')
+    parser.add_argument('--trace', default=None, help='record the timings of every frame and write them on exit, as Chrome trace events when the file ends in .json and CSV otherwise')
     args = parser.parse_args()
     
-    character = Character(RenderType.WIREFRAME, args.quake_model, args.weapon_model)
+    if args.subspan < 1:
+        parser.error('the subspan length must be at least 1')
+    
+    profiler.enabled = args.profile or args.trace is not None
+    profiler.record = args.trace is not None
+    
+    frame_storage = FrameStorage.EAGER
+    if args.lazy:
+        frame_storage = FrameStorage.LAZY
+    elif args.quantized:
+        frame_storage = FrameStorage.QUANTIZED
+    character = Character(RenderType.WIREFRAME, args.quake_model, args.weapon_model, frame_storage, args.frame_cache_size, args.frame_cache_bytes, not args.no_cache, args.cache_dir)
       
-    graphics = Graphics()
+    graphics = Graphics(Rasterizer.BARYCENTRIC if args.barycentric else Rasterizer.EDGE_WALK, args.depth_buffer, args.perspective, args.subspan)
     graphics.set_clip(Point2d(0, 0), Point2d(1000, 1000))
+    graphics.clear_depth_buffer(1000, 1000)
+    character.set_clip(Point2d(0, 0), Point2d(1000, 1000), args.perspective)
+    
+    renderer = None
+    if args.workers > 0:
+        renderer = TiledRenderer(1000, 1000, args.tile_size, args.workers, graphics, args.threads)
       
     pygame.init()
     pygame.display.set_caption("Quake model viewer")
@@ -72,56 +238,122 @@ def main():
     text_surface, text_rect = get_centered_sequence_name(character, font)
     
     fps = pygame.time.Clock()
-    display_surface = pygame.Surface((1000, 1000))
+    display_surface = pygame.display.get_surface()
+    frame_buffer = FrameBuffer(1000, 1000, renderer.buffer if renderer is not None else None)
+    overlay_rects = []
     starting_mouse_pos = (0, 0)
     rotating = False
+    hide_back_faces = args.hide_back_faces
+    show_profile = args.profile
+    
+    clock = AnimationClock(args.keyframe_rate) if args.keyframe_rate > 0 else None
+    advance = (lambda: character.animate(*clock.update())) if clock is not None else character.advance_frame
+    
+    pipeline = None
+    if args.pipeline:
+        # The worker reads hide_back_faces when it builds each frame, so toggling it takes effect on the next frame built.
+        pipeline = FramePipeline(character, lambda: prepare_character_frame(graphics, character, hide_back_faces), args.pipeline_depth, advance if clock is not None else None)
 
     while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_w:
-                    character.render_type = RenderType.WIREFRAME
-                elif event.key == pygame.K_t:
-                    character.render_type = RenderType.TEXTURED
-                elif event.key == pygame.K_EQUALS or event.key == pygame.K_PLUS or event.key == pygame.K_KP_PLUS:
-                    character.scale(character.size + 0.5)
-                elif event.key == pygame.K_MINUS or event.key == pygame.K_KP_MINUS:
-                    character.scale(character.size - 0.5)
-                elif event.key == pygame.K_RIGHT:
-                    character.advance_sequence()
-                    text_surface, text_rect = get_centered_sequence_name(character, font)
-                elif event.key == pygame.K_LEFT:
-                    character.previous_sequence()
-                    text_surface, text_rect = get_centered_sequence_name(character, font)
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 3:
-                    rotating = True
-                    starting_mouse_pos = pygame.mouse.get_pos()
-                elif event.button == 4:
-                    character.scale(character.size + 0.5)
-                elif event.button == 5:
-                    character.scale(character.size - 0.5)                
-            elif event.type == pygame.MOUSEMOTION:
-                if rotating:
-                    new_mouse_pos = pygame.mouse.get_pos()
-                    rotate_z = (character.rotate_z + new_mouse_pos[0] - starting_mouse_pos[0]) % 360
-                    character.rotate(character.rotate_x, character.rotate_y, rotate_z)
-            elif event.type == pygame.MOUSEBUTTONUP:
-                if event.button == 3:
-                    new_mouse_pos = pygame.mouse.get_pos()
-                    rotate_z = (character.rotate_z + new_mouse_pos[0] - starting_mouse_pos[0]) % 360
-                    character.rotate(character.rotate_x, character.rotate_y, rotate_z)
-                    rotating = False
-
-        character.advance_frame()
-        draw_character_frame(graphics, character, display_surface)
-        display_surface.blit(text_surface, text_rect)
-        pygame.Surface.blit(pygame.display.get_surface(), display_surface, (0,0))
-        pygame.display.update()
+        profiler.begin_frame()
+        
+        events = pygame.event.get()
+        # Input that can change the character pauses the worker while it is handled and throws away the frames it built.
+        changes = any(event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP) or (event.type == pygame.MOUSEMOTION and rotating) for event in events)
+        
+        with pipeline.invalidating() if pipeline is not None and changes else nullcontext():
+            for event in events:
+                if event.type == pygame.QUIT:
+                    if pipeline is not None:
+                        pipeline.close()
+                    if renderer is not None:
+                        renderer.close()
+                    character.close()
+                    if args.trace is not None:
+                        profiler.write_trace(args.trace)
+                    pygame.quit()
+                    sys.exit()
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_w:
+                        character.render_type = RenderType.WIREFRAME
+                    elif event.key == pygame.K_t:
+                        character.render_type = RenderType.TEXTURED
+                    elif event.key == pygame.K_g:
+                        character.use_gl_commands = not character.use_gl_commands
+                    elif event.key == pygame.K_r:
+                        graphics.rasterizer = Rasterizer.EDGE_WALK if graphics.rasterizer == Rasterizer.BARYCENTRIC else Rasterizer.BARYCENTRIC
+                    elif event.key == pygame.K_z:
+                        graphics.depth_buffered = not graphics.depth_buffered
+                    elif event.key == pygame.K_h:
+                        hide_back_faces = not hide_back_faces
+                    elif event.key == pygame.K_p:
+                        graphics.perspective_correct = not graphics.perspective_correct
+                        character.set_clip(Point2d(0, 0), Point2d(1000, 1000), graphics.perspective_correct)
+                    elif event.key == pygame.K_i:
+                        show_profile = not show_profile
+                        # A trace keeps recording with the HUD hidden.
+                        profiler.enabled = show_profile or args.trace is not None
+                    elif event.key == pygame.K_EQUALS or event.key == pygame.K_PLUS or event.key == pygame.K_KP_PLUS:
+                        character.scale(character.size + 0.5)
+                    elif event.key == pygame.K_MINUS or event.key == pygame.K_KP_MINUS:
+                        character.scale(character.size - 0.5)
+                    elif event.key == pygame.K_RIGHT:
+                        character.advance_sequence()
+                        if clock is not None:
+                            clock.reset()
+                        text_surface, text_rect = get_centered_sequence_name(character, font)
+                    elif event.key == pygame.K_LEFT:
+                        character.previous_sequence()
+                        if clock is not None:
+                            clock.reset()
+                        text_surface, text_rect = get_centered_sequence_name(character, font)
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    if event.button == 3:
+                        rotating = True
+                        starting_mouse_pos = pygame.mouse.get_pos()
+                    elif event.button == 4:
+                        character.scale(character.size + 0.5)
+                    elif event.button == 5:
+                        character.scale(character.size - 0.5)                
+                elif event.type == pygame.MOUSEMOTION:
+                    if rotating:
+                        new_mouse_pos = pygame.mouse.get_pos()
+                        rotate_z = (character.rotate_z + new_mouse_pos[0] - starting_mouse_pos[0]) % 360
+                        character.rotate(character.rotate_x, character.rotate_y, rotate_z)
+                elif event.type == pygame.MOUSEBUTTONUP:
+                    if event.button == 3:
+                        new_mouse_pos = pygame.mouse.get_pos()
+                        rotate_z = (character.rotate_z + new_mouse_pos[0] - starting_mouse_pos[0]) % 360
+                        character.rotate(character.rotate_x, character.rotate_y, rotate_z)
+                        rotating = False
+
+        if pipeline is not None:
+            with profiler.stage('wait'):
+                frame = pipeline.next_frame()
+        else:
+            advance()
+            frame = prepare_character_frame(graphics, character, hide_back_faces)
+        
+        draw_prepared_frame(graphics, frame, frame_buffer, renderer)
+        
+        overlays = [(text_surface, text_rect)]
+        if args.clip_stats:
+            overlays.append(get_clip_stats(frame.clip_stats, font))
+        if args.frame_stats:
+            overlays.append(get_frame_stats(frame_buffer, font))
+        if show_profile:
+            overlays.append(get_profile_hud(font))
+        
+        with profiler.stage('present'):
+            dirty_rects = frame_buffer.present(display_surface, overlay_rects + [rect for _, rect in overlays])
+            for overlay_surface, overlay_rect in overlays:
+                display_surface.blit(overlay_surface, overlay_rect)
+            overlay_rects = [rect for _, rect in overlays]
+            pygame.display.update(dirty_rects)
         
-        fps.tick(60)
+        # The frame ends before waiting for the next one, so the frame time is the time spent drawing it.
+        profiler.end_frame()
+        fps.tick(args.fps)
 
-main()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,46 @@
+import argparse
+import os
+import tracemalloc
+
+from frame_storage import FrameStorage
+from model import QuakeModel
+from render_type import RenderType
+
+def main():
+    """Reports the memory used by a Quake model with each frame storage mode."""
+    parser = argparse.ArgumentParser(description='Quake model frame storage memory report')
+    parser.add_argument('quake_model', help='Quake model verison 2 md2 file')
+    args = parser.parse_args()
+
+    base_name, _ = os.path.splitext(args.quake_model)
+    pcx_filename = base_name + '.pcx'
+
+    if not os.path.exists(pcx_filename):
+        raise ValueError(f'Unable to find the texture for this quake model: {pcx_filename}')
+
+    print(f'{"storage":<10} {"frame bytes":>12} {"bytes/vertex/frame":>19} {"traced bytes":>13} {"vs eager":>9}')
+
+    eager_nbytes = None
+    for frame_storage in FrameStorage:
+        tracemalloc.start()
+
+        model = QuakeModel(RenderType.TEXTURED, frame_storage)
+        model.from_file(args.quake_model, pcx_filename, use_cache=False)
+        model.rotate(0, 180, 90)
+        model.translate(85, -250, 70)
+        model.scale(1)
+        for _ in model.triangle_in_frame():
+            pass
+
+        traced_nbytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        frame_nbytes = model.frame_nbytes
+        if eager_nbytes is None:
+            eager_nbytes = frame_nbytes
+
+        per_vertex = frame_nbytes / (model.header.num_frames * model.header.num_vertices)
+        print(f'{frame_storage.name.lower():<10} {frame_nbytes:>12,} {per_vertex:>19.2f} {traced_nbytes:>13,} {frame_nbytes / eager_nbytes:>8.1%}')
+
+if __name__ == '__main__':
+    main()
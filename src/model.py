@@ -1,38 +1,74 @@
 from collections import namedtuple
 from io import BufferedReader
+import mmap
 import re
 import struct
-from typing import Generator, List, Tuple
+from typing import Generator, List, Optional, Tuple, Union
 
-from nptyping import NDArray, Shape, Float32
+from nptyping import NDArray, Shape, Float32, Int, Int32, UInt8
 import numpy as np
 
-from face import Face
+import clipping
+import compiled_cache
+from frame_cache import FrameCache
+from frame_storage import FrameStorage
 from pcx import Pcx
 from point2d import Point2d
+from profiler import profiler
 import linear_algebra as la
 from render_type import RenderType
+from textured_strip import TexturedStrip
 from textured_triangle import TexturedTriangle
+from triangle_batch import TriangleBatch
 
 class QuakeModel:
     Header = namedtuple('Header', 'skin_width skin_height frame_size num_skins num_vertices num_tex_coords num_faces num_gl_commands num_frames offset_skins offset_tex_coords offset_faces offset_frames offset_gl_commands offset_end')
     TexturedFace = namedtuple('TexturedFace', 'point_1 point_2 point_3 tex_index_1 tex_index_2 tex_index_3')
     SkinTextureOffset = namedtuple('SkinTextureOffset', 's t')
-    TriangleVertex = namedtuple('TriangleVertex', 'x y z light_normal_index')
-    AnimationFrame = namedtuple('AnimationFrame', 'name frame_data normals')
+    AnimationFrame = namedtuple('AnimationFrame', 'name frame_data normals unit_normals')
     Sequence = namedtuple('Sequence', 'name start_frame num_frames')
+    GlCommand = namedtuple('GlCommand', 'fan vertices skin_verts triangles')
+    ClipStats = namedtuple('ClipStats', 'rejected near_clipped guard_band_clipped')
     
     VIEWING_DISTANCE = -1500
+    NEAR_PLANE = -1
+    GUARD_BAND = 2048
     
-    def __init__(self, render_type: RenderType):
+    def __init__(self, render_type: RenderType, frame_storage: FrameStorage = FrameStorage.EAGER, frame_cache_size: Optional[int] = 32, frame_cache_bytes: Optional[int] = None):
         """The constructor for the QuakeModel class.
 
         Args:
             render_type (RenderType): Whether the model should be rendered as a wireframe or a textured model.
+            frame_storage (FrameStorage, optional): Whether to decode every animation frame on load, to memory map the file and decode frames when first used,
+            or to keep the packed frames from the file and dequantize only the frame being rendered. Defaults to FrameStorage.EAGER.
+            frame_cache_size (Optional[int], optional): The most decoded frames kept with lazy frame storage, or None for no frame limit. Defaults to 32.
+            frame_cache_bytes (Optional[int], optional): The most bytes of decoded frames kept with lazy frame storage, or None for no byte limit. Defaults to None.
         """
         self._frame = 0
+        self._mapped_file = None
+        self._blend = 0.0
+        self._blended_frame = None
         self._render_type = render_type
         self._sequence = 0
+        self._frame_storage = frame_storage
+        self._use_gl_commands = False
+        
+        if frame_storage == FrameStorage.LAZY:
+            self._frame_cache = FrameCache(frame_cache_size, frame_cache_bytes)
+        elif frame_storage == FrameStorage.QUANTIZED:
+            # The current and next frames are both decoded when blending between them.
+            self._frame_cache = FrameCache(2)
+        else:
+            self._frame_cache = None
+        
+        self._clip_min = None
+        self._clip_max = None
+        self._clip_perspective_correct = False
+        self._clip_stats = QuakeModel.ClipStats(0, 0, 0)
+        
+        self._scale = 1
+        self.rotate(0, 0, 0)
+        self.translate(0, 0, 0)
         
     @property
     def render_type(self) -> RenderType:
@@ -48,12 +84,124 @@ class QuakeModel:
         """The name of the current animation sequence."""
         return self._sequences[self._sequence].name        
     
-    def from_file(self, quake_filename: str, pcx_filename: str) -> None:
-        """Loads a Quake model from a file.
+    @property
+    def frame(self) -> int:
+        """The index of the current animation frame."""
+        return self._frame
+    
+    @frame.setter
+    def frame(self, frame: int) -> None:
+        self._frame = frame
+    
+    @property
+    def blend(self) -> float:
+        """How far the model is from the current animation frame toward the next one, from 0 up to but not including 1."""
+        return self._blend
+    
+    @property
+    def sequences(self) -> List[Sequence]:
+        """The animation sequences of the model, in the order of their frames."""
+        return self._sequences
+    
+    @property
+    def use_gl_commands(self) -> bool:
+        """Whether textured frames are built from the triangle strips and fans in the model's GL commands instead of its triangle list."""
+        return self._use_gl_commands
+    
+    @use_gl_commands.setter
+    def use_gl_commands(self, use_gl_commands: bool) -> None:
+        self._use_gl_commands = use_gl_commands
+    
+    @property
+    def clip_stats(self) -> ClipStats:
+        """The number of triangles rejected, clipped to the near plane, and clipped to the guard band when the last batch was built."""
+        return self._clip_stats
+    
+    @property
+    def frame_storage(self) -> FrameStorage:
+        """How the animation frames are stored."""
+        return self._frame_storage
+    
+    @property
+    def frame_cache_stats(self) -> Optional[FrameCache.Stats]:
+        """The hit, miss, prefetch, and eviction counters of the frame cache, or None when the frames are decoded eagerly."""
+        return self._frame_cache.stats if self._frame_cache is not None else None
+    
+    @property
+    def frame_nbytes(self) -> int:
+        """The number of bytes of animation frame data held in memory. Memory mapped pages of the file are not counted."""
+        cached_nbytes = self._frame_cache.nbytes if self._frame_cache is not None else 0
+        
+        if self._frame_storage == FrameStorage.QUANTIZED:
+            return self._frame_records.nbytes + cached_nbytes
+        elif self._frame_storage == FrameStorage.LAZY:
+            return cached_nbytes
+        
+        return self._frame_positions.nbytes + self._light_normal_indices.nbytes + self._frame_normals.nbytes + self._frame_unit_normals.nbytes
+    
+    def from_file(self, quake_filename: str, pcx_filename: str, use_cache: bool = True, cache_dir: Optional[str] = None) -> None:
+        """Loads a Quake model from a file. With eager frame storage the decoded model is loaded from a compiled cache when it
+        is valid for the file, and the cache is rebuilt when it is missing or stale.
 
         Args:
             quake_filename (str): The full path to the Quake model version 2 md2 file.
             pcx_filename (str): The full path to the PCX file containing the texture for the model.
+            use_cache (bool, optional): Whether to use the compiled caches for the model and its texture. Defaults to True.
+            cache_dir (Optional[str], optional): The directory for the compiled caches, or None to keep them next to the files. Defaults to None.
+
+        Raises:
+            ValueError: If the file is not a Quake model version 2 file.
+        """
+        cache_filename = None
+        if use_cache and self._frame_storage == FrameStorage.EAGER:
+            cache_filename = compiled_cache.cache_filename(quake_filename, cache_dir)
+        
+        self.texture = Pcx()
+        
+        if cache_filename is not None and self._read_cache(cache_filename, quake_filename):
+            self.texture.from_file(pcx_filename, use_cache, cache_dir)
+        else:
+            with open(quake_filename, 'rb') as f:
+                id = f.read(4)
+                version = f.read(4)
+                
+                if id != b'IDP2' or version != b'\x08\x00\x00\x00':
+                    raise ValueError('Only Quake 2 models are supported')
+                
+                self.header = self._read_header(f)
+                self.texture.from_file(pcx_filename, use_cache, cache_dir)
+                self._texture_offsets = self._read_texture_offsets(f)
+                self._triangles = self._read_faces(f)
+                self._face_vertices = np.array([face[:3] for face in self._triangles], dtype=np.intp).reshape((-1, 3))
+                self._gl_command_data = self._read_gl_commands(f)
+                self._read_animation_frames(f)
+            
+            if cache_filename is not None:
+                self._write_cache(cache_filename, quake_filename)
+        
+        # The GL commands are parsed the first time they are drawn, so loads of models drawn from their triangle lists skip them.
+        self._gl_commands = None
+        self._skin_coords = np.array(self._texture_offsets, dtype=np.float32).reshape((-1, 2))
+        self._face_tex_indices = np.array([face[3:] for face in self._triangles], dtype=np.intp).reshape((-1, 3))
+        # The unique edges are found the first time the model is drawn as a wireframe.
+        self._edges = None
+        self._face_edges = None
+        
+        self._world_coordinates = np.zeros((self.header.num_vertices, 3), dtype=np.float32)
+        self._screen_coordinates = np.zeros((self.header.num_vertices, 2), dtype=np.int32)
+        self._vertex_depths = np.zeros(self.header.num_vertices, dtype=np.float32)
+        self._should_rotate = np.zeros(self.header.num_vertices, dtype=np.bool_)
+    
+    def read_sequences(self, quake_filename: str) -> List[Sequence]:
+        """Reads only the header and the frame names of a Quake model file to find its animation sequences, without
+        loading the rest of the model. The frame names are read from a memory map of the file, so the frames' vertices are
+        not read.
+
+        Args:
+            quake_filename (str): The full path to the Quake model version 2 md2 file.
+
+        Returns:
+            List[Sequence]: The animation sequences of the model, in the order of their frames.
 
         Raises:
             ValueError: If the file is not a Quake model version 2 file.
@@ -66,31 +214,76 @@ class QuakeModel:
                 raise ValueError('Only Quake 2 models are supported')
             
             self.header = self._read_header(f)
-            self.texture = Pcx()
-            self.texture.from_file(pcx_filename)
-            self._texture_offsets = self._read_texture_offsets(f)
-            self._triangles = self._read_faces(f)
-            self._read_animation_frames(f)
-            
-            self._world_coordinates = np.zeros((self.header.num_vertices, 3), dtype=np.float32)
-            self._should_rotate = np.zeros(self.header.num_vertices, dtype=np.bool_)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                name_dtype = np.dtype({'names': ['name'], 'formats': ['S16'], 'offsets': [24], 'itemsize': self.header.frame_size})
+                frames = np.frombuffer(mapped_file, dtype=name_dtype, count=self.header.num_frames, offset=self.header.offset_frames)
+                names = self._decode_frame_names(frames)
+                # The map cannot be closed while an array still views it.
+                del frames
+        
+        self._sequences = self._group_sequences(names)
+        return self._sequences
+    
+    def __enter__(self) -> 'QuakeModel':
+        return self
+    
+    def __exit__(self, *args) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Releases the memory mapped model file of lazy frame storage. The frames cannot be decoded afterwards."""
+        if self._mapped_file is None:
+            return
+        
+        # The packed frames are a view of the mapped file, so they are dropped before it is closed.
+        self._frame_records = None
+        self._frame_cache.clear()
+        self._mapped_file.close()
+        self._mapped_file = None
     
     def advance_frame(self) -> None:
         """Advances the model to the next frame in the animation sequence. If the end of the sequence is reached, the model will loop back to the first frame in the sequence."""
-        self._frame += 1
+        self._frame = self._next_frame_index(self._frame)
         
-        if self._frame >= self._sequences[self._sequence].start_frame + self._sequences[self._sequence].num_frames:
-            self._frame = self._sequences[self._sequence].start_frame        
+        if self._frame_storage == FrameStorage.LAZY:
+            self._frame_cache.prefetch(self._next_frame_index(self._frame), self._load_frame)
+    
+    def animate(self, frames: int, blend: float) -> None:
+        """Advances the model by whole animation frames, looping within the sequence, and sets how far it is toward the
+        frame after, so an animation clock can drive it at a fixed rate however often frames are drawn.
+
+        Args:
+            frames (int): The number of animation frames to advance.
+            blend (float): How far to blend from the new frame toward the next one, from 0 up to but not including 1.
+        """
+        sequence = self._sequences[self._sequence]
+        self._frame = sequence.start_frame + (self._frame - sequence.start_frame + frames) % sequence.num_frames
+        self._blend = blend
+        
+        if self._frame_storage == FrameStorage.LAZY:
+            self._frame_cache.prefetch(self._next_frame_index(self._frame), self._load_frame)
     
     def advance_sequence(self) -> None:
         """Advances the model to the next animation sequence. If the end of the sequence list is reached, the model will loop back to the first sequence."""
         self._sequence = self._sequence + 1 if self._sequence + 1 < len(self._sequences) else 0
         self._frame = self._sequences[self._sequence].start_frame
+        self._blend = 0.0
     
     def previous_sequence(self) -> None:
         """Moves the model to the previous animation sequence. If the beginning of the sequence list is reached, the model will loop back to the last sequence."""
         self._sequence = self._sequence + -1 if self._sequence + -1 > 0 else len(self._sequences) - 1
         self._frame = self._sequences[self._sequence].start_frame    
+        self._blend = 0.0
+    
+    def set_sequence(self, sequence: int) -> None:
+        """Moves the model to the first frame of an animation sequence.
+
+        Args:
+            sequence (int): The index of the sequence in sequences.
+        """
+        self._sequence = sequence
+        self._frame = self._sequences[sequence].start_frame
+        self._blend = 0.0
     
     def rotate(self, angle_x: int, angle_y: int, angle_z: int) -> None:
         """Rotates the model by the specified angles.
@@ -101,6 +294,8 @@ class QuakeModel:
             angle_z (int): The angle to rotate the model around the z-axis.
         """
         self._rotation = (angle_x, angle_y, angle_z)
+        self._rotation_matrix = la.rotate_x(angle_x) @ la.rotate_y(angle_y) @ la.rotate_z(angle_z)
+        self._transform = self._scale * self._rotation_matrix
         
     def scale(self, scale: float) -> None:
         """Scale the model by the specified amount.
@@ -109,6 +304,7 @@ class QuakeModel:
             scale (float): The amount to scale the model by.
         """
         self._scale = scale
+        self._transform = self._scale * self._rotation_matrix
         
     def translate(self, x: int, y: int, z: int) -> None:
         """Translates the model by the specified amount.
@@ -120,95 +316,289 @@ class QuakeModel:
         """
         self._translation = (x, y, z)
         
-    def triangle_in_frame(self) -> Generator[TexturedTriangle, None, None]:
-        """Generates a list of triangles for the current frame of the model."""
-        num_faces_visible = 0
+    def set_clip(self, min: Optional[Point2d], max: Optional[Point2d], perspective_correct: bool = False) -> None:
+        """Sets the clipping rectangle the batches are drawn into. Triangles that miss it are rejected, and triangles that
+        reach further than GUARD_BAND pixels past it are clipped to the guard band.
+
+        Args:
+            min (Optional[Point2d]): The minimum point of the rectangle, or None to only clip to the near plane.
+            max (Optional[Point2d]): The maximum point of the rectangle, or None to only clip to the near plane.
+            perspective_correct (bool, optional): Whether the batches are drawn with perspective correction, so triangles
+            clipped to the guard band get skin coordinates mapped the same way. Defaults to False.
+        """
+        self._clip_min = min
+        self._clip_max = max
+        self._clip_perspective_correct = perspective_correct
         
-        frame = self._frames[self._frame]
-        visible_faces = []
+    def triangle_in_frame(self) -> Generator[Union[TexturedTriangle, TexturedStrip], None, None]:
+        """Generates a list of triangles for the current frame of the model. When textured and using GL commands, triangle
+        strips and fans are generated instead. The triangles come from triangle_batch."""
+        if self._render_type == RenderType.TEXTURED and self._use_gl_commands and self._get_gl_commands():
+            yield from self._strips_in_frame()
+            return
         
-        object_viewer = (0, 150, 0) @ la.rotate_x(self._rotation[0]) @ la.rotate_y(self._rotation[1]) @ la.rotate_z(self._rotation[2])
+        yield from self.triangle_batch().triangles()
+    
+    def triangle_batch(self) -> TriangleBatch:
+        """Builds the triangles for the current frame of the model as one batch of arrays. When textured and using GL
+        commands, the batch holds the triangles of the strips and fans that face the viewer.
 
-        if self._render_type == RenderType.WIREFRAME:
+        Returns:
+            TriangleBatch: The screen and skin coordinates and the depths of each triangle and its vertices. Only the triangles
+            in front of the near plane that can touch the clipping rectangle are included.
+        """
+        gl_commands = self._render_type == RenderType.TEXTURED and self._use_gl_commands and self._get_gl_commands()
+        
+        frame = None
+        vertex_ids = None
+        if gl_commands:
             self._should_rotate.fill(True)
-            visible_faces = self._triangles
+            vertices = self._gl_triangle_vertices
+            skin = self._gl_triangle_skin
+            # The edges a strip or fan's triangles share are set up once when drawn, found by their vertex ids.
+            vertex_ids = self._gl_triangle_vertex_ids
         else:
-            self._should_rotate.fill(False)
-            for face_index in range(self.header.num_faces):
-                if np.dot(object_viewer, frame.normals[face_index]) < 0:
-                    num_faces_visible += 1
-                    self._should_rotate[self._triangles[face_index].point_1] = True
-                    self._should_rotate[self._triangles[face_index].point_2] = True
-                    self._should_rotate[self._triangles[face_index].point_3] = True
-                    visible_faces.append(self._triangles[face_index])
+            # The frame is looked up once for the whole build, so the frame cache counts one use of it.
+            frame = self._current_frame()
+            with profiler.stage('cull'):
+                visible_faces = self._visible_faces(frame)
+                vertices = self._face_vertices[visible_faces]
+                skin = self._skin_coords[self._face_tex_indices[visible_faces]]
+            
+            profiler.count('triangles submitted', self.header.num_faces)
+            profiler.count('triangles culled', self.header.num_faces - len(vertices))
         
-        self._apply_transformations()
+        with profiler.stage('transform'):
+            self._apply_transformations(frame)
         
-        for face in visible_faces:
-            z_center = self._world_coordinates[face.point_1][1] + \
-                       self._world_coordinates[face.point_2][1] + \
-                       self._world_coordinates[face.point_3][1] / 3
-            
-            vertex_1 = Point2d(int(self._world_coordinates[face.point_1][0] / \
-                               self._world_coordinates[face.point_1][1] * \
-                               QuakeModel.VIEWING_DISTANCE),
-                               int(self._world_coordinates[face.point_1][2] / \
-                               self._world_coordinates[face.point_1][1] * \
-                               QuakeModel.VIEWING_DISTANCE))
-            
-            vertex_2 = Point2d(int(self._world_coordinates[face.point_2][0] / \
-                               self._world_coordinates[face.point_2][1] * \
-                               QuakeModel.VIEWING_DISTANCE),
-                               int(self._world_coordinates[face.point_2][2] / \
-                               self._world_coordinates[face.point_2][1] * \
-                               QuakeModel.VIEWING_DISTANCE))
-
-            vertex_3 = Point2d(int(self._world_coordinates[face.point_3][0] / \
-                               self._world_coordinates[face.point_3][1] * \
-                               QuakeModel.VIEWING_DISTANCE),
-                               int(self._world_coordinates[face.point_3][2] / \
-                               self._world_coordinates[face.point_3][1] * \
-                               QuakeModel.VIEWING_DISTANCE))
-            
-            skin_vertex_1 = Point2d(self._texture_offsets[face.tex_index_1].s, \
-                                    self._texture_offsets[face.tex_index_1].t)
-            
-            skin_vertex_2 = Point2d(self._texture_offsets[face.tex_index_2].s, \
-                                    self._texture_offsets[face.tex_index_2].t)            
+        with profiler.stage('project'):
+            self._project_vertices()
+        
+        with profiler.stage('clip'):
+            batch = self._clip_to_near_plane(vertices, skin, vertex_ids)
+        
+        if gl_commands:
+            with profiler.stage('cull'):
+                # The strips and fans are culled in screen space, keeping the triangles the edge walk would fill.
+                edges = batch.screen[:, 1:].astype(np.int64) - batch.screen[:, :1]
+                front = np.flatnonzero(edges[:, 0, 0] * edges[:, 1, 1] - edges[:, 0, 1] * edges[:, 1, 0] > 0)
             
-            skin_vertex_3 = Point2d(self._texture_offsets[face.tex_index_3].s, \
-                                    self._texture_offsets[face.tex_index_3].t)            
+            profiler.count('triangles submitted', len(batch))
+            profiler.count('triangles culled', len(batch) - len(front))
+            batch = batch.take(front)
+        
+        if self._clip_min is not None:
+            with profiler.stage('clip'):
+                batch = self._clip_to_screen(batch)
+        
+        profiler.count('triangles rejected', self._clip_stats.rejected)
+        return batch
+    
+    def wireframe_edges(self, hide_back_faces: bool = False) -> NDArray[Shape['*, 2, 2'], Int32]:
+        """Projects the edges of the current frame of the model for drawing as a wireframe. Each edge shared by two faces is
+        only included once. Edges crossing the near plane are clipped to it and edges behind it are left out.
+
+        Args:
+            hide_back_faces (bool, optional): Whether to only include the edges of faces pointing toward the viewer. Defaults to False.
+
+        Returns:
+            NDArray[Shape['*, 2, 2'], Int32]: The screen coordinates of both ends of each edge.
+        """
+        all_edges, face_edges = self._get_edges()
+        
+        frame = None
+        if hide_back_faces:
+            frame = self._current_frame()
+            with profiler.stage('cull'):
+                edges = all_edges[np.unique(face_edges[self._front_faces(frame)])]
+        else:
+            self._should_rotate.fill(True)
+            edges = all_edges
+        
+        with profiler.stage('transform'):
+            self._apply_transformations(frame)
+        
+        with profiler.stage('project'):
+            self._project_vertices()
+        
+        profiler.count('edges submitted', len(all_edges))
+        
+        in_front = self._vertex_depths[edges] <= QuakeModel.NEAR_PLANE
+        if in_front.all():
+            return self._screen_coordinates[edges]
+        
+        world = clipping.clip_segments_to_near_plane(self._world_coordinates[edges[in_front.any(axis=1)]], QuakeModel.NEAR_PLANE)
+        return (world[:, :, (0, 2)] / world[:, :, 1:2] * QuakeModel.VIEWING_DISTANCE).astype(np.int32)
+    
+    def _clip_to_near_plane(self, vertices: NDArray[Shape['*, 3'], Int], skin: NDArray[Shape['*, 3, 2'], Float32],
+                            vertex_ids: Optional[NDArray[Shape['*, 3'], Int]] = None) -> TriangleBatch:
+        """Gathers the projected triangles in front of the near plane. Triangles entirely behind it are rejected and the
+        triangles crossing it are clipped in world space and projected again, after the triangles in front of it. Starts
+        the clipping counts for the frame.
+
+        Args:
+            vertices (NDArray[Shape['*, 3'], Int]): The vertex indices of each triangle.
+            skin (NDArray[Shape['*, 3, 2'], Float32]): The skin coordinates of each vertex of each triangle.
+            vertex_ids (Optional[NDArray[Shape['*, 3'], Int]], optional): The ids of the strip and fan vertices of each
+            triangle, or None when not drawing strips and fans. Defaults to None.
+
+        Returns:
+            TriangleBatch: The triangles in front of the near plane. The vertices made by clipping have no id.
+        """
+        vertex_depths = self._vertex_depths[vertices]
+        in_front = vertex_depths <= QuakeModel.NEAR_PLANE
+        
+        if in_front.all():
+            self._clip_stats = QuakeModel.ClipStats(0, 0, 0)
+            return TriangleBatch(self._screen_coordinates[vertices], skin, vertex_depths.mean(axis=1), vertex_depths,
+                                 np.zeros(len(vertices), dtype=np.intp), [self.texture], vertex_ids)
+        
+        whole = np.flatnonzero(in_front.all(axis=1))
+        crossing = np.flatnonzero(in_front.any(axis=1) & ~in_front.all(axis=1))
+        self._clip_stats = QuakeModel.ClipStats(len(vertices) - len(whole) - len(crossing), len(crossing), 0)
+        
+        world, clipped_skin = clipping.clip_to_near_plane(self._world_coordinates[vertices[crossing]], skin[crossing], QuakeModel.NEAR_PLANE)
+        clipped_screen = (world[:, :, (0, 2)] / world[:, :, 1:2] * QuakeModel.VIEWING_DISTANCE).astype(np.int32)
+        
+        vertex_depths = np.concatenate((vertex_depths[whole], world[:, :, 1]))
+        if vertex_ids is not None:
+            vertex_ids = np.concatenate((vertex_ids[whole], np.full((len(world), 3), -1, dtype=np.intp)))
+        
+        return TriangleBatch(np.concatenate((self._screen_coordinates[vertices[whole]], clipped_screen)),
+                             np.concatenate((skin[whole], clipped_skin)),
+                             vertex_depths.mean(axis=1),
+                             vertex_depths,
+                             np.zeros(len(vertex_depths), dtype=np.intp),
+                             [self.texture],
+                             vertex_ids)
+    
+    def _clip_to_screen(self, batch: TriangleBatch) -> TriangleBatch:
+        """Rejects the triangles whose bounding box misses the clipping rectangle, then clips the triangles that reach past
+        the guard band to it. The clipped triangles follow the others. Adds to the clipping counts for the frame.
+
+        Args:
+            batch (TriangleBatch): The projected triangles in front of the near plane.
 
-            yield TexturedTriangle(z_center, Face([vertex_1, vertex_2, vertex_3], [skin_vertex_1, skin_vertex_2, skin_vertex_3], self.texture))
+        Returns:
+            TriangleBatch: The triangles that can touch the clipping rectangle.
+        """
+        outside = clipping.outside_rectangle(batch.screen, self._clip_min, self._clip_max)
+        
+        guard_min = Point2d(self._clip_min.x - QuakeModel.GUARD_BAND, self._clip_min.y - QuakeModel.GUARD_BAND)
+        guard_max = Point2d(self._clip_max.x + QuakeModel.GUARD_BAND, self._clip_max.y + QuakeModel.GUARD_BAND)
+        beyond_guard_band = ~outside & ((batch.screen.min(axis=1) < (guard_min.x, guard_min.y)).any(axis=1) | (batch.screen.max(axis=1) > (guard_max.x, guard_max.y)).any(axis=1))
+        
+        rejected, near_clipped, _ = self._clip_stats
+        self._clip_stats = QuakeModel.ClipStats(rejected + int(outside.sum()), near_clipped, int(beyond_guard_band.sum()))
+        
+        if not beyond_guard_band.any():
+            return batch.take(np.flatnonzero(~outside)) if outside.any() else batch
+        
+        kept = batch.take(np.flatnonzero(~outside & ~beyond_guard_band))
+        clipped = batch.take(np.flatnonzero(beyond_guard_band))
+        screen, skin, vertex_depths = clipping.clip_to_rectangle(clipped.screen, clipped.skin, clipped.vertex_depths, guard_min, guard_max,
+                                                                    self._clip_perspective_correct)
+        
+        vertex_ids = None
+        if batch.vertex_ids is not None:
+            vertex_ids = np.concatenate((kept.vertex_ids, np.full((len(screen), 3), -1, dtype=np.intp)))
+        
+        return TriangleBatch(np.concatenate((kept.screen, screen)),
+                             np.concatenate((kept.skin, skin)),
+                             np.concatenate((kept.depth, vertex_depths.mean(axis=1))),
+                             np.concatenate((kept.vertex_depths, vertex_depths)),
+                             np.zeros(len(kept) + len(screen), dtype=np.intp),
+                             batch.textures,
+                             vertex_ids)
    
-    def _calculate_normals(self, frame_data: List[TriangleVertex]) -> NDArray[Shape['*, 3'], Float32]:
-        """Calculates the normals for the specified frame.
+    def _visible_faces(self, frame: AnimationFrame) -> NDArray[Shape['*'], Int]:
+        """Finds the faces to draw in the current frame and marks the vertices they use in _should_rotate. Wireframes draw
+        every face. Textured models only draw the faces pointing toward the viewer.
+
+        Args:
+            frame (AnimationFrame): The current animation frame.
+
+        Returns:
+            NDArray[Shape['*'], Int]: The indices of the faces to draw.
+        """
+        if self._render_type == RenderType.WIREFRAME:
+            self._should_rotate.fill(True)
+            return np.arange(self.header.num_faces)
         
+        return self._front_faces(frame)
+    
+    def _front_faces(self, frame: AnimationFrame) -> NDArray[Shape['*'], Int]:
+        """Finds the faces pointing toward the viewer with one product of all of the frame's normals and the viewer
+        direction, and marks the vertices they use in _should_rotate.
+
         Args:
-            frame_data (List[TriangleVertex]): The vertices for the frame.
+            frame (AnimationFrame): The current animation frame.
+
+        Returns:
+            NDArray[Shape['*'], Int]: The indices of the faces pointing toward the viewer.
+        """
+        object_viewer = (0, 150, 0) @ self._rotation_matrix
+        
+        visible_faces = np.flatnonzero(frame.normals @ object_viewer < 0)
+        
+        self._should_rotate.fill(False)
+        self._should_rotate[self._face_vertices[visible_faces]] = True
+        
+        return visible_faces
+    
+    def _strips_in_frame(self) -> Generator[TexturedStrip, None, None]:
+        """Generates the triangle strips and fans for the current frame of the model. Each vertex of a strip or fan is
+        projected once and shared by all of its triangles. Back facing triangles are culled in screen space when drawn."""
+        self._should_rotate.fill(True)
+        self._apply_transformations()
+        self._project_vertices()
+        
+        for command in self._get_gl_commands():
+            triangle_verts = [Point2d(x, y) for x, y in self._screen_coordinates[command.vertices].tolist()]
+            
+            vertex_depths = self._vertex_depths[command.vertices]
+            yield TexturedStrip(float(vertex_depths.mean()), triangle_verts, command.skin_verts, command.triangles, self.texture, vertex_depths.tolist())
+    
+    def _get_edges(self) -> Tuple[NDArray[Shape['*, 2'], Int], NDArray[Shape['*, 3'], Int]]:
+        """Gets the unique edges of the model's faces, finding them the first time.
+
+        Returns:
+            Tuple[NDArray[Shape['*, 2'], Int], NDArray[Shape['*, 3'], Int]]: The vertices of each edge, and the indices of the
+            three edges of each face.
+        """
+        if self._edges is None:
+            self._edges, self._face_edges = self._build_edges()
+        
+        return self._edges, self._face_edges
+    
+    def _build_edges(self) -> Tuple[NDArray[Shape['*, 2'], Int], NDArray[Shape['*, 3'], Int]]:
+        """Finds the unique edges of the model's faces. Each edge is keyed by its pair of vertices with the lower index
+        first, so an edge shared by two faces is only kept once.
 
         Returns:
-            NDArray[Shape['*, 3], Float32]: The normals for the frame.
+            Tuple[NDArray[Shape['*, 2'], Int], NDArray[Shape['*, 3'], Int]]: The vertices of each edge, and the indices of the
+            three edges of each face.
         """
-        u = np.empty((self.header.num_faces, 3), dtype=np.float32)
-        v = np.empty((self.header.num_faces, 3), dtype=np.float32)
+        pairs = np.sort(np.stack((self._face_vertices, np.roll(self._face_vertices, -1, axis=1)), axis=2), axis=2)
+        edges, face_edges = np.unique(pairs.reshape((-1, 2)), axis=0, return_inverse=True)
         
-        for face_index in range(self.header.num_faces):
-            u[face_index] = [frame_data[self._triangles[face_index].point_2].x - \
-                             frame_data[self._triangles[face_index].point_1].x, \
-                             frame_data[self._triangles[face_index].point_2].y - \
-                             frame_data[self._triangles[face_index].point_1].y, \
-                             frame_data[self._triangles[face_index].point_2].z - \
-                             frame_data[self._triangles[face_index].point_1].z]
+        return edges, face_edges.reshape((-1, 3))
+    
+    def _calculate_normals(self, frame_data: NDArray[Shape['*, ...'], Float32]) -> NDArray[Shape['*, ...'], Float32]:
+        """Calculates the face normals for one or more frames at once.
+        
+        Args:
+            frame_data (NDArray[Shape['*, ...'], Float32]): The vertex positions for a single frame, shaped (vertices, 3), or for
+            several frames, shaped (frames, vertices, 3).
 
-            v[face_index] = [frame_data[self._triangles[face_index].point_3].x - \
-                             frame_data[self._triangles[face_index].point_2].x, \
-                             frame_data[self._triangles[face_index].point_3].y - \
-                             frame_data[self._triangles[face_index].point_2].y, \
-                             frame_data[self._triangles[face_index].point_3].z - \
-                             frame_data[self._triangles[face_index].point_2].z]
+        Returns:
+            NDArray[Shape['*, ...'], Float32]: The normals, shaped (faces, 3) or (frames, faces, 3) to match the input.
+        """
+        point_1 = frame_data[..., self._face_vertices[:, 0], :]
+        point_2 = frame_data[..., self._face_vertices[:, 1], :]
+        point_3 = frame_data[..., self._face_vertices[:, 2], :]
 
-        return np.cross(u, v)
+        return np.cross(point_2 - point_1, point_3 - point_2)
     
     def _read_header(self, f: BufferedReader) -> Header:
         """Reads the header from the specified file.
@@ -248,83 +638,370 @@ class QuakeModel:
         data = f.read(self.header.num_faces * 12)
         return [QuakeModel.TexturedFace._make(struct.unpack('<6h', data[i:i+12])) for i in range(0, len(data), 12)]
     
-    def _read_animation_frame(self, data: bytes, frame_index: int) -> Tuple[str, List[TriangleVertex]]:
-        """Reads the specified animation frame from the specified data.
+    def _read_gl_commands(self, f: BufferedReader) -> NDArray[Shape['*'], Int32]:
+        """Reads the GL command stream from the specified file.
+
+        Args:
+            f (BufferedReader): The file to read from.
+
+        Returns:
+            NDArray[Shape['*'], Int32]: The raw GL commands.
+        """
+        f.seek(self.header.offset_gl_commands)
+        return np.frombuffer(f.read(self.header.num_gl_commands * 4), dtype='<i4')
+    
+    def _get_gl_commands(self) -> List[GlCommand]:
+        """Gets the triangle strips and fans, parsing them and gathering their triangles into arrays the first time.
+
+        Returns:
+            List[GlCommand]: The strips and fans with their triangles wound the same way as the model's triangle list.
+        """
+        if self._gl_commands is None:
+            self._gl_commands = self._parse_gl_commands(self._gl_command_data)
+            self._gl_triangle_vertices, self._gl_triangle_skin, self._gl_triangle_vertex_ids = self._flatten_gl_commands(self._gl_commands)
+        
+        return self._gl_commands
+    
+    def _parse_gl_commands(self, commands: NDArray[Shape['*'], Int32]) -> List[GlCommand]:
+        """Parses the GL command stream into triangle strips and fans. Each command is a vertex count, negative for a fan,
+        followed by a float s, float t, and vertex index for each vertex. The stream ends with a zero count.
 
         Args:
-            data (bytes): The data to read from.
-            frame_index (int): The index of the frame to read.
+            commands (NDArray[Shape['*'], Int32]): The raw GL commands.
 
         Returns:
-            Tuple[str, List[TriangleVertex]]: A tuple containing the name of the frame and the vertices for the frame.
-        """
-        scale_x, scale_y, scale_z, translate_x, translate_y, translate_z, name = struct.unpack('<6f16s', data[frame_index * self.header.frame_size:frame_index * self.header.frame_size + 40])
-        name = name.decode('utf-8').strip('\x00')
-        name = re.sub(r'[^a-zA-Z]', '', name)
-        
-        frame_data = []            
-        for unpack_frame_index in range(self.header.num_vertices):
-            x, y, z, light_normal_index = struct.unpack('<4B', data[frame_index * self.header.frame_size + 40 + unpack_frame_index * 4:frame_index * self.header.frame_size + 40 + unpack_frame_index * 4 + 4])
-            x = x * scale_x + translate_x
-            y = y * scale_y + translate_y
-            z = z * scale_z + translate_z
-            frame_data.append(QuakeModel.TriangleVertex._make((x, y, z, light_normal_index)))
+            List[GlCommand]: The strips and fans with their triangles wound the same way as the model's triangle list.
+        """
+        tex_coords = commands.view('<f4')
+        max_s = self.texture.width - 1
+        max_t = self.texture.height - 1
+        
+        gl_commands = []
+        index = 0
+        while index < len(commands) and commands[index] != 0:
+            count = int(commands[index])
+            fan = count < 0
+            count = abs(count)
+            block = slice(index + 1, index + 1 + count * 3)
+            index += 1 + count * 3
+            
+            vertices = commands[block][2::3].astype(np.intp)
             
-        return name, frame_data
+            # The GL texture coordinates are texel centers scaled to 0..1, so undo that to match the triangle list's texel offsets.
+            skin_s = np.clip(tex_coords[block][0::3] * self.header.skin_width - 0.5, 0, max_s)
+            skin_t = np.clip(tex_coords[block][1::3] * self.header.skin_height - 0.5, 0, max_t)
+            skin_verts = [Point2d(s, t) for s, t in zip(skin_s.tolist(), skin_t.tolist())]
+            
+            if fan:
+                triangles = [(0, vertex + 1, vertex + 2) for vertex in range(count - 2)]
+            else:
+                # Every other triangle in a strip is flipped to keep the winding the same.
+                triangles = [(vertex, vertex + 1, vertex + 2) if vertex % 2 == 0 else (vertex + 1, vertex, vertex + 2) for vertex in range(count - 2)]
+            
+            gl_commands.append(QuakeModel.GlCommand._make((fan, vertices, skin_verts, triangles)))
+        
+        if not self._gl_commands_match_face_winding(gl_commands):
+            gl_commands = [command._replace(triangles=[(b, a, c) for a, b, c in command.triangles]) for command in gl_commands]
+        
+        return gl_commands
+    
+    def _flatten_gl_commands(self, gl_commands: List[GlCommand]) -> Tuple[NDArray[Shape['*, 3'], Int], NDArray[Shape['*, 3, 2'], Float32], NDArray[Shape['*, 3'], Int]]:
+        """Gathers the triangles of every strip and fan into arrays. Each vertex of each strip or fan gets its own id, so
+        the triangles sharing a strip or fan vertex share its id.
+
+        Args:
+            gl_commands (List[GlCommand]): The parsed strips and fans.
+
+        Returns:
+            Tuple[NDArray[Shape['*, 3'], Int], NDArray[Shape['*, 3, 2'], Float32], NDArray[Shape['*, 3'], Int]]: The vertex
+            indices, the skin coordinates, and the strip and fan vertex ids of each triangle.
+        """
+        vertices = [np.empty((0, 3), dtype=np.intp)]
+        skin = [np.empty((0, 3, 2), dtype=np.float32)]
+        vertex_ids = [np.empty((0, 3), dtype=np.intp)]
+        first_id = 0
+        
+        for command in gl_commands:
+            if command.triangles:
+                triangles = np.array(command.triangles, dtype=np.intp)
+                vertices.append(command.vertices[triangles])
+                skin.append(np.array([(vertex.x, vertex.y) for vertex in command.skin_verts], dtype=np.float32)[triangles])
+                vertex_ids.append(triangles + first_id)
+            first_id += len(command.vertices)
+        
+        return np.concatenate(vertices), np.concatenate(skin), np.concatenate(vertex_ids)
+    
+    def _gl_commands_match_face_winding(self, gl_commands: List[GlCommand]) -> bool:
+        """Checks whether the GL commands wind their triangles the same way as the triangle list, by finding the first GL
+        triangle that is also in the triangle list.
+
+        Args:
+            gl_commands (List[GlCommand]): The parsed strips and fans.
+
+        Returns:
+            bool: Whether the winding matches. True when no triangle is in both.
+        """
+        faces = {frozenset(face): face for face in map(tuple, self._face_vertices.tolist())}
+        
+        for command in gl_commands:
+            for triangle in command.triangles:
+                vertices = tuple(int(command.vertices[vertex]) for vertex in triangle)
+                face = faces.get(frozenset(vertices))
+                
+                if face is not None and len(set(face)) == 3:
+                    return vertices in (face, face[1:] + face[:1], face[2:] + face[:2])
+        
+        return True
+    
+    def _frame_dtype(self) -> np.dtype:
+        """Builds the structured dtype describing a single animation frame in the file.
+
+        Returns:
+            np.dtype: A dtype with the frame's scale, translation, name, and packed vertices.
+        """
+        return np.dtype({'names': ['scale', 'translate', 'name', 'vertices'],
+                         'formats': [('<f4', 3), ('<f4', 3), 'S16', ('u1', (self.header.num_vertices, 4))],
+                         'offsets': [0, 12, 24, 40],
+                         'itemsize': self.header.frame_size})
+
+    def _decode_frame_names(self, frames: np.ndarray) -> List[str]:
+        """Decodes the names of the specified animation frames.
+
+        Args:
+            frames (np.ndarray): The frame records, using the dtype from _frame_dtype.
+
+        Returns:
+            List[str]: The name of each frame with the frame number and any other non letters removed.
+        """
+        return [re.sub(r'[^a-zA-Z]', '', name.decode('utf-8').strip('\x00')) for name in frames['name']]
+
+    def _decode_animation_frames(self, frames: np.ndarray) -> Tuple[NDArray[Shape['*, *, 3'], Float32], NDArray[Shape['*, *'], UInt8]]:
+        """Decodes the vertices of the specified animation frames in a single pass.
+
+        Args:
+            frames (np.ndarray): The frame records, using the dtype from _frame_dtype.
+
+        Returns:
+            Tuple[NDArray[Shape['*, *, 3'], Float32], NDArray[Shape['*, *'], UInt8]]: A tuple containing the scaled and translated
+            vertex positions for each frame and the light normal index of each vertex for each frame.
+        """
+        vertices = frames['vertices']
+        positions = vertices[:, :, :3] * frames['scale'][:, np.newaxis, :] + frames['translate'][:, np.newaxis, :]
+        
+        return positions.astype(np.float32, copy=False), vertices[:, :, 3].copy()
     
     def _read_animation_frames(self, f: BufferedReader) -> None:
-        """Reads the animation frames from the specified file.
+        """Reads the animation frames from the specified file. With lazy frame storage the file is memory mapped and only the
+        frame names are decoded. With quantized frame storage the packed frames are kept as they are in the file, four bytes
+        per vertex plus the scale and translation of each frame, and only the frame names are decoded.
 
         Args:
             f (BufferedReader): The file to read from.
         """
-        f.seek(self.header.offset_frames)
-        data = f.read(self.header.num_frames * self.header.frame_size)
+        if self._frame_storage == FrameStorage.LAZY:
+            self._mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            frames = np.frombuffer(self._mapped_file, dtype=self._frame_dtype(), count=self.header.num_frames, offset=self.header.offset_frames)
+        else:
+            f.seek(self.header.offset_frames)
+            data = f.read(self.header.num_frames * self.header.frame_size)
+            frames = np.frombuffer(data, dtype=self._frame_dtype(), count=self.header.num_frames)
+        
+        names = self._decode_frame_names(frames)
+        self._sequences = self._group_sequences(names)
+        
+        if self._frame_storage != FrameStorage.EAGER:
+            self._frame_records = frames
+            self._frame_names = names
+            return
+        
+        self._frame_names = names
+        self._frame_positions, self._light_normal_indices = self._decode_animation_frames(frames)
+        self._frame_normals = self._calculate_normals(self._frame_positions)
+        self._frame_unit_normals = la.normalize(self._frame_normals)
+        self._build_frames()
+    
+    def _build_frames(self) -> None:
+        """Builds the list of animation frames from the decoded frame names, positions, and normals."""
+        self._frames = []
+        for frame_index, name in enumerate(self._frame_names):
+            self._frames.append(QuakeModel.AnimationFrame._make((name, self._frame_positions[frame_index], self._frame_normals[frame_index], self._frame_unit_normals[frame_index])))
+    
+    def _read_cache(self, cache_filename: str, quake_filename: str) -> bool:
+        """Loads the decoded model from the compiled cache. The frame arrays stay memory mapped.
+
+        Args:
+            cache_filename (str): The full path to the cache file.
+            quake_filename (str): The full path to the Quake model the cache was built from.
+
+        Returns:
+            bool: Whether the cache was valid and loaded.
+        """
+        cached = compiled_cache.read(cache_filename, quake_filename, 'md2')
         
+        if cached is None:
+            return False
+        
+        arrays, metadata = cached
+        self.header = QuakeModel.Header._make(struct.unpack('<15i', arrays['header'].tobytes()))
+        self._texture_offsets = [QuakeModel.SkinTextureOffset._make(offset) for offset in arrays['texture_offsets'].tolist()]
+        self._triangles = [QuakeModel.TexturedFace._make(face) for face in arrays['faces'].tolist()]
+        self._face_vertices = arrays['faces'][:, :3].astype(np.intp)
+        self._gl_command_data = arrays['gl_commands']
+        self._frame_names = metadata['frame_names']
+        self._frame_positions = arrays['positions']
+        self._light_normal_indices = arrays['light_normal_indices']
+        self._frame_normals = arrays['normals']
+        self._frame_unit_normals = arrays['unit_normals']
+        self._sequences = [QuakeModel.Sequence._make(sequence) for sequence in metadata['sequences']]
+        self._build_frames()
+        return True
+    
+    def _write_cache(self, cache_filename: str, quake_filename: str) -> None:
+        """Saves the decoded model to the compiled cache.
+
+        Args:
+            cache_filename (str): The full path to the cache file.
+            quake_filename (str): The full path to the Quake model the cache is built from.
+        """
+        arrays = {
+            'header': np.frombuffer(struct.pack('<15i', *self.header), dtype=np.uint8),
+            'texture_offsets': np.array(self._texture_offsets, dtype=np.int16).reshape((-1, 2)),
+            'faces': np.array(self._triangles, dtype=np.int16).reshape((-1, 6)),
+            'gl_commands': self._gl_command_data,
+            'positions': self._frame_positions,
+            'light_normal_indices': self._light_normal_indices,
+            'normals': self._frame_normals,
+            'unit_normals': self._frame_unit_normals
+        }
+        metadata = {'frame_names': self._frame_names, 'sequences': [list(sequence) for sequence in self._sequences]}
+        compiled_cache.write(cache_filename, quake_filename, 'md2', arrays, metadata)
+    
+    def _group_sequences(self, names: List[str]) -> List[Sequence]:
+        """Groups consecutive frames with the same name into animation sequences.
+
+        Args:
+            names (List[str]): The name of each frame.
+
+        Returns:
+            List[Sequence]: The animation sequences in the order they appear in the file.
+        """
         last_group_name = ''
-        name = ''
-        self._sequences = []
+        sequences = []
         num_sequences = 0
-        self._frames = []
         
-        for frame_index in range(self.header.num_frames):            
-            name, frame_data = self._read_animation_frame(data, frame_index)
-            normals = self._calculate_normals(frame_data)
-            self._frames.append(QuakeModel.AnimationFrame._make((name, frame_data, normals)))
-            
+        for frame_index, name in enumerate(names):
             if last_group_name != name:
-                self._sequences.append(QuakeModel.Sequence._make((name, frame_index, 0)))
+                sequences.append(QuakeModel.Sequence._make((name, frame_index, 0)))
                 
                 if num_sequences > 0:
-                    self._sequences[num_sequences - 1] = self._sequences[num_sequences - 1]._replace(num_frames = frame_index - self._sequences[num_sequences - 1].start_frame)
+                    sequences[num_sequences - 1] = sequences[num_sequences - 1]._replace(num_frames = frame_index - sequences[num_sequences - 1].start_frame)
                 
                 num_sequences += 1
                 last_group_name = name
 
         
-        self._sequences[num_sequences - 1] = self._sequences[num_sequences - 1]._replace(num_frames = self.header.num_frames - self._sequences[num_sequences - 1].start_frame)
+        sequences[num_sequences - 1] = sequences[num_sequences - 1]._replace(num_frames = len(names) - sequences[num_sequences - 1].start_frame)
+        
+        return sequences
+    
+    def _get_frame(self, frame_index: int) -> AnimationFrame:
+        """Gets the specified animation frame, decoding it first with lazy or quantized frame storage if it is not in the frame cache.
+
+        Args:
+            frame_index (int): The index of the frame.
+
+        Returns:
+            AnimationFrame: The animation frame.
+        """
+        if self._frame_cache is not None:
+            return self._frame_cache.get(frame_index, self._load_frame)
+        
+        return self._frames[frame_index]
+    
+    def _current_frame(self) -> AnimationFrame:
+        """Gets the current animation frame. While blending, the vertices and normals of the current and next frames are
+        interpolated with one vectorized lerp each, and the result is kept until the frame or blend changes.
+
+        Returns:
+            AnimationFrame: The current animation frame, or the blend of it and the next one.
+        """
+        if self._blend == 0:
+            return self._get_frame(self._frame)
         
-    def _apply_transformations(self):
-        """Rotates, scales, and translates the model."""
-        rotate = la.rotate_x(self._rotation[0]) @ la.rotate_y(self._rotation[1]) @ la.rotate_z(self._rotation[2])
+        key = (self._frame, self._blend)
+        if self._blended_frame is None or self._blended_frame[0] != key:
+            start = self._get_frame(self._frame)
+            end = self._get_frame(self._next_frame_index(self._frame))
+            normals = la.lerp(start.normals, end.normals, self._blend)
+            frame = QuakeModel.AnimationFrame._make((start.name, la.lerp(start.frame_data, end.frame_data, self._blend), normals, la.normalize(normals)))
+            self._blended_frame = (key, frame)
         
-        frame = self._frames[self._frame]
+        return self._blended_frame[1]
+    
+    def _load_frame(self, frame_index: int) -> AnimationFrame:
+        """Decodes the specified animation frame from the memory mapped file or the packed frames.
+
+        Args:
+            frame_index (int): The index of the frame.
+
+        Returns:
+            AnimationFrame: The decoded animation frame.
+        """
+        positions, _ = self._decode_animation_frames(self._frame_records[frame_index:frame_index + 1])
+        normals = self._calculate_normals(positions[0])
         
-        for index in range(self.header.num_vertices):
-            if self._should_rotate[index]:
-                x = frame.frame_data[index].x * self._scale * rotate[0, 0] + \
-                    frame.frame_data[index].y * self._scale * rotate[1, 0] + \
-                    frame.frame_data[index].z * self._scale * rotate[2, 0] + \
-                    self._translation[0]
-                                                    
-                y = frame.frame_data[index].x * self._scale * rotate[0, 1] + \
-                    frame.frame_data[index].y * self._scale * rotate[1, 1] + \
-                    frame.frame_data[index].z * self._scale * rotate[2, 1] + \
-                    self._translation[1]
-                
-                z = frame.frame_data[index].x * self._scale * rotate[0, 2] + \
-                    frame.frame_data[index].y * self._scale * rotate[1, 2] + \
-                    frame.frame_data[index].z * self._scale * rotate[2, 2] + \
-                    self._translation[2]
-                
-                self._world_coordinates[index] = (x, y, z)   
+        return QuakeModel.AnimationFrame._make((self._frame_names[frame_index], positions[0], normals, la.normalize(normals)))
+    
+    def _next_frame_index(self, frame_index: int) -> int:
+        """Gets the frame after the specified frame in the current sequence, looping back to the start of the sequence at its end.
+
+        Args:
+            frame_index (int): The index of the frame.
+
+        Returns:
+            int: The index of the next frame.
+        """
+        sequence = self._sequences[self._sequence]
+        frame_index += 1
+        
+        if frame_index >= sequence.start_frame + sequence.num_frames:
+            frame_index = sequence.start_frame
+        
+        return frame_index
+        
+    def _apply_transformations(self, frame: Optional[AnimationFrame] = None) -> None:
+        """Rotates, scales, and translates the vertices marked in _should_rotate as one fused affine transform. The marked
+        vertices are compacted into an index array first, unless every vertex is marked. With quantized frame storage the
+        frame's own scale and translation are folded into the transform, so the packed vertices are used directly, unless
+        the model is blending between two frames.
+
+        Args:
+            frame (Optional[AnimationFrame], optional): The current animation frame when it has already been looked up for
+            this build, or None to look it up. Defaults to None.
+        """
+        if self._frame_storage == FrameStorage.QUANTIZED and self._blend == 0:
+            frame = self._frame_records[self._frame]
+            vertices = frame['vertices'][:, :3]
+            transform = frame['scale'][:, np.newaxis] * self._transform
+            translation = frame['translate'] @ self._transform + self._translation
+        else:
+            vertices = (frame or self._current_frame()).frame_data
+            transform = self._transform
+            translation = self._translation
+        
+        if self._should_rotate.all():
+            self._world_coordinates[:] = vertices @ transform + translation
+        else:
+            indices = np.flatnonzero(self._should_rotate)
+            self._world_coordinates[indices] = vertices[indices] @ transform + translation
+    
+    def _project_vertices(self) -> None:
+        """Projects the vertices marked in _should_rotate to the screen in one pass, so each vertex is divided once no matter
+        how many faces share it. The depth of each vertex is kept for sorting. Vertices behind the near plane project to
+        meaningless coordinates, which are never used because their triangles are clipped."""
+        indices = slice(None) if self._should_rotate.all() else np.flatnonzero(self._should_rotate)
+        world = self._world_coordinates[indices]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._screen_coordinates[indices] = world[:, (0, 2)] / world[:, 1:2] * QuakeModel.VIEWING_DISTANCE
+        self._vertex_depths[indices] = world[:, 1]
@@ -1,26 +1,45 @@
 from collections import namedtuple
 from io import BufferedReader
 import struct
+from typing import Optional
 
-from nptyping import NDArray, Shape, UInt8
+from nptyping import NDArray, Shape, UInt8, UInt32
 import numpy as np
 
+import compiled_cache
+
 class Pcx:
     rle_bit = 192
     color_table_size = 256
     palette_offset = -768
+    header_format = '<BBBBHHHHHH48sBBHH58s'
     
     Header = namedtuple('Header', 'manufacturer version encoding bits_per_pixel x_min y_min x_max y_max hres vres ega_palette reserved color_planes bytes_per_line palette_type filler')
     
-    def from_file(self, filename: str) -> None:
-        """Reads a PCX file and stores the data in the object.
+    def __init__(self):
+        """The constructor for the Pcx class."""
+        self._argb_palette: Optional[NDArray[Shape['256'], UInt32]] = None
+        self._argb_image: Optional[NDArray[Shape['*,*'], UInt32]] = None
+    
+    def from_file(self, filename: str, use_cache: bool = True, cache_dir: Optional[str] = None) -> None:
+        """Reads a PCX file and stores the data in the object. The decoded image and palette are loaded from a compiled cache
+        when it is valid for the file, and the cache is rebuilt when it is missing or stale.
 
         Args:
             filename (str): The full path of the file to read.
+            use_cache (bool, optional): Whether to use the compiled cache. Defaults to True.
+            cache_dir (Optional[str], optional): The directory for the compiled cache, or None to keep it next to the file. Defaults to None.
 
         Raises:
             ValueError: If the file is not a supported PCX file.
         """
+        self._argb_palette = None
+        self._argb_image = None
+        cache_filename = compiled_cache.cache_filename(filename, cache_dir) if use_cache else None
+        
+        if cache_filename is not None and self._read_cache(cache_filename, filename):
+            return
+        
         with open(filename, 'rb') as f:
             self.header = self._read_header(f)
             
@@ -29,6 +48,9 @@ class Pcx:
                 self.palette = self._read_palette(f)
             else:
                 raise ValueError('Unsupported PCX file format')                    
+        
+        if cache_filename is not None:
+            self._write_cache(cache_filename, filename)
     
     @property
     def height(self) -> int:
@@ -40,6 +62,23 @@ class Pcx:
         """Returns the width of the image in pixels."""
         return self.header.x_max - self.header.x_min + 1        
     
+    @property
+    def argb_palette(self) -> NDArray[Shape['256'], UInt32]:
+        """Returns the palette as 32 bit ARGB colors, one per palette index. It is built on first use."""
+        if self._argb_palette is None:
+            palette = self.palette.astype(np.uint32)
+            self._argb_palette = 0xFF000000 | (palette[:, 0] << 16) | (palette[:, 1] << 8) | palette[:, 2]
+        
+        return self._argb_palette
+    
+    @property
+    def argb_image(self) -> NDArray[Shape['*,*'], UInt32]:
+        """Returns the image with the palette applied as 32 bit ARGB colors, indexed by x and then y. It is built on first use."""
+        if self._argb_image is None:
+            self._argb_image = self.argb_palette[self.image_data]
+        
+        return self._argb_image
+    
     def _read_palette(self, f: BufferedReader) -> NDArray[Shape['768, 3'], UInt8]:
         """Seek to the end of the file and then back 768 bytes to read the palette
         
@@ -51,37 +90,63 @@ class Pcx:
         return np.frombuffer(data, dtype=np.uint8).reshape((self.color_table_size, 3))
     
     def _read_image(self, f: BufferedReader) -> NDArray[Shape['*,*'], UInt8]:
-        """Reads the image data from the file.
+        """Reads the image data from the file. The run length encoded data, up to the palette at the end of the file, is
+        read in one go and decoded with array operations. Each scan line is bytes_per_line long and any padding past the
+        width of the image is dropped.
+
+        Args:
+            f (BufferedReader): The file to read from, positioned after the header.
+
+        Raises:
+            ValueError: If the image data ends before the image is complete.
 
         Returns:
-            NDArray[Shape['*,*', UInt8]]: An array of the image data.
+            NDArray[Shape['*,*', UInt8]]: An array of the image data, indexed by x and then y.
         """
         x_size = self.header.x_max - self.header.x_min + 1
         y_size = self.header.y_max - self.header.y_min + 1
+        bytes_per_line = max(self.header.bytes_per_line, x_size)
         
-        image_data = np.zeros(x_size * y_size, dtype=np.uint8)
+        encoded = np.frombuffer(f.read()[:self.palette_offset], dtype=np.uint8)
+        decoded = Pcx._decode_rle(encoded)
         
-        decoded_bytes_read = 0
+        if len(decoded) < bytes_per_line * y_size:
+            raise ValueError('The PCX image data is truncated')
         
-        while decoded_bytes_read < x_size * y_size:
-            # When the process byte is less then 192 then it is an index into the palette.
-            # If it greater then 192, then there are (byte - 192) number of entries
-            # in the color of the *next* byte
-            byte = f.read(1)[0]
-            
-            if byte >= Pcx.rle_bit:
-                count = byte - Pcx.rle_bit
-                byte = f.read(1)[0]
-                
-                for i in range(count):
-                    image_data[decoded_bytes_read] = byte
-                    decoded_bytes_read += 1
-            else:
-                image_data[decoded_bytes_read] = byte
-                decoded_bytes_read += 1
+        return decoded[:bytes_per_line * y_size].reshape((y_size, bytes_per_line))[:, :x_size].T
+    
+    @staticmethod
+    def _decode_rle(encoded: NDArray[Shape['*'], UInt8]) -> NDArray[Shape['*'], UInt8]:
+        """Decodes PCX run length encoded bytes. A byte of 192 or more is a run marker, and the run is (byte - 192) copies
+        of the *next* byte. Any other byte is a palette index on its own.
+        
+        A byte below 192 always ends a run or is a run on its own, so each streak of bytes of 192 or more starts a new run
+        and alternates between markers and the values they repeat. That finds every run without decoding them in order.
+
+        Args:
+            encoded (NDArray[Shape['*'], UInt8]): The encoded bytes.
+
+        Returns:
+            NDArray[Shape['*'], UInt8]: The decoded bytes.
+        """
+        positions = np.arange(len(encoded))
+        high = encoded >= Pcx.rle_bit
+        
+        streak_starts = high.copy()
+        streak_starts[1:] &= ~high[:-1]
+        streak_offsets = positions - np.maximum.accumulate(np.where(streak_starts, positions, 0))
         
-        return image_data.reshape((x_size, y_size), order='F')
-                    
+        markers = high & (streak_offsets % 2 == 0)
+        markers[-1:] = False
+        repeated = np.zeros_like(markers)
+        repeated[1:] = markers[:-1]
+        
+        runs = np.flatnonzero(~repeated)
+        counts = np.where(markers[runs], encoded[runs] - Pcx.rle_bit, 1)
+        values = np.where(markers[runs], encoded[np.minimum(runs + 1, len(encoded) - 1)], encoded[runs])
+        
+        return np.repeat(values, counts)
+    
     def _read_header(self, f: BufferedReader) -> Header:
         """Reads the header from the file.
         
@@ -89,4 +154,35 @@ class Pcx:
             Header: A named tuple containing the header data.
         """
         data = f.read(128)
-        return Pcx.Header._make(struct.unpack('<BBBBHHHHHH48sBBHH58s', data))
\ No newline at end of file
+        return Pcx.Header._make(struct.unpack(Pcx.header_format, data))
+    
+    def _read_cache(self, cache_filename: str, filename: str) -> bool:
+        """Loads the header, image, and palette from the compiled cache.
+
+        Args:
+            cache_filename (str): The full path of the cache file.
+            filename (str): The full path of the PCX file the cache was built from.
+
+        Returns:
+            bool: Whether the cache was valid and loaded.
+        """
+        cached = compiled_cache.read(cache_filename, filename, 'pcx')
+        
+        if cached is None:
+            return False
+        
+        arrays, _ = cached
+        self.header = Pcx.Header._make(struct.unpack(Pcx.header_format, arrays['header'].tobytes()))
+        self.image_data = arrays['image_data']
+        self.palette = arrays['palette']
+        return True
+    
+    def _write_cache(self, cache_filename: str, filename: str) -> None:
+        """Saves the header, image, and palette to the compiled cache.
+
+        Args:
+            cache_filename (str): The full path of the cache file.
+            filename (str): The full path of the PCX file the cache is built from.
+        """
+        header = np.frombuffer(struct.pack(Pcx.header_format, *self.header), dtype=np.uint8)
+        compiled_cache.write(cache_filename, filename, 'pcx', {'header': header, 'image_data': self.image_data, 'palette': self.palette}, {})
\ No newline at end of file
@@ -0,0 +1,230 @@
+from collections import defaultdict, deque, namedtuple
+from contextlib import nullcontext
+import csv
+import json
+import threading
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Instrumentation for the stages of drawing a frame. The stages are timed with the module's profiler:
+#
+#   with profiler.stage('transform'):
+#       ...
+#
+# and counts, such as the number of pixels filled, are added with profiler.count. While the profiler is disabled,
+# stage returns one shared context that does nothing and count returns at once, so the hooks cost almost nothing.
+#
+# Each thread times its stages and adds its counts separately. Work for a frame done on another thread, such as building
+# the next frame's geometry on a worker thread, is captured there and merged into the frame it is drawn in.
+
+# The stages and counts captured on a thread, to merge into a frame. Each stage is its name, start, and duration.
+ProfileCapture = namedtuple('ProfileCapture', 'events counts')
+
+class _ThreadState(threading.local):
+    def __init__(self):
+        """The constructor for the _ThreadState class, the frame or capture being timed on each thread."""
+        self.frame_start: Optional[float] = None
+        self.events: List[Tuple[str, float, float, int]] = []
+        self.counts: Dict[str, int] = defaultdict(int)
+
+class Profiler:
+    # The number of recent frames averaged for the HUD.
+    ROLLING_FRAMES = 30
+
+    def __init__(self):
+        """The constructor for the Profiler class. The profiler starts disabled."""
+        self.enabled = False
+        self.record = False
+        self._origin = time.perf_counter()
+        self._null_stage = nullcontext()
+        self._stages: Dict[str, '_Stage'] = {}
+        self._state = _ThreadState()
+        self._recent: Deque[Tuple[float, Dict[str, float], Dict[str, int]]] = deque(maxlen=Profiler.ROLLING_FRAMES)
+        self._frames: List[Tuple[float, float, List[Tuple[str, float, float, int]], Dict[str, int]]] = []
+
+    def stage(self, name: str):
+        """Times a stage of the frame as a context manager.
+
+        Args:
+            name (str): The name of the stage.
+
+        Returns:
+            A context manager that times the stage, or does nothing while the profiler is disabled.
+        """
+        if not self.enabled:
+            return self._null_stage
+
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = _Stage(self, name)
+        return stage
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Adds to a count for the frame, such as the number of triangles drawn.
+
+        Args:
+            name (str): The name of the count.
+            amount (int, optional): The amount to add. Defaults to 1.
+        """
+        if self.enabled:
+            self._state.counts[name] += amount
+
+    def begin_frame(self) -> None:
+        """Starts timing a frame. Stages and counts on this thread until end_frame belong to it."""
+        if not self.enabled:
+            return
+
+        self._state.frame_start = time.perf_counter()
+        self._state.events = []
+        self._state.counts = defaultdict(int)
+
+    def end_frame(self) -> None:
+        """Finishes timing a frame and adds it to the rolling averages, and to the recorded frames when recording."""
+        state = self._state
+        if not self.enabled or state.frame_start is None:
+            return
+
+        duration = time.perf_counter() - state.frame_start
+        stage_seconds: Dict[str, float] = defaultdict(float)
+        for name, _, seconds, _ in state.events:
+            stage_seconds[name] += seconds
+
+        self._recent.append((duration, dict(stage_seconds), dict(state.counts)))
+        if self.record:
+            self._frames.append((state.frame_start - self._origin, duration, state.events, dict(state.counts)))
+
+        state.frame_start = None
+
+    def begin_capture(self) -> None:
+        """Starts capturing the stages and counts on this thread, such as a worker thread building a frame that is drawn
+        later. They belong to the capture until end_capture instead of to a frame."""
+        self.begin_frame()
+
+    def end_capture(self) -> Optional[ProfileCapture]:
+        """Finishes capturing the stages and counts on this thread.
+
+        Returns:
+            Optional[ProfileCapture]: The stages and counts captured, or None when the profiler was disabled.
+        """
+        state = self._state
+        if not self.enabled or state.frame_start is None:
+            return None
+
+        state.frame_start = None
+        return ProfileCapture(state.events, dict(state.counts))
+
+    def merge(self, capture: Optional[ProfileCapture]) -> None:
+        """Adds the stages and counts captured on another thread to the frame being timed on this thread. The stages keep
+        the times they ran at, so they can overlap the stages of this thread.
+
+        Args:
+            capture (Optional[ProfileCapture]): The stages and counts captured, or None to add nothing.
+        """
+        state = self._state
+        if capture is None or not self.enabled or state.frame_start is None:
+            return
+
+        state.events.extend((name, start, seconds, 1) for name, start, seconds, _ in capture.events)
+        for name, amount in capture.counts.items():
+            state.counts[name] += amount
+
+    def rolling_milliseconds(self) -> Dict[str, float]:
+        """Gets the time of each stage, and of the whole frame, in milliseconds averaged over the recent frames.
+
+        Returns:
+            Dict[str, float]: The average milliseconds by stage, with the whole frame as 'frame'.
+        """
+        if not self._recent:
+            return {}
+
+        totals: Dict[str, float] = defaultdict(float)
+        for duration, stage_seconds, _ in self._recent:
+            totals['frame'] += duration
+            for name, seconds in stage_seconds.items():
+                totals[name] += seconds
+
+        return {name: total * 1000 / len(self._recent) for name, total in totals.items()}
+
+    def last_counts(self) -> Dict[str, int]:
+        """Gets the counts of the last finished frame."""
+        return self._recent[-1][2] if self._recent else {}
+
+    def write_trace(self, filename: str) -> None:
+        """Writes the recorded frames to a file, as Chrome trace events when it ends in .json, otherwise as CSV with one
+        row per frame.
+
+        Args:
+            filename (str): The full path of the file to write.
+        """
+        if filename.lower().endswith('.json'):
+            self.write_chrome_trace(filename)
+        else:
+            self.write_csv(filename)
+
+    def write_chrome_trace(self, filename: str) -> None:
+        """Writes the recorded frames as Chrome trace events, which chrome://tracing and Perfetto can open. Each frame and
+        each stage is a complete event and the counts of each frame are counter events. Stages merged from another thread
+        are on a thread of their own.
+
+        Args:
+            filename (str): The full path of the file to write.
+        """
+        events = []
+        for index, (start, duration, stage_events, counts) in enumerate(self._frames):
+            events.append({'name': 'frame', 'ph': 'X', 'ts': start * 1e6, 'dur': duration * 1e6, 'pid': 0, 'tid': 0, 'args': {'frame': index}})
+            for name, stage_start, seconds, thread in stage_events:
+                events.append({'name': name, 'ph': 'X', 'ts': stage_start * 1e6, 'dur': seconds * 1e6, 'pid': 0, 'tid': thread})
+            if counts:
+                events.append({'name': 'counts', 'ph': 'C', 'ts': start * 1e6, 'pid': 0, 'args': counts})
+
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def write_csv(self, filename: str) -> None:
+        """Writes the recorded frames as CSV, one row per frame with the milliseconds of each stage and each count.
+
+        Args:
+            filename (str): The full path of the file to write.
+        """
+        stage_names = sorted({name for _, _, stage_events, _ in self._frames for name, _, _, _ in stage_events})
+        count_names = sorted({name for _, _, _, counts in self._frames for name in counts})
+
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', 'start_ms', 'frame_ms'] + [f'{name}_ms' for name in stage_names] + count_names)
+
+            for index, (start, duration, stage_events, counts) in enumerate(self._frames):
+                stage_seconds: Dict[str, float] = defaultdict(float)
+                for name, _, seconds, _ in stage_events:
+                    stage_seconds[name] += seconds
+
+                writer.writerow([index, f'{start * 1000:.3f}', f'{duration * 1000:.3f}'] + [f'{stage_seconds[name] * 1000:.3f}' for name in stage_names]
+                                + [counts.get(name, 0) for name in count_names])
+
+class _Stage:
+    def __init__(self, profiler: Profiler, name: str):
+        """The constructor for the _Stage class, which times one stage each time it is entered.
+
+        Args:
+            profiler (Profiler): The profiler to add the times to.
+            name (str): The name of the stage.
+        """
+        self._profiler = profiler
+        self._name = name
+        # The same stage can be timed on several threads at once.
+        self._starts = threading.local()
+
+    def __enter__(self) -> None:
+        starts = getattr(self._starts, 'stack', None)
+        if starts is None:
+            starts = self._starts.stack = []
+        starts.append(time.perf_counter())
+
+    def __exit__(self, *args) -> None:
+        end = time.perf_counter()
+        start = self._starts.stack.pop()
+        state = self._profiler._state
+        if state.frame_start is not None:
+            state.events.append((self._name, start - self._profiler._origin, end - start, 0))
+
+profiler = Profiler()
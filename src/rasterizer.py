@@ -0,0 +1,5 @@
+from enum import Enum, auto
+
+class Rasterizer(Enum):
+    EDGE_WALK = auto()
+    BARYCENTRIC = auto()
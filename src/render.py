@@ -0,0 +1,260 @@
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sys
+import time
+from typing import List, Optional, Tuple
+
+from nptyping import NDArray, Shape, UInt32
+import numpy as np
+import pygame
+
+from animation_clock import AnimationClock
+from graphics import Graphics
+from model import QuakeModel
+from point2d import Point2d
+from rasterizer import Rasterizer
+from render_type import RenderType
+
+# Renders the animation frames of Quake models to image files without a display, spreading the models over a pool of
+# worker processes. Each task renders every chosen sequence of one model, so a model is loaded once and released when
+# its task is done. A model that fails to load or render is reported without stopping the others.
+
+RenderOptions = namedtuple('RenderOptions', 'render_type rotation turntable scale width height output_dir image_format rasterizer depth_buffered perspective_correct keyframe_rate frame_rate')
+RenderTask = namedtuple('RenderTask', 'quake_filename sequences')
+RenderResult = namedtuple('RenderResult', 'quake_filename frames seconds error')
+
+WIREFRAME_COLOR = 0xFFFFFFFF
+
+# The viewer positions the model for a 1000 x 1000 window. Other resolutions scale the position and size to match.
+VIEWER_SIZE = 1000
+VIEWER_TRANSLATION = (85, -250, 70)
+
+_options: Optional[RenderOptions] = None
+_graphics: Optional[Graphics] = None
+
+def _initialize_worker(options: RenderOptions) -> None:
+    """Sets up a worker process, or the main process when rendering without workers.
+
+    Args:
+        options (RenderOptions): How to render the frames.
+    """
+    global _options, _graphics
+
+    _options = options
+    _graphics = Graphics(options.rasterizer, options.depth_buffered, options.perspective_correct)
+    _graphics.set_clip(Point2d(0, 0), Point2d(options.width, options.height))
+
+def _load_model(quake_filename: str) -> QuakeModel:
+    """Loads a model to render.
+
+    Args:
+        quake_filename (str): The full path to the Quake model version 2 md2 file.
+
+    Returns:
+        QuakeModel: The model, placed in the middle of the output image.
+    """
+    pcx_filename = os.path.splitext(quake_filename)[0] + '.pcx'
+    if not os.path.exists(pcx_filename):
+        raise ValueError(f'Unable to find the texture for this quake model: {pcx_filename}')
+
+    model = QuakeModel(_options.render_type)
+    model.from_file(quake_filename, pcx_filename)
+
+    size = min(_options.width, _options.height) / VIEWER_SIZE
+    model.scale(_options.scale * size)
+    model.translate(VIEWER_TRANSLATION[0] * _options.width / VIEWER_SIZE, VIEWER_TRANSLATION[1], VIEWER_TRANSLATION[2] * _options.height / VIEWER_SIZE)
+    model.set_clip(Point2d(0, 0), Point2d(_options.width, _options.height), _options.perspective_correct)
+    return model
+
+def render_frame(model: QuakeModel, graphics: Graphics, buffer: NDArray[Shape['*,*'], UInt32]) -> None:
+    """Renders the current frame of a model to a cleared buffer.
+
+    Args:
+        model (QuakeModel): The model to render.
+        graphics (Graphics): The graphics object to draw with, with its clipping rectangle set to the buffer.
+        buffer (NDArray[Shape['*,*'], UInt32]): The buffer to draw to, indexed by x and then y.
+    """
+    if model.render_type == RenderType.WIREFRAME:
+        graphics.draw_lines(model.wireframe_edges(), WIREFRAME_COLOR, buffer)
+        return
+
+    batch = model.triangle_batch()
+    if graphics.depth_buffered:
+        graphics.clear_depth_buffer(*buffer.shape)
+    else:
+        batch = batch.sorted_by_depth()
+
+    graphics.draw_triangle_batch(batch, buffer)
+
+def save_frame(buffer: NDArray[Shape['*,*'], UInt32], filename: str, image_format: str) -> None:
+    """Writes a rendered frame to a file.
+
+    Args:
+        buffer (NDArray[Shape['*,*'], UInt32]): The frame, indexed by x and then y.
+        filename (str): The full path of the file to write, without an extension.
+        image_format (str): 'png' for a PNG file, or 'raw' for 32 bit ARGB pixels in little endian order, one row after
+        another from the top.
+    """
+    if image_format == 'raw':
+        with open(filename + '.raw', 'wb') as f:
+            f.write(np.ascontiguousarray(buffer.T, dtype='<u4').tobytes())
+        return
+
+    surface = pygame.Surface(buffer.shape, depth=32)
+    pygame.surfarray.blit_array(surface, buffer)
+    pygame.image.save(surface, filename + '.png')
+
+def _render_model(task: RenderTask) -> RenderResult:
+    """Loads a model and renders the chosen sequences of it, then releases it. An error loading or rendering the model
+    is returned instead of raised, so the other models are still rendered.
+
+    Args:
+        task (RenderTask): The model and the indices of the sequences to render.
+
+    Returns:
+        RenderResult: The number of frames written, the time taken, and the error that stopped the model, if any.
+    """
+    start = time.perf_counter()
+    frames = 0
+
+    try:
+        with _load_model(task.quake_filename) as model:
+            model_name = os.path.splitext(os.path.basename(task.quake_filename))[0]
+            directory = os.path.join(_options.output_dir, model_name)
+            os.makedirs(directory, exist_ok=True)
+
+            buffer = np.zeros((_options.width, _options.height), dtype=np.uint32)
+            for sequence in task.sequences:
+                frames += _render_sequence(model, sequence, directory, buffer)
+    except Exception as e:
+        return RenderResult(task.quake_filename, frames, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+
+    return RenderResult(task.quake_filename, frames, time.perf_counter() - start, None)
+
+def _render_sequence(model: QuakeModel, sequence_index: int, directory: str, buffer: NDArray[Shape['*,*'], UInt32]) -> int:
+    """Renders every frame of one animation sequence of a model, from every turntable angle. With a frame rate, the
+    sequence is played once at the keyframe rate and rendered that many times a second, blending between its frames.
+
+    Args:
+        model (QuakeModel): The model to render.
+        sequence_index (int): The index of the sequence to render.
+        directory (str): The directory to write the frames to.
+        buffer (NDArray[Shape['*,*'], UInt32]): The buffer to draw each frame to.
+
+    Returns:
+        int: The number of frames written.
+    """
+    sequence = model.sequences[sequence_index]
+    angle_x, angle_y, angle_z = _options.rotation
+    frames = 0
+
+    clock = None
+    num_frames = sequence.num_frames
+    if _options.frame_rate is not None:
+        clock = AnimationClock(_options.keyframe_rate)
+        num_frames = max(round(sequence.num_frames * _options.frame_rate / _options.keyframe_rate), 1)
+
+    model.set_sequence(sequence_index)
+    for frame in range(num_frames):
+        for view in range(_options.turntable):
+            model.rotate(angle_x, angle_y, (angle_z + view * 360 // _options.turntable) % 360)
+
+            buffer.fill(0)
+            render_frame(model, _graphics, buffer)
+
+            suffix = f'_{view:03d}' if _options.turntable > 1 else ''
+            save_frame(buffer, os.path.join(directory, f'{sequence.name}_{frame:03d}{suffix}'), _options.image_format)
+            frames += 1
+
+        if clock is not None:
+            model.animate(*clock.update(1 / _options.frame_rate))
+        else:
+            model.advance_frame()
+
+    return frames
+
+def _tasks(quake_filenames: List[str], sequence_names: Optional[List[str]]) -> Tuple[List[RenderTask], List[RenderResult]]:
+    """Lists the sequences to render for each model, reading only the header and frame names of each model file.
+
+    Args:
+        quake_filenames (List[str]): The full paths to the Quake model version 2 md2 files.
+        sequence_names (Optional[List[str]]): The names of the sequences to render, or None for every sequence.
+
+    Returns:
+        Tuple[List[RenderTask], List[RenderResult]]: One task for each model with sequences to render, and the results of
+        the models whose files could not be read.
+    """
+    tasks = []
+    failures = []
+    for quake_filename in quake_filenames:
+        try:
+            sequences = QuakeModel(RenderType.WIREFRAME).read_sequences(quake_filename)
+        except Exception as e:
+            failures.append(RenderResult(quake_filename, 0, 0.0, f'{type(e).__name__}: {e}'))
+            continue
+
+        indices = [index for index, sequence in enumerate(sequences) if sequence_names is None or sequence.name in sequence_names]
+        if indices:
+            tasks.append(RenderTask(quake_filename, indices))
+
+    return tasks, failures
+
+def main():
+    """Renders the animation sequences of Quake models to image files without a display."""
+    parser = argparse.ArgumentParser(description='Headless Quake model renderer')
+    parser.add_argument('quake_models', nargs='+', help='Quake model version 2 md2 files, each with its pcx texture beside it')
+    parser.add_argument('--output', default='frames', help='the directory to write a directory of frames for each model to')
+    parser.add_argument('--format', choices=['png', 'raw'], default='png', help='write PNG files, or raw 32 bit ARGB pixels row by row')
+    parser.add_argument('--width', type=int, default=VIEWER_SIZE, help='the width of the frames in pixels')
+    parser.add_argument('--height', type=int, default=VIEWER_SIZE, help='the height of the frames in pixels')
+    parser.add_argument('--render-type', choices=['textured', 'wireframe'], default='textured', help='how to render the models')
+    parser.add_argument('--rotate', type=int, nargs=3, default=[0, 180, 90], metavar=('X', 'Y', 'Z'), help='the rotation of the models in degrees')
+    parser.add_argument('--turntable', type=int, default=1, help='render every frame from this many angles evenly spaced around the z-axis')
+    parser.add_argument('--scale', type=float, default=1, help='the scale of the models')
+    parser.add_argument('--sequences', nargs='+', default=None, help='the names of the sequences to render, every sequence when omitted')
+    parser.add_argument('--frame-rate', type=float, default=None, help='render this many frames a second of animation, blending between keyframes, instead of one frame per keyframe')
+    parser.add_argument('--keyframe-rate', type=float, default=AnimationClock.DEFAULT_KEYFRAME_RATE, help='the keyframes a second of animation with --frame-rate')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='the number of worker processes, 0 renders in this process')
+    parser.add_argument('--barycentric', action='store_true', help='fill textured triangles by testing their bounding boxes instead of walking their edges')
+    parser.add_argument('--depth-buffer', action='store_true', help='depth test textured pixels instead of sorting the triangles back to front')
+    parser.add_argument('--perspective', action='store_true', help='texture map with perspective correction')
+    args = parser.parse_args()
+
+    if (args.frame_rate is not None and args.frame_rate <= 0) or args.keyframe_rate <= 0:
+        parser.error('the frame rate and keyframe rate must be positive')
+
+    options = RenderOptions(RenderType.TEXTURED if args.render_type == 'textured' else RenderType.WIREFRAME, tuple(args.rotate), max(args.turntable, 1), args.scale,
+                            args.width, args.height, args.output, args.format, Rasterizer.BARYCENTRIC if args.barycentric else Rasterizer.EDGE_WALK,
+                            args.depth_buffer, args.perspective, args.keyframe_rate, args.frame_rate)
+
+    start = time.perf_counter()
+    tasks, results = _tasks(args.quake_models, args.sequences)
+
+    if args.workers > 0:
+        with ProcessPoolExecutor(args.workers, initializer=_initialize_worker, initargs=(options,)) as executor:
+            results.extend(executor.map(_render_model, tasks))
+    else:
+        _initialize_worker(options)
+        results.extend(_render_model(task) for task in tasks)
+
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if result.error is not None:
+            print(f'{result.quake_filename}: failed after {result.frames} frames: {result.error}')
+        else:
+            print(f'{result.quake_filename}: {result.frames} frames in {result.seconds:.2f}s, {result.frames / result.seconds if result.seconds else 0:.1f} frames/s')
+
+    num_frames = sum(result.frames for result in results)
+    num_failed = sum(result.error is not None for result in results)
+    workers = f'{args.workers} workers' if args.workers > 0 else 'no workers'
+    print(f'Rendered {num_frames} frames of {len(results) - num_failed} models in {elapsed:.2f}s, {num_frames / elapsed:.1f} frames/s with {workers}')
+
+    if num_failed:
+        print(f'{num_failed} models failed')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -36,10 +36,7 @@ def main():
     buffer = np.zeros((1000, 1000), dtype=np.uint32)
     display_surface = pygame.Surface((1000, 1000))
     
-    for y in range(pcx.height):
-        for x in range(pcx.width):
-            red, green, blue = pcx.palette[pcx.image_data[x, y]]
-            buffer[x, y] = 0xFF000000 | red << 16 | green << 8 | blue
+    buffer[:pcx.width, :pcx.height] = pcx.argb_image
                            
     while True:
         for event in pygame.event.get():
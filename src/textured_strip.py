@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from pcx import Pcx
+from point2d import Point2d
+
+@dataclass
+class TexturedStrip:
+    z_center: float
+    triangle_verts: List[Point2d]
+    skin_verts: List[Point2d]
+    triangles: List[Tuple[int, int, int]]
+    texture: Pcx
+    vertex_depths: List[float]
\ No newline at end of file
@@ -0,0 +1,226 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+import os
+from typing import Callable, List, Optional, Tuple
+
+from nptyping import Float32, NDArray, Shape, UInt32
+import numpy as np
+
+from graphics import Graphics
+from pcx import Pcx
+from point2d import Point2d
+from triangle_batch import TriangleBatch
+
+class TiledRenderer:
+    def __init__(self, width: int = 1000, height: int = 1000, tile_size: int = 64, workers: Optional[int] = None,
+                 graphics: Optional[Graphics] = None, use_threads: bool = False):
+        """The constructor for the TiledRenderer class, which splits the screen into square tiles and draws the tiles in
+        parallel. Every triangle is binned into the tiles its bounding box touches, and each tile draws its triangles in
+        batch order, so the painter's order is the same as drawing the whole batch on one core.
+        
+        The frame buffer and depth buffer are kept in shared memory, so worker processes draw straight into them and nothing
+        is copied back.
+
+        Args:
+            width (int, optional): The width of the frame buffer in pixels. Defaults to 1000.
+            height (int, optional): The height of the frame buffer in pixels. Defaults to 1000.
+            tile_size (int, optional): The width and height of a tile in pixels. Defaults to 64.
+            workers (Optional[int], optional): The number of workers, or None for one per CPU. Defaults to None.
+            graphics (Optional[Graphics], optional): The graphics object whose rasterizer, depth buffering, and perspective
+            correction the workers draw with, checked every frame, or None to draw with the defaults. Defaults to None.
+            use_threads (bool, optional): Whether to draw on a thread pool instead of a process pool. Defaults to False.
+        """
+        self.tile_size = tile_size
+        self.workers = workers or os.cpu_count() or 1
+        self.use_threads = use_threads
+        self.graphics = graphics or Graphics()
+        self._shared_memory = shared_memory.SharedMemory(create=True, size=width * height * (np.dtype(np.uint32).itemsize + np.dtype(np.float32).itemsize))
+        self.buffer, self.depth_buffer = _shared_buffers(self._shared_memory, (width, height))
+        self.clear()
+        self._executor: Optional[Executor] = None
+        self._draw_tile: Optional[Callable] = None
+        self._textures: Optional[List[Pcx]] = None
+        self._modes: Optional[Tuple] = None
+    
+    def __enter__(self) -> 'TiledRenderer':
+        return self
+    
+    def __exit__(self, *args) -> None:
+        self.close()
+    
+    def clear(self) -> None:
+        """Clears the frame buffer and the depth buffer before drawing a frame."""
+        self.buffer.fill(0)
+        self.depth_buffer.fill(0)
+    
+    def draw_triangle_batch(self, batch: TriangleBatch) -> None:
+        """Draws every triangle in a batch to the frame buffer, in the order of the batch unless depth buffered.
+
+        Args:
+            batch (TriangleBatch): The triangles to draw.
+        """
+        modes = (self.graphics.rasterizer, self.graphics.depth_buffered, self.graphics.perspective_correct, self.graphics.subspan_length)
+        if self._executor is None or modes != self._modes or not self._same_textures(batch.textures):
+            self._start_executor(batch.textures, modes)
+        
+        tasks = []
+        for tile_min, tile_max, triangles in self._bin(batch):
+            tile = batch.take(triangles)
+            tasks.append((tile_min, tile_max, tile.screen, tile.skin, tile.depth, tile.vertex_depths, tile.texture_ids))
+        
+        # The busiest tiles are started first so they do not finish last.
+        tasks.sort(key=lambda task: len(task[2]), reverse=True)
+        for _ in self._executor.map(self._draw_tile, tasks, chunksize=max(1, len(tasks) // (self.workers * 4))):
+            pass
+    
+    def close(self) -> None:
+        """Stops the workers and releases the shared frame buffer."""
+        self._shutdown_executor()
+        
+        if self._shared_memory is not None:
+            self.buffer = None
+            self.depth_buffer = None
+            self._shared_memory.close()
+            self._shared_memory.unlink()
+            self._shared_memory = None
+    
+    def _bin(self, batch: TriangleBatch) -> List[Tuple[Point2d, Point2d, NDArray[Shape['*'], np.intp]]]:
+        """Finds the triangles whose bounding boxes touch each tile.
+
+        Args:
+            batch (TriangleBatch): The triangles to bin.
+
+        Returns:
+            List[Tuple[Point2d, Point2d, NDArray]]: The minimum and maximum point of every tile that has triangles, and the
+            indices of its triangles in batch order.
+        """
+        width, height = self.buffer.shape
+        tiles_x = -(-width // self.tile_size)
+        tiles_y = -(-height // self.tile_size)
+        
+        x = batch.screen[:, :, 0]
+        y = batch.screen[:, :, 1]
+        on_screen = np.flatnonzero((x.max(axis=1) >= 0) & (x.min(axis=1) < width) & (y.max(axis=1) >= 0) & (y.min(axis=1) < height))
+        
+        first_x = np.clip(x[on_screen].min(axis=1) // self.tile_size, 0, tiles_x - 1)
+        first_y = np.clip(y[on_screen].min(axis=1) // self.tile_size, 0, tiles_y - 1)
+        count_x = np.clip(x[on_screen].max(axis=1) // self.tile_size, 0, tiles_x - 1) - first_x + 1
+        count_y = np.clip(y[on_screen].max(axis=1) // self.tile_size, 0, tiles_y - 1) - first_y + 1
+        
+        # Pair every triangle with every tile it touches, then group the pairs by tile without changing the order of the
+        # triangles within a tile.
+        counts = count_x * count_y
+        pairs = np.repeat(np.arange(len(on_screen)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        tiles = (first_y[pairs] + offsets // count_x[pairs]) * tiles_x + first_x[pairs] + offsets % count_x[pairs]
+        
+        order = np.argsort(tiles, kind='stable')
+        tiles = tiles[order]
+        triangles = on_screen[pairs[order]]
+        starts = np.flatnonzero(np.diff(tiles, prepend=-1))
+        
+        binned = []
+        for tile, tile_triangles in zip(tiles[starts].tolist(), np.split(triangles, starts[1:])):
+            tile_x = tile % tiles_x * self.tile_size
+            tile_y = tile // tiles_x * self.tile_size
+            binned.append((Point2d(tile_x, tile_y), Point2d(min(tile_x + self.tile_size, width), min(tile_y + self.tile_size, height)), tile_triangles))
+        
+        return binned
+    
+    def _same_textures(self, textures: List[Pcx]) -> bool:
+        """Whether the workers already hold these textures."""
+        return len(textures) == len(self._textures) and all(texture is worker_texture for texture, worker_texture in zip(textures, self._textures))
+    
+    def _start_executor(self, textures: List[Pcx], modes: Tuple) -> None:
+        """Starts the workers. The textures are handed to the workers once here instead of with every tile.
+
+        Args:
+            textures (List[Pcx]): The textures the triangles use.
+            modes (Tuple): The arguments for the Graphics objects the workers draw with.
+        """
+        self._shutdown_executor()
+        self._textures = list(textures)
+        self._modes = modes
+        
+        if self.use_threads:
+            self._executor = ThreadPoolExecutor(self.workers)
+            self._draw_tile = _TileWorker(self.buffer, self.depth_buffer, self._textures, modes).draw
+        else:
+            self._executor = ProcessPoolExecutor(self.workers, initializer=_initialize_worker,
+                                                 initargs=(self._shared_memory.name, self.buffer.shape, self._textures, modes))
+            self._draw_tile = _draw_tile
+    
+    def _shutdown_executor(self) -> None:
+        """Stops the workers if they are running."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._draw_tile = None
+            self._textures = None
+            self._modes = None
+
+def _shared_buffers(memory: shared_memory.SharedMemory, shape: Tuple[int, int]) -> Tuple[NDArray[Shape['*,*'], UInt32], NDArray[Shape['*,*'], Float32]]:
+    """Gets the frame buffer and the depth buffer that follows it in shared memory.
+
+    Args:
+        memory (shared_memory.SharedMemory): The shared memory holding both buffers.
+        shape (Tuple[int, int]): The shape of each buffer.
+
+    Returns:
+        Tuple[NDArray[Shape['*,*'], UInt32], NDArray[Shape['*,*'], Float32]]: The frame buffer and the depth buffer.
+    """
+    buffer = np.ndarray(shape, dtype=np.uint32, buffer=memory.buf)
+    depth_buffer = np.ndarray(shape, dtype=np.float32, buffer=memory.buf, offset=buffer.nbytes)
+    return buffer, depth_buffer
+
+class _TileWorker:
+    def __init__(self, buffer: NDArray[Shape['*,*'], UInt32], depth_buffer: NDArray[Shape['*,*'], Float32], textures: List[Pcx], modes: Tuple):
+        """The constructor for the _TileWorker class, which draws tiles into a frame buffer.
+
+        Args:
+            buffer (NDArray[Shape['*,*'], UInt32]): The frame buffer to draw to.
+            depth_buffer (NDArray[Shape['*,*'], Float32]): The depth buffer to test against.
+            textures (List[Pcx]): The textures the triangles use.
+            modes (Tuple): The arguments for the Graphics objects that draw the tiles.
+        """
+        self._buffer = buffer
+        self._depth_buffer = depth_buffer
+        self._textures = textures
+        self._modes = modes
+    
+    def draw(self, task: Tuple) -> None:
+        """Draws the triangles of one tile.
+
+        Args:
+            task (Tuple): The minimum and maximum point of the tile, and the screen coordinates, texture coordinates, depths,
+            vertex depths, and texture indices of its triangles.
+        """
+        tile_min, tile_max, screen, skin, depth, vertex_depths, texture_ids = task
+        
+        graphics = Graphics(*self._modes)
+        graphics.depth_buffer = self._depth_buffer
+        graphics.set_clip(Point2d(0, 0), Point2d(*self._buffer.shape))
+        graphics.set_tile(tile_min, tile_max)
+        graphics.draw_triangle_batch(TriangleBatch(screen, skin, depth, vertex_depths, texture_ids, self._textures), self._buffer)
+
+_worker: Optional[_TileWorker] = None
+_worker_shared_memory: Optional[shared_memory.SharedMemory] = None
+
+def _initialize_worker(shared_memory_name: str, shape: Tuple[int, int], textures: List[Pcx], modes: Tuple) -> None:
+    """Attaches a worker process to the shared frame buffer and depth buffer.
+
+    Args:
+        shared_memory_name (str): The name of the shared memory holding the buffers.
+        shape (Tuple[int, int]): The shape of the buffers.
+        textures (List[Pcx]): The textures the triangles use.
+        modes (Tuple): The arguments for the Graphics objects that draw the tiles.
+    """
+    global _worker, _worker_shared_memory
+    
+    _worker_shared_memory = shared_memory.SharedMemory(name=shared_memory_name)
+    buffer, depth_buffer = _shared_buffers(_worker_shared_memory, shape)
+    _worker = _TileWorker(buffer, depth_buffer, textures, modes)
+
+def _draw_tile(task: Tuple) -> None:
+    """Draws one tile in a worker process."""
+    _worker.draw(task)
@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import Generator, List, Optional, Sequence
+
+from nptyping import NDArray, Shape, Float32, Int, Int32
+import numpy as np
+
+from face import Face
+from pcx import Pcx
+from point2d import Point2d
+from textured_triangle import TexturedTriangle
+
+@dataclass
+class TriangleBatch:
+    screen: NDArray[Shape['*, 3, 2'], Int32]
+    skin: NDArray[Shape['*, 3, 2'], Float32]
+    depth: NDArray[Shape['*'], Float32]
+    vertex_depths: NDArray[Shape['*, 3'], Float32]
+    texture_ids: NDArray[Shape['*'], Int]
+    textures: List[Pcx]
+    # The ids of the strip and fan vertices of each triangle, shared by the triangles of a strip or fan so their shared
+    # edges are set up once, or -1 for vertices made by clipping. None when the triangles are not from strips and fans.
+    vertex_ids: Optional[NDArray[Shape['*, 3'], Int]] = None
+
+    def __len__(self) -> int:
+        return len(self.depth)
+
+    @staticmethod
+    def concatenate(batches: Sequence['TriangleBatch']) -> 'TriangleBatch':
+        """Joins batches into one batch, keeping each triangle's texture. The strip and fan vertex ids of each batch are
+        offset past those of the batches before it, so they stay distinct.
+
+        Args:
+            batches (Sequence[TriangleBatch]): The batches to join.
+
+        Returns:
+            TriangleBatch: A batch with the triangles of every batch in order.
+        """
+        textures = []
+        texture_ids = []
+        for batch in batches:
+            texture_ids.append(batch.texture_ids + len(textures))
+            textures.extend(batch.textures)
+        
+        vertex_ids = None
+        if any(batch.vertex_ids is not None for batch in batches):
+            vertex_ids = []
+            first_id = 0
+            for batch in batches:
+                if batch.vertex_ids is None:
+                    vertex_ids.append(np.full((len(batch), 3), -1, dtype=np.intp))
+                    continue
+                
+                vertex_ids.append(np.where(batch.vertex_ids >= 0, batch.vertex_ids + first_id, -1))
+                if len(batch):
+                    first_id += int(batch.vertex_ids.max()) + 1
+            vertex_ids = np.concatenate(vertex_ids)
+
+        return TriangleBatch(np.concatenate([batch.screen for batch in batches]),
+                             np.concatenate([batch.skin for batch in batches]),
+                             np.concatenate([batch.depth for batch in batches]),
+                             np.concatenate([batch.vertex_depths for batch in batches]),
+                             np.concatenate(texture_ids),
+                             textures,
+                             vertex_ids)
+
+    def take(self, indices: NDArray[Shape['*'], Int]) -> 'TriangleBatch':
+        """Selects triangles from the batch.
+
+        Args:
+            indices (NDArray[Shape['*'], Int]): The indices of the triangles to keep, in the order to keep them.
+
+        Returns:
+            TriangleBatch: A batch with the selected triangles.
+        """
+        return TriangleBatch(self.screen[indices], self.skin[indices], self.depth[indices], self.vertex_depths[indices], self.texture_ids[indices], self.textures,
+                             None if self.vertex_ids is None else self.vertex_ids[indices])
+
+    def sorted_by_depth(self) -> 'TriangleBatch':
+        """Sorts the triangles by depth for painter's order. Triangles at the same depth keep their order.
+
+        Returns:
+            TriangleBatch: A batch with the triangles sorted by depth.
+        """
+        return self.take(np.argsort(self.depth, kind='stable'))
+
+    def triangles(self) -> Generator[TexturedTriangle, None, None]:
+        """Generates a TexturedTriangle for each triangle in the batch, for code that draws one triangle at a time."""
+        for screen, skin, depth, texture_id in zip(self.screen.tolist(), self.skin.tolist(), self.depth.tolist(), self.texture_ids.tolist()):
+            yield TexturedTriangle(depth, Face([Point2d(x, y) for x, y in screen], [Point2d(s, t) for s, t in skin], self.textures[texture_id]))
@@ -0,0 +1,53 @@
+import argparse
+import os
+import time
+
+import compiled_cache
+from model import QuakeModel
+from render_type import RenderType
+
+def main():
+    """Builds the compiled caches for every Quake model, and its texture, in a directory tree so later loads skip parsing."""
+    parser = argparse.ArgumentParser(description='Pre-warm the compiled model cache')
+    parser.add_argument('directory', help='directory to search for Quake model version 2 md2 files')
+    parser.add_argument('--cache-dir', default=None, help='directory for the cache files instead of next to the models')
+    parser.add_argument('--force', action='store_true', help='rebuild caches that are still valid')
+    args = parser.parse_args()
+
+    num_models = 0
+    num_skipped = 0
+    start = time.perf_counter()
+
+    for root, _, filenames in os.walk(args.directory):
+        for filename in sorted(filenames):
+            base_name, extension = os.path.splitext(filename)
+            if extension.lower() != '.md2':
+                continue
+
+            quake_filename = os.path.join(root, filename)
+            pcx_filename = os.path.join(root, base_name + '.pcx')
+            if not os.path.exists(pcx_filename):
+                print(f'Skipping {quake_filename}: unable to find the texture {pcx_filename}')
+                num_skipped += 1
+                continue
+
+            if args.force:
+                for source_filename in (quake_filename, pcx_filename):
+                    cache_filename = compiled_cache.cache_filename(source_filename, args.cache_dir)
+                    if os.path.exists(cache_filename):
+                        os.remove(cache_filename)
+
+            try:
+                QuakeModel(RenderType.WIREFRAME).from_file(quake_filename, pcx_filename, True, args.cache_dir)
+            except ValueError as e:
+                print(f'Skipping {quake_filename}: {e}')
+                num_skipped += 1
+                continue
+
+            num_models += 1
+            print(f'Cached {quake_filename}')
+
+    print(f'Cached {num_models} models in {time.perf_counter() - start:.2f}s, skipped {num_skipped}')
+
+if __name__ == '__main__':
+    main()